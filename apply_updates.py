@@ -0,0 +1,59 @@
+import argparse
+import os
+import sys
+import time
+
+from repair.db_writer import BATCH_SIZE, PASSAGE_HTML, QUESTION_TEXT, BulkWriter, connect, read_update_files
+from repair.html_checks import validate_files
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write repaired question html to the database in bulk')
+    parser.add_argument('files', nargs='*', default=['final_88_updates.json', 'remaining_9_to_update.json'],
+                        help='update files with id (cuid) and new_html')
+    parser.add_argument('--database', default=os.environ.get('DATABASE_URL'),
+                        help='postgresql://... or sqlite:///stand-in.db (default: $DATABASE_URL)')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--no-passages', action='store_true', help='only write QuestionBankItem.questionText')
+    parser.add_argument('--dry-run', action='store_true', help='run every batch, then roll back')
+    parser.add_argument('--skip-validation', action='store_true',
+                        help='write even if validate_html.py checks fail on the update files')
+    args = parser.parse_args()
+
+    if not args.database:
+        parser.error('no --database given and DATABASE_URL is not set')
+    files = [path for path in args.files if os.path.exists(path)]
+    for path in set(args.files) - set(files):
+        print(f"⚠ {path} not found, skipping")
+    updates = read_update_files(files)
+    print(f"Loaded {len(updates)} question updates from {len(files)} file(s)")
+
+    issues = [issue for _, found in validate_files(files).values() for issue in found]
+    for issue in issues[:10]:
+        print(f"✗ {issue['source']} {issue['id']} {issue['field']}: {issue['check']} ({issue['detail']})")
+    if issues and not args.skip_validation:
+        print(f"✗ {len(issues)} HTML issue(s) in the update files; fix them or pass --skip-validation")
+        sys.exit(1)
+
+    connection, paramstyle = connect(args.database)
+    writer = BulkWriter(connection, paramstyle, args.batch_size)
+    targets = [QUESTION_TEXT] if args.no_passages else [QUESTION_TEXT, PASSAGE_HTML]
+    start = time.time()
+    try:
+        results = writer.apply(updates, targets, dry_run=args.dry_run)
+    except ValueError as e:
+        print(f"✗ {e}; nothing written")
+        sys.exit(1)
+    finally:
+        connection.close()
+
+    for target, written in results.items():
+        print(f"✓ {target}: {len(written)} rows written")
+    print(f"  {writer.batches} batch statement(s) in {time.time() - start:.2f}s"
+          + (' (dry run, rolled back)' if args.dry_run else ''))
+    if not any(results.values()):
+        print("  Everything already up to date")
+
+
+if __name__ == '__main__':
+    main()
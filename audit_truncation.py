@@ -0,0 +1,97 @@
+import argparse
+import json
+import os
+
+from repair.dataset_diff import iter_dataset, load_cuids
+from repair.snapshot import Snapshot
+from repair.truncation import FLAG_SCORE, TruncationAudit
+
+csv_file = '/Users/kharisyeboah/Downloads/oneprep_final_EN_with_module.csv'
+DATASET_DIRS = ['sat_questions_by_test', 'sat_questions_by_test_correct', 'sat_questions_by_test_fixed']
+
+
+def source_lengths(path):
+    # URL -> (length of Question, length of Question_html) in the CSV, first row per URL
+    lengths = {}
+    for row in Snapshot.open(path).rows(('URL', 'Question', 'Question_html')):
+        lengths.setdefault(row['URL'], (len(row['Question']), len(row['Question_html'])))
+    return lengths
+
+
+def bank_items(path, cuids, lengths):
+    # questionText is html; textLength is its full length in the database
+    with open(path, 'r', encoding='utf-8') as f:
+        questions = json.load(f)
+    for q in questions:
+        url = cuids.get(q['id'])
+        markup = q.get('questionText', '')
+        length = int(q.get('textLength') or len(markup))
+        yield ('bank:' + path, q['id'], url, markup, length,
+               lengths.get(url, (0, 0))[1], length > len(markup))
+
+
+def dataset_items(directory, lengths):
+    # fullText is the CSV's plain Question column, fullHtml its Question_html
+    for _, record in iter_dataset(directory):
+        url = record.get('url')
+        yield (directory, record.get('id'), url, record.get('fullHtml', ''),
+               len(record.get('fullText', '')), lengths.get(url, (0, 0))[0], False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rank likely truncated questions across the whole corpus')
+    parser.add_argument('--bank', nargs='*', default=['unfixed_questions.json'],
+                        help='QuestionBankItem exports (id, questionText, textLength)')
+    parser.add_argument('--datasets', nargs='*', default=DATASET_DIRS)
+    parser.add_argument('--csv', default=csv_file, help='OnePrep export to compare lengths against')
+    parser.add_argument('--min-score', type=float, default=FLAG_SCORE, help='lowest score to report')
+    parser.add_argument('--top', type=int, default=20, help='how many to print')
+    parser.add_argument('--output', default='truncation_audit.json')
+    args = parser.parse_args()
+
+    lengths = {}
+    if os.path.exists(args.csv):
+        lengths = source_lengths(args.csv)
+        print(f"Loaded source lengths for {len(lengths)} URLs from CSV")
+    else:
+        print(f"⚠ {args.csv} not found, skipping the source length comparison")
+    cuids = {cuid: url for url, cuid in load_cuids().items()}
+
+    audit = TruncationAudit()
+    for path in args.bank:
+        if os.path.exists(path):
+            audit.add(bank_items(path, cuids, lengths))
+        else:
+            print(f"⚠ {path} not found")
+    for directory in args.datasets:
+        if os.path.isdir(directory):
+            audit.add(dataset_items(directory, lengths))
+        else:
+            print(f"⚠ {directory} not found")
+
+    ranking = audit.ranking(min_score=args.min_score)
+    by_source = {}
+    for source, _, _ in audit.items:
+        by_source.setdefault(source, [0, 0])[0] += 1
+    for entry in ranking:
+        by_source[entry['source']][1] += 1
+
+    print(f"\nAudited {len(audit.items)} questions:")
+    for source, (total, flagged) in by_source.items():
+        print(f"  {source}: {flagged} flagged of {total}")
+
+    print(f"\n=== TOP {min(args.top, len(ranking))} ===")
+    for entry in ranking[:args.top]:
+        ending = 'excerpt only' if entry['excerpt'] else f"ends with '{entry['last_word']}'"
+        print(f"{entry['score']:5.2f}  {entry['source']}  {entry['id']}  ratio={entry['source_ratio']}  {ending}")
+
+    with open(args.output, 'w') as f:
+        json.dump({
+            'summary': {source: {'total': total, 'flagged': flagged} for source, (total, flagged) in by_source.items()},
+            'ranking': ranking
+        }, f, indent=2)
+    print(f"\n✓ Saved {len(ranking)} ranked questions to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+import argparse
+import json
+import os
+import platform
+import time
+from datetime import datetime, timezone
+
+from repair.benchmark import STAGES, PipelineBenchmark
+from repair.normalized_cache import CACHE_DIR
+from repair.synthetic_export import SyntheticExport, write_truncations
+
+BENCH_DIR = os.path.join(CACHE_DIR, 'bench')
+BASELINE_FILE = 'benchmark_baselines.json'
+
+
+def synthetic_export(rows, seed, truncations):
+    # Generate (once) an export of `rows` rows and its seeded truncations
+    os.makedirs(BENCH_DIR, exist_ok=True)
+    csv_file = os.path.join(BENCH_DIR, f'export-{rows}-s{seed}.csv')
+    items_file = csv_file[:-len('.csv')] + f'.truncated-{truncations}.json'
+    generator = SyntheticExport(seed)
+    if not os.path.exists(csv_file):
+        start = time.time()
+        generator.write(csv_file + '.tmp', rows)
+        os.replace(csv_file + '.tmp', csv_file)
+        print(f"Generated {rows} rows ({os.path.getsize(csv_file) / 1e6:.0f} MB) in {time.time() - start:.1f}s")
+    if not os.path.exists(items_file):
+        items, patterns = generator.truncate(csv_file, truncations)
+        write_truncations(items_file, items, patterns)
+    with open(items_file, 'r', encoding='utf-8') as f:
+        seeded = json.load(f)
+    return csv_file, seeded['items'], seeded['patterns']
+
+
+def machine_info():
+    return {'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count()}
+
+
+def machine_key(machine):
+    # Timings are only comparable on the same OS/kernel, CPU count and Python
+    return f"{machine.get('platform', '?')} {machine.get('cpus', '?')}cpu python{machine.get('python', '?')}"
+
+
+def load_baselines(path):
+    # {machine key: {'machine', 'date', 'runs'}}; a single-machine file from before
+    # baselines were keyed is filed under the machine it records
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        data = json.load(f)
+    if 'machines' in data:
+        return data['machines']
+    if 'runs' in data:
+        return {machine_key(data.get('machine', {})): data}
+    return {}
+
+
+def compare(results, baseline, tolerance):
+    # Print each stage against its baseline; returns the stages that got slower
+    slower = []
+    for stage, result in results.items():
+        base = baseline.get(stage)
+        if not base or not base.get('wall_s'):
+            print(f"  {stage:<10} no baseline")
+            continue
+        ratio = result['wall_s'] / base['wall_s']
+        mark = '⚠' if ratio > tolerance else '✓'
+        print(f"  {mark} {stage:<10} {ratio:5.2f}x baseline wall time "
+              f"({base['wall_s']}s -> {result['wall_s']}s), peak {base['peak_rss_mb']} -> {result['peak_rss_mb']} MB")
+        if ratio > tolerance:
+            slower.append(stage)
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time and memory-profile the repair pipeline on synthetic exports')
+    parser.add_argument('--rows', type=int, nargs='*', default=[10000, 100000],
+                        help='export sizes to run (1000000 for production scale)')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--truncations', type=int, help='truncated questions to seed (default: rows / 1000, at least 88)')
+    parser.add_argument('--stages', nargs='*', default=STAGES, choices=STAGES)
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--save-baseline', action='store_true', help='store these results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=1.25, help='wall time ratio reported as a slowdown')
+    parser.add_argument('--output', default='benchmark_results.json')
+    args = parser.parse_args()
+
+    baselines = load_baselines(args.baseline)
+    machine = machine_info()
+    key = machine_key(machine)
+    own = baselines.get(key, {})
+    if baselines and not own:
+        print(f"⚠ No baseline recorded for this machine ({key}); not comparing timings. "
+              f"Recorded: {', '.join(sorted(baselines))}. Use --save-baseline to add one.")
+
+    report = {
+        'machine': machine,
+        'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'runs': {}
+    }
+    slower = []
+    for rows in args.rows:
+        truncations = args.truncations or max(88, rows // 1000)
+        csv_file, items, patterns = synthetic_export(rows, args.seed, truncations)
+        print(f"\n=== {rows} rows, {len(items)} truncated questions ===")
+        results = PipelineBenchmark(csv_file, items, patterns, BENCH_DIR).run(args.stages)
+        report['runs'][str(rows)] = results
+        baseline = own.get('runs', {}).get(str(rows))
+        if baseline:
+            print(f"Against baseline of {own.get('date', '?')}:")
+            slower.extend(f'{rows}:{stage}' for stage in compare(results, baseline, args.tolerance))
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✓ Saved results to {args.output}")
+    if slower:
+        print(f"⚠ Slower than baseline: {', '.join(slower)}")
+
+    if args.save_baseline:
+        entry = baselines.setdefault(key, {})
+        entry.setdefault('runs', {}).update(report['runs'])
+        entry['machine'] = machine
+        entry['date'] = report['date']
+        with open(args.baseline, 'w') as f:
+            json.dump({'machines': baselines}, f, indent=2)
+        print(f"✓ Saved baseline for {key} to {args.baseline}")
+
+
+if __name__ == '__main__':
+    main()
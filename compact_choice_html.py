@@ -0,0 +1,45 @@
+import argparse
+import json
+import os
+
+from repair.choice_html import compact_choices
+
+DATASET_DIRS = ['sat_questions_by_test', 'sat_questions_by_test_correct', 'sat_questions_by_test_fixed']
+
+
+def compact_file(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        questions = json.load(f)
+    changed = sum(compact_choices(question) for question in questions)
+    if changed:
+        # Same layout as the generators' JSON.stringify(questions, null, 2)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(questions, indent=2, ensure_ascii=False))
+    return len(questions), changed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Strip scraped answer-selection markup from choice html')
+    parser.add_argument('dirs', nargs='*', default=DATASET_DIRS,
+                        help='dataset directories written by process-all-sat-questions*.js')
+    args = parser.parse_args()
+
+    for directory in args.dirs:
+        if not os.path.isdir(directory):
+            print(f"✗ {directory} not found")
+            continue
+        files = sorted(name for name in os.listdir(directory) if name.endswith('.json'))
+        before = after = questions = changed = 0
+        for name in files:
+            path = os.path.join(directory, name)
+            before += os.path.getsize(path)
+            count, file_changed = compact_file(path)
+            after += os.path.getsize(path)
+            questions += count
+            changed += file_changed
+        print(f"✓ {directory}: {questions} questions, {changed} choices compacted, "
+              f"{before / 1e6:.1f} MB -> {after / 1e6:.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
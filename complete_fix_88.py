@@ -1,25 +1,14 @@
-import csv
+import argparse
 import json
-import re
+
+from repair.checkpoints import MatchCheckpoints, resume_scan
+from repair.metrics import Metrics
+from repair.parallel import map_shards
+from repair.patterns import PatternScan, PatternTable
 
 # Read the CSV file
 csv_file = '/Users/kharisyeboah/Downloads/oneprep_final_EN_with_module.csv'
 
-# Read truncated questions list
-with open('unfixed_questions.json', 'r') as f:
-    truncated_questions = json.load(f)
-
-print(f"Fixing all {len(truncated_questions)} truncated questions...")
-
-# Read CSV into memory
-all_csv = []
-with open(csv_file, 'r', encoding='utf-8') as f:
-    reader = csv.DictReader(f)
-    for row in reader:
-        all_csv.append(row)
-
-print(f"Loaded {len(all_csv)} questions from CSV")
-
 # Build search patterns for each truncated question
 search_patterns = {
     'cmf862o930012v67m0ikm64ei': 'mimosa tree evolved in East Asia',
@@ -208,36 +197,100 @@ search_patterns = {
     'cmf869k3b02a4v63osj8o2mk1': 'dhow.*triangular sails.*stitched'
 }
 
-# Now match each one
-all_updates = []
-for truncated in truncated_questions:
-    q_id = truncated['id']
-    pattern = search_patterns.get(q_id, 'research.*student.*notes')
-    
-    found = False
-    for csv_q in all_csv:
-        csv_text = csv_q.get('Question', '')
-        csv_html = csv_q.get('Question_html', '')
+
+def main():
+    parser = argparse.ArgumentParser(description='Match truncated questions to their full CSV rows')
+    parser.add_argument('--workers', type=int, default=1, help='processes to shard the CSV across')
+    parser.add_argument('--no-snapshot', action='store_true',
+                        help='parse the CSV directly instead of reusing its binary snapshot (implies --no-checkpoint)')
+    parser.add_argument('--no-checkpoint', action='store_true',
+                        help='match every pattern from scratch and leave the stored match results alone')
+    parser.add_argument('--metrics', default='complete_fix_88_metrics.json', help='where to write run metrics')
+    parser.add_argument('--profile', action='store_true', help='add a sampled profile of the hottest functions')
+    args = parser.parse_args()
+    metrics = Metrics('complete_fix_88', profile=args.profile)
+
+    # Read truncated questions list
+    with metrics.stage('load') as stage:
+        with open('unfixed_questions.json', 'r') as f:
+            truncated_questions = json.load(f)
+        stage['rows'] = len(truncated_questions)
+
+    print(f"Fixing all {len(truncated_questions)} truncated questions...")
+
+    # Compile the pattern table once and find every pattern's first row in one pass over the CSV
+    with metrics.stage('compile') as stage:
+        table = PatternTable({q['id']: search_patterns.get(q['id'], 'research.*student.*notes') for q in truncated_questions})
+        stage['patterns'] = len(table.keys_by_pattern)
+    # With --workers > 1 the CSV is split into byte-range shards matched in parallel;
+    # merging keeps the earliest row per pattern, so the output is identical
+    with metrics.stage('match') as stage:
+        if args.no_snapshot or args.no_checkpoint:
+            scan = PatternScan.merge(table, map_shards(csv_file, table.scan, args.workers, snapshot=not args.no_snapshot))
+        else:
+            # Only patterns without a stored result for this export are matched again
+            with MatchCheckpoints() as checkpoints:
+                scan = resume_scan(csv_file, table, checkpoints, args.workers, metrics=metrics)
+        stage['rows'] = scan.rows_scanned
+        stage['workers'] = args.workers
+    metrics.count('rows_scanned', scan.rows_scanned)
+    metrics.count('regex_evals', sum(scan.regex_evals.values()))
+    metrics.observe_each('regex_evals_per_pattern', scan.regex_evals)
+    metrics.observe_each('rows_hit_per_pattern', scan.hit_counts)
+
+    print(f"Scanned {scan.rows_scanned} questions from CSV")
+
+    # Now match each one
+    all_updates = []
+    for truncated in truncated_questions:
+        q_id = truncated['id']
+        pattern = table.patterns[q_id]
+        csv_q = scan.first(q_id)
         
-        if re.search(pattern, csv_text, re.IGNORECASE) or re.search(pattern, csv_html, re.IGNORECASE):
+        if csv_q is not None:
             all_updates.append({
                 'id': q_id,
-                'new_html': csv_html,
-                'new_plain': csv_text,
+                'new_html': csv_q.get('Question_html', ''),
+                'new_plain': csv_q.get('Question', ''),
                 'url': csv_q.get('URL', '')
             })
             print(f"✓ Found: {q_id[:20]}...")
-            found = True
-            break
-    
-    if not found:
-        print(f"✗ Missing: {q_id[:20]}... (pattern: {pattern[:30]})")
+        else:
+            print(f"✗ Missing: {q_id[:20]}... (pattern: {pattern[:30]})")
+
+    # Patterns hitting several rows silently bind to the first one - report them
+    ambiguous = []
+    for pattern, count, ids in scan.ambiguous():
+        ambiguous.append({
+            'pattern': pattern,
+            'rows_matched': count,
+            'sample_rows': scan.sample_rows[pattern],
+            'ids': ids
+        })
+        print(f"⚠ Ambiguous: '{pattern[:40]}' matched {count} rows (used by {len(ids)} ids)")
+
+    print(f"\n=== FINAL SUMMARY ===")
+    print(f"Successfully matched: {len(all_updates)} out of {len(truncated_questions)} questions")
+
+    metrics.count('matched', len(all_updates))
+    metrics.count('missing', len(truncated_questions) - len(all_updates))
+    metrics.count('ambiguous_patterns', len(ambiguous))
+
+    # Save final updates
+    with metrics.stage('save'):
+        with open('final_88_updates.json', 'w') as f:
+            json.dump(all_updates, f, indent=2)
+
+        print(f"Saved to final_88_updates.json")
+
+        with open('ambiguous_patterns.json', 'w') as f:
+            json.dump(ambiguous, f, indent=2)
+
+        print(f"Saved {len(ambiguous)} ambiguous patterns to ambiguous_patterns.json")
 
-print(f"\n=== FINAL SUMMARY ===")
-print(f"Successfully matched: {len(all_updates)} out of {len(truncated_questions)} questions")
+    metrics.write(args.metrics)
+    print(f"Saved run metrics to {args.metrics}")
 
-# Save final updates
-with open('final_88_updates.json', 'w') as f:
-    json.dump(all_updates, f, indent=2)
 
-print(f"Saved to final_88_updates.json")
\ No newline at end of file
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+import argparse
+import csv
+import os
+
+from repair.ingest import iter_rows
+from repair.mathml import HAS_MATH_RE, MATH_COLUMNS, MATH_RE, MAX_ENTRIES, MathCache, canonical_mathml, convert_all, splice
+from repair.metrics import Metrics
+from repair.parallel import default_workers
+
+csv_file = '/Users/kharisyeboah/Downloads/oneprep_final_EN_with_module.csv'
+
+
+def collect_math(path):
+    # Every <math> element in the HTML columns -> its canonical form, plus per-form occurrence counts
+    canonical_of = {}
+    occurrences = {}
+    rows = 0
+    for row in iter_rows(path, MATH_COLUMNS):
+        rows += 1
+        for column in MATH_COLUMNS:
+            markup = row.get(column) or ''
+            if not HAS_MATH_RE.search(markup):
+                continue
+            for match in MATH_RE.finditer(markup):
+                fragment = match.group(0)
+                canonical = canonical_of.get(fragment)
+                if canonical is None:
+                    canonical = canonical_of[fragment] = canonical_mathml(fragment)
+                occurrences[canonical] = occurrences.get(canonical, 0) + 1
+    return rows, canonical_of, occurrences
+
+
+def write_converted(path, output, latex_for):
+    # Second streaming pass: every column copied through, math cells rewritten
+    columns = None
+    spliced = 0
+    with open(output, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        for row in iter_rows(path):
+            if columns is None:
+                columns = list(row.columns)
+                math_positions = [row.columns[column] for column in MATH_COLUMNS if column in row.columns]
+                writer.writerow(columns)
+            values = list(row.values)
+            for i in math_positions:
+                converted = splice(values[i], latex_for)
+                spliced += converted is not values[i]
+                values[i] = converted
+            writer.writerow(values)
+    return spliced
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert the MathML in a question export to LaTeX, '
+                                                 'converting each distinct expression once')
+    parser.add_argument('--csv', default=csv_file)
+    parser.add_argument('--output', help='converted CSV (default: <csv>_latex.csv)')
+    parser.add_argument('--workers', type=int, default=default_workers(),
+                        help='processes converting uncached expressions')
+    parser.add_argument('--cache', help='cache database (default: .repair_cache/mathml-v<N>.sqlite)')
+    parser.add_argument('--max-entries', type=int, default=MAX_ENTRIES,
+                        help='expressions kept in the cache; the least recently used go first')
+    parser.add_argument('--metrics', default='convert_math_metrics.json')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.csv):
+        print(f"✗ {args.csv} not found")
+        return
+    output = args.output or os.path.splitext(args.csv)[0] + '_latex.csv'
+    metrics = Metrics('convert_math')
+
+    with metrics.stage('extract') as stage:
+        rows, canonical_of, occurrences = collect_math(args.csv)
+        stage['rows'] = rows
+    total = sum(occurrences.values())
+    metrics.count('fragments', total)
+    metrics.count('distinct_fragments', len(canonical_of))
+    metrics.count('distinct_expressions', len(occurrences))
+
+    with MathCache(args.cache, max_entries=args.max_entries) as cache:
+        with metrics.stage('convert') as stage:
+            expressions = list(occurrences)
+            latex = cache.get_many(expressions)
+            missing = [canonical for canonical in expressions if canonical not in latex]
+            converted = dict(zip(missing, convert_all(missing, args.workers)))
+            cache.put_many(converted)
+            latex.update(converted)
+            stage['rows'] = len(missing)
+        metrics.cache('mathml', cache.hits, cache.misses)
+
+    with metrics.stage('splice') as stage:
+        spliced = write_converted(args.csv, output, lambda fragment: latex[canonical_of[fragment]])
+        stage['rows'] = rows
+    metrics.count('cells_rewritten', spliced)
+    metrics.write(args.metrics)
+
+    print(f"✓ {total} <math> elements in {rows} rows: {len(occurrences)} distinct expressions, "
+          f"{len(occurrences) - len(missing)} cached, {len(missing)} converted")
+    print(f"✓ {spliced} cells rewritten -> {output}")
+    print(f"  Metrics: {args.metrics}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+import argparse
+import os
+
+from repair.blob_store import STORE_DIR, BlobStore
+
+DATASET_DIRS = ['sat_questions_by_test', 'sat_questions_by_test_correct', 'sat_questions_by_test_fixed']
+
+
+def dir_size(directory):
+    return sum(os.path.getsize(os.path.join(directory, name))
+               for name in os.listdir(directory) if name.endswith('.json'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Deduplicated store of the question datasets')
+    parser.add_argument('--store', default=STORE_DIR, help='store directory')
+    commands = parser.add_subparsers(dest='command', required=True)
+    add = commands.add_parser('import', help='add dataset directories as versions')
+    add.add_argument('dirs', nargs='*', default=DATASET_DIRS)
+    export = commands.add_parser('export', help='write a version back out as JSON files')
+    export.add_argument('version')
+    export.add_argument('directory')
+    commands.add_parser('list', help='list stored versions')
+    args = parser.parse_args()
+
+    with BlobStore(args.store) as store:
+        if args.command == 'import':
+            for directory in args.dirs:
+                if not os.path.isdir(directory):
+                    print(f"✗ {directory} not found")
+                    continue
+                manifest, added = store.import_dataset(directory)
+                questions = sum(len(keys) for keys in manifest['files'].values())
+                print(f"✓ {manifest['version']}: {len(manifest['files'])} files, {questions} questions, "
+                      f"{dir_size(directory) / 1e6:.1f} MB of JSON -> {added / 1e3:.1f} KB new blobs")
+            pack_size = os.path.getsize(store.pack_path)
+            print(f"\nStore: {len(store)} blobs, {pack_size / 1e6:.1f} MB pack")
+        elif args.command == 'export':
+            names = store.export(args.version, args.directory)
+            print(f"✓ Wrote {len(names)} files to {args.directory}")
+        else:
+            for version in store.versions():
+                manifest = store.manifest(version)
+                questions = sum(len(keys) for keys in manifest['files'].values())
+                print(f"{version}: {len(manifest['files'])} files, {questions} questions")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+import argparse
+import json
+
+from repair.dataset_diff import DatasetDiff, apply_updates, iter_dataset, load_cuids, load_updates
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Which questions and fields changed between two dataset versions')
+    parser.add_argument('old', help='dataset directory, e.g. sat_questions_by_test')
+    parser.add_argument('new', help='dataset directory, e.g. sat_questions_by_test_fixed')
+    parser.add_argument('--apply', nargs='*', default=[], metavar='FILE',
+                        help='update files layered on top of NEW, e.g. final_88_updates.json')
+    parser.add_argument('--values', action='store_true', help='include the new value of every changed field')
+    parser.add_argument('--output', default='dataset_diff.json')
+    args = parser.parse_args()
+
+    diff = DatasetDiff(with_values=args.values, cuids=load_cuids())
+    diff.load_old(iter_dataset(args.old))
+    new_records = iter_dataset(args.new)
+    if args.apply:
+        new_records = apply_updates(new_records, load_updates(args.apply))
+    diff.compare(new_records)
+
+    report = diff.to_json()
+    summary = report['summary']
+    target = args.new + (' + ' + ', '.join(args.apply) if args.apply else '')
+    print(f"{args.old} -> {target}")
+    print(f"  {summary['changed']} changed, {summary['added']} added, "
+          f"{summary['removed']} removed, {summary['unchanged']} unchanged")
+    for field, count in summary['fields'].items():
+        print(f"    {field}: {count}")
+    with_cuid = sum(1 for entry in diff.changed if 'cuid' in entry)
+    if diff.changed:
+        print(f"  {with_cuid} of the changed questions have a database cuid")
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✓ Saved change set to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+import argparse
+import json
+import os
+import time
+
+from repair.dataset_diff import iter_dataset
+from repair.ingest import MATCH_COLUMNS
+from repair.near_duplicates import THRESHOLD, NearDuplicateIndex
+from repair.normalized_cache import NormalizedTextCache
+from repair.snapshot import Snapshot
+
+csv_file = '/Users/kharisyeboah/Downloads/oneprep_final_EN_with_module.csv'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cluster near-duplicate passages and questions')
+    parser.add_argument('--dataset', default='sat_questions_by_test_correct',
+                        help='dataset directory whose passages are clustered')
+    parser.add_argument('--csv', default=csv_file, help='OnePrep export whose questions are clustered')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD, help='estimated Jaccard similarity to link')
+    parser.add_argument('--output', default='duplicate_clusters.json')
+    args = parser.parse_args()
+
+    normalized = NormalizedTextCache()
+    start = time.time()
+
+    passages = NearDuplicateIndex(args.threshold)
+    for name, record in iter_dataset(args.dataset):
+        key = {'test': name[:-len('.json')], 'id': record.get('id'), 'url': record.get('url')}
+        passages.add(key, normalized(record.get('passageHtml', '')))
+
+    questions = NearDuplicateIndex(args.threshold)
+    if os.path.exists(args.csv):
+        for row in Snapshot.open(args.csv).rows(MATCH_COLUMNS):
+            questions.add({'row': row.row_no, 'line': row.line_no, 'url': row['URL']},
+                          normalized(row['Question_html']))
+    else:
+        print(f"⚠ {args.csv} not found, clustering dataset passages only")
+    normalized.close()
+
+    report = {}
+    for label, index in (('passages', passages), ('questions', questions)):
+        clusters = index.clusters()
+        report[label] = clusters
+        clustered = sum(cluster['size'] for cluster in clusters)
+        print(f"{label}: {len(index)} fingerprinted ({index.skipped} too short), "
+              f"{len(clusters)} clusters covering {clustered}")
+
+    # The same passage in several tests would be imported as separate Passage rows
+    repeated = [cluster for cluster in report['passages']
+                if len({member['key']['test'] for member in cluster['members']}) > 1]
+    print(f"\n{len(repeated)} passage clusters span more than one test")
+    for cluster in repeated[:10]:
+        tests = sorted({member['key']['test'] for member in cluster['members']})
+        print(f"  ⚠ {cluster['size']} copies (min similarity {cluster['min_similarity']}): {', '.join(tests)}")
+
+    print(f"\nDone in {time.time() - start:.1f}s")
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"✓ Saved clusters to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,41 +1,86 @@
-import csv
+import argparse
 import json
 import re
 
+from repair.metrics import Metrics
+from repair.minhash import FuzzyMatches
+from repair.parallel import map_shards
+from repair.shingle_index import Contains, FirstMatches, StartsWith
+
 # Read the CSV file
 csv_file = '/Users/kharisyeboah/Downloads/oneprep_final_EN_with_module.csv'
 
-# Read truncated questions list
-with open('unfixed_questions.json', 'r') as f:
-    truncated_questions = json.load(f)
-
-print(f"Processing {len(truncated_questions)} truncated questions...")
-
-# Read all CSV data into memory
-csv_questions = []
-with open(csv_file, 'r', encoding='utf-8') as f:
-    reader = csv.DictReader(f)
-    for row in reader:
-        csv_questions.append(row)
-
-print(f"Loaded {len(csv_questions)} questions from CSV")
-
-# For each truncated question, find its match in CSV
-matched = []
-unmatched = []
-
-for truncated in truncated_questions:
-    # Get the start of the truncated text (remove HTML tags for matching)
-    truncated_text = re.sub(r'<[^>]+>', '', truncated['questionText'][:200]).strip()
-    truncated_text_start = truncated_text[:50]  # First 50 chars for matching
-    
-    found = False
-    for csv_q in csv_questions:
-        # Get plain text from CSV (remove HTML for comparison)
-        csv_plain = csv_q.get('Question', '')
+# Phrases used for the flexible match when the prefix doesn't line up
+flexible_phrases = ['mimosa tree', 'Jane Austen', 'Charles W. Chesnutt', 'Black beans', 'Lewis Carroll',
+                    'Martín Chambi', 'Art collectives', 'Mexican', 'Beatles', 'Wigner crystal']
+
+# Minimum estimated similarity for a fuzzy candidate to be accepted automatically
+fuzzy_accept = 0.8
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Match truncated questions to their full CSV rows')
+    parser.add_argument('--workers', type=int, default=1, help='processes to shard the CSV across')
+    parser.add_argument('--no-snapshot', action='store_true',
+                        help='parse the CSV directly instead of reusing its binary snapshot')
+    parser.add_argument('--metrics', default='fix_all_truncated_metrics.json', help='where to write run metrics')
+    parser.add_argument('--profile', action='store_true', help='add a sampled profile of the hottest functions')
+    args = parser.parse_args()
+    metrics = Metrics('fix_all_truncated', profile=args.profile)
+
+    # Read truncated questions list
+    with open('unfixed_questions.json', 'r') as f:
+        truncated_questions = json.load(f)
+
+    print(f"Processing {len(truncated_questions)} truncated questions...")
+
+    # Build every lookup up front: the 30-char prefix plus any flexible phrase it contains
+    lookups = {}
+    for truncated in truncated_questions:
+        # Get the start of the truncated text (remove HTML tags for matching)
+        truncated_text = re.sub(r'<[^>]+>', '', truncated['questionText'][:200]).strip()
+        prefix = truncated_text[:30]
+        lookups[(truncated['id'], None)] = (prefix, StartsWith('Question', prefix), True)
+        for phrase in flexible_phrases:
+            if phrase in truncated_text:
+                lookups[(truncated['id'], phrase)] = (phrase, Contains('Question', phrase), False)
+
+    # Index the CSV (or each byte-range shard of it, with --workers > 1) and resolve
+    # all lookups; merging keeps the earliest row, so the result doesn't depend on sharding
+    with metrics.stage('index_match') as stage:
+        hits = FirstMatches.merge(map_shards(csv_file, FirstMatches(lookups), args.workers, snapshot=not args.no_snapshot))
+        stage['lookups'] = len(lookups)
+        stage['workers'] = args.workers
+    metrics.count('lookups', len(lookups))
+    metrics.count('candidate_rows_verified', sum(hits.candidates.values()))
+    metrics.observe_each('candidates_per_lookup', {f'{key[0]} {key[1] or "prefix"}': size
+                                                   for key, size in hits.candidates.items()})
+
+    print(f"Matched against the CSV using {args.workers} worker(s)")
+
+    # For each truncated question, find its match in CSV
+    matched = []
+    unmatched = []
+
+    for truncated in truncated_questions:
+        truncated_text = re.sub(r'<[^>]+>', '', truncated['questionText'][:200]).strip()
+        truncated_text_start = truncated_text[:50]  # First 50 chars for matching
+        
+        # Check if the CSV question starts with the same text (first 30 chars)
+        hit = hits.get((truncated['id'], None))
+        flexible = False
+        
+        if hit is None:
+            # Try a more flexible match: earliest row sharing a key phrase
+            phrase_hits = [hits[(truncated['id'], phrase)] for phrase in flexible_phrases
+                           if (truncated['id'], phrase) in hits]
+            if phrase_hits:
+                hit = min(phrase_hits, key=lambda phrase_hit: phrase_hit[0])
+                flexible = True
         
-        # Check if the CSV question starts with the same text
-        if csv_plain.startswith(truncated_text_start[:30]):  # Match first 30 chars
+        found = hit is not None
+        if found:
+            csv_q = hit[1]
             matched.append({
                 'id': truncated['id'],
                 'old_text': truncated['questionText'],
@@ -44,67 +89,83 @@ for truncated in truncated_questions:
                 'url': csv_q.get('URL', ''),
                 'module': truncated['moduleTitle']
             })
-            found = True
-            print(f"✓ Found match for: {truncated['id'][:20]}... - {truncated_text_start[:40]}...")
-            break
-    
-    if not found:
-        # Try a more flexible match
-        for csv_q in csv_questions:
-            csv_plain = csv_q.get('Question', '')
-            # Look for key phrases
-            if 'mimosa tree' in truncated_text and 'mimosa tree' in csv_plain:
-                matched.append({
-                    'id': truncated['id'],
-                    'old_text': truncated['questionText'],
-                    'new_html': csv_q.get('Question_html', ''),
-                    'new_plain': csv_q.get('Question', ''),
-                    'url': csv_q.get('URL', ''),
-                    'module': truncated['moduleTitle']
-                })
-                found = True
+            if not flexible:
+                print(f"✓ Found match for: {truncated['id'][:20]}... - {truncated_text_start[:40]}...")
+            elif 'mimosa tree' in truncated_text and 'mimosa tree' in csv_q.get('Question', ''):
                 print(f"✓ Found match (flexible) for: {truncated['id'][:20]}... - mimosa tree question")
-                break
-            elif any(phrase in truncated_text and phrase in csv_plain for phrase in 
-                    ['Jane Austen', 'Charles W. Chesnutt', 'Black beans', 'Lewis Carroll', 
-                     'Martín Chambi', 'Art collectives', 'Mexican', 'Beatles', 'Wigner crystal']):
+            else:
+                print(f"✓ Found match (flexible) for: {truncated['id'][:20]}...")
+        
+        if not found:
+            unmatched.append(truncated)
+            print(f"✗ No match for: {truncated['id'][:20]}... - {truncated_text_start[:40]}...")
+
+    # Fuzzy stage: MinHash/LSH over normalized prefixes resolves copies that differ
+    # from the CSV in quotes, entities or leftover tags
+    fuzzy_candidates = {}
+    if unmatched:
+        with metrics.stage('fuzzy_match') as stage:
+            fuzzy = FuzzyMatches({q['id']: q['questionText'] for q in unmatched})
+            candidates = fuzzy.merge(map_shards(csv_file, fuzzy, args.workers, snapshot=not args.no_snapshot))
+            stage['queries'] = len(unmatched)
+        metrics.observe_each('fuzzy_candidates_per_query', candidates.candidates)
+        still_unmatched = []
+        for truncated in unmatched:
+            ranked = candidates.get(truncated['id'], [])
+            fuzzy_candidates[truncated['id']] = [
+                {'similarity': round(score, 3), 'row': row_no, 'url': csv_q.get('URL', '')}
+                for score, row_no, csv_q in ranked
+            ]
+            if ranked and ranked[0][0] >= fuzzy_accept:
+                score, row_no, csv_q = ranked[0]
                 matched.append({
                     'id': truncated['id'],
                     'old_text': truncated['questionText'],
                     'new_html': csv_q.get('Question_html', ''),
                     'new_plain': csv_q.get('Question', ''),
                     'url': csv_q.get('URL', ''),
-                    'module': truncated['moduleTitle']
+                    'module': truncated['moduleTitle'],
+                    'similarity': round(score, 3)
                 })
-                found = True
-                print(f"✓ Found match (flexible) for: {truncated['id'][:20]}...")
-                break
-    
-    if not found:
-        unmatched.append(truncated)
-        print(f"✗ No match for: {truncated['id'][:20]}... - {truncated_text_start[:40]}...")
-
-print(f"\n=== SUMMARY ===")
-print(f"Matched: {len(matched)} questions")
-print(f"Unmatched: {len(unmatched)} questions")
-
-# Save matched questions for update
-with open('matched_questions_to_update.json', 'w') as f:
-    json.dump(matched, f, indent=2)
-
-# Save unmatched for manual review
-with open('unmatched_questions.json', 'w') as f:
-    json.dump(unmatched, f, indent=2)
-
-print(f"\nSaved {len(matched)} matched questions to matched_questions_to_update.json")
-print(f"Saved {len(unmatched)} unmatched questions to unmatched_questions.json")
-
-# Show sample of matched questions
-if matched:
-    print(f"\n=== SAMPLE MATCHED QUESTION ===")
-    sample = matched[0]
-    print(f"ID: {sample['id']}")
-    print(f"URL: {sample['url']}")
-    print(f"Old text (truncated): {sample['old_text'][-50:]}")
-    print(f"New text (ending): {sample['new_plain'][-100:]}")
-    print(f"Has 'Which choice': {'Which choice' in sample['new_plain']}")
\ No newline at end of file
+                print(f"✓ Found match (fuzzy {score:.2f}) for: {truncated['id'][:20]}...")
+            else:
+                still_unmatched.append(truncated)
+        unmatched = still_unmatched
+
+    print(f"\n=== SUMMARY ===")
+    print(f"Matched: {len(matched)} questions")
+    print(f"Unmatched: {len(unmatched)} questions")
+
+    # Save matched questions for update
+    with open('matched_questions_to_update.json', 'w') as f:
+        json.dump(matched, f, indent=2)
+
+    # Save ranked fuzzy candidates so borderline scores can be reviewed
+    with open('fuzzy_candidates.json', 'w') as f:
+        json.dump(fuzzy_candidates, f, indent=2)
+
+    # Save unmatched for manual review
+    with open('unmatched_questions.json', 'w') as f:
+        json.dump(unmatched, f, indent=2)
+
+    print(f"\nSaved {len(matched)} matched questions to matched_questions_to_update.json")
+    print(f"Saved {len(unmatched)} unmatched questions to unmatched_questions.json")
+
+    metrics.count('matched', len(matched))
+    metrics.count('unmatched', len(unmatched))
+    metrics.write(args.metrics)
+    print(f"Saved run metrics to {args.metrics}")
+
+    # Show sample of matched questions
+    if matched:
+        print(f"\n=== SAMPLE MATCHED QUESTION ===")
+        sample = matched[0]
+        print(f"ID: {sample['id']}")
+        print(f"URL: {sample['url']}")
+        print(f"Old text (truncated): {sample['old_text'][-50:]}")
+        print(f"New text (ending): {sample['new_plain'][-100:]}")
+        print(f"Has 'Which choice': {'Which choice' in sample['new_plain']}")
+
+
+if __name__ == '__main__':
+    main()
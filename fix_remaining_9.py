@@ -1,6 +1,8 @@
-import csv
 import json
 
+from repair.ingest import MATCH_COLUMNS
+from repair.row_index import RowIndex
+
 # Read unmatched questions
 with open('unmatched_questions.json', 'r') as f:
     unmatched = json.load(f)
@@ -15,101 +17,106 @@ csv_file = '/Users/kharisyeboah/Downloads/oneprep_final_EN_with_module.csv'
 
 remaining_matches = []
 
-with open(csv_file, 'r', encoding='utf-8') as f:
-    lines = f.readlines()
-    
-    # Parse header
-    header_line = lines[0].strip()
-    reader = csv.DictReader([header_line] + [lines[i-1] for i in graph_lines if i <= len(lines)])
+# Seek straight to the records covering those lines via the byte-offset sidecar
+index = RowIndex.open(csv_file)
+row_nos = {}
+for line in graph_lines:
+    row_no = index.row_for_line(line)
+    if row_no is None:
+        print(f"✗ Line {line} is not inside any record of {csv_file}")
+    else:
+        row_nos.setdefault(row_no, line)
+graph_rows = [index.read(row_no, MATCH_COLUMNS) for row_no in row_nos]
+index.close()
+
+for row in graph_rows:
+    question_html = row.get('Question_html', '')
+    question_text = row.get('Question', '')
     
-    for row in reader:
-        question_html = row.get('Question_html', '')
-        question_text = row.get('Question', '')
-        
-        # Match with unmatched questions
-        for unmatch in unmatched:
-            # Check if this is a graph question
-            if 'Spider Population' in question_text and 'Spider' in unmatch['questionText']:
-                remaining_matches.append({
-                    'id': unmatch['id'],
-                    'new_html': question_html,
-                    'new_plain': question_text,
-                    'url': row.get('URL', ''),
-                    'title': 'Spider Population Count'
-                })
-                print(f"✓ Found: Spider Population - {unmatch['id']}")
-            elif 'Metal Content' in question_text and 'Metal Content' in unmatch['questionText']:
-                remaining_matches.append({
-                    'id': unmatch['id'],
-                    'new_html': question_html,
-                    'new_plain': question_text,
-                    'url': row.get('URL', ''),
-                    'title': 'Metal Content of Plants'
-                })
-                print(f"✓ Found: Metal Content - {unmatch['id']}")
-            elif 'Political Orientation' in question_text and 'Political Orientation' in unmatch['questionText']:
-                remaining_matches.append({
-                    'id': unmatch['id'],
-                    'new_html': question_html,
-                    'new_plain': question_text,
-                    'url': row.get('URL', ''),
-                    'title': 'Voters Political Orientation'
-                })
-                print(f"✓ Found: Voters Political - {unmatch['id']}")
-            elif 'Power Conversion' in question_text and 'Power Conversion' in unmatch['questionText']:
-                remaining_matches.append({
-                    'id': unmatch['id'],
-                    'new_html': question_html,
-                    'new_plain': question_text,
-                    'url': row.get('URL', ''),
-                    'title': 'Power Conversion Efficiency'
-                })
-                print(f"✓ Found: Power Conversion - {unmatch['id']}")
-            elif 'Average Number of Individuals' in question_text and 'Average Number of Individuals' in unmatch['questionText']:
-                remaining_matches.append({
-                    'id': unmatch['id'],
-                    'new_html': question_html,
-                    'new_plain': question_text,
-                    'url': row.get('URL', ''),
-                    'title': 'Average Number of Individuals'
-                })
-                print(f"✓ Found: Average Number - {unmatch['id']}")
-            elif 'Attentiveness' in question_text and 'Attentiveness' in unmatch['questionText']:
-                remaining_matches.append({
-                    'id': unmatch['id'],
-                    'new_html': question_html,
-                    'new_plain': question_text,
-                    'url': row.get('URL', ''),
-                    'title': 'Mean Attentiveness Scores'
-                })
-                print(f"✓ Found: Attentiveness - {unmatch['id']}")
-            elif 'Science Research' in question_text and 'Science Research' in unmatch['questionText']:
-                remaining_matches.append({
-                    'id': unmatch['id'],
-                    'new_html': question_html,
-                    'new_plain': question_text,
-                    'url': row.get('URL', ''),
-                    'title': 'Total Science Research'
-                })
-                print(f"✓ Found: Science Research - {unmatch['id']}")
-            elif 'California Condor' in question_text and 'California Condor' in unmatch['questionText']:
-                remaining_matches.append({
-                    'id': unmatch['id'],
-                    'new_html': question_html,
-                    'new_plain': question_text,
-                    'url': row.get('URL', ''),
-                    'title': 'California Condor Populations'
-                })
-                print(f"✓ Found: California Condor - {unmatch['id']}")
-            elif 'Radial Growth' in question_text and 'Radial Growth' in unmatch['questionText']:
-                remaining_matches.append({
-                    'id': unmatch['id'],
-                    'new_html': question_html,
-                    'new_plain': question_text,
-                    'url': row.get('URL', ''),
-                    'title': 'Radial Growth of Sugar'
-                })
-                print(f"✓ Found: Radial Growth - {unmatch['id']}")
+    # Match with unmatched questions
+    for unmatch in unmatched:
+        # Check if this is a graph question
+        if 'Spider Population' in question_text and 'Spider' in unmatch['questionText']:
+            remaining_matches.append({
+                'id': unmatch['id'],
+                'new_html': question_html,
+                'new_plain': question_text,
+                'url': row.get('URL', ''),
+                'title': 'Spider Population Count'
+            })
+            print(f"✓ Found: Spider Population - {unmatch['id']}")
+        elif 'Metal Content' in question_text and 'Metal Content' in unmatch['questionText']:
+            remaining_matches.append({
+                'id': unmatch['id'],
+                'new_html': question_html,
+                'new_plain': question_text,
+                'url': row.get('URL', ''),
+                'title': 'Metal Content of Plants'
+            })
+            print(f"✓ Found: Metal Content - {unmatch['id']}")
+        elif 'Political Orientation' in question_text and 'Political Orientation' in unmatch['questionText']:
+            remaining_matches.append({
+                'id': unmatch['id'],
+                'new_html': question_html,
+                'new_plain': question_text,
+                'url': row.get('URL', ''),
+                'title': 'Voters Political Orientation'
+            })
+            print(f"✓ Found: Voters Political - {unmatch['id']}")
+        elif 'Power Conversion' in question_text and 'Power Conversion' in unmatch['questionText']:
+            remaining_matches.append({
+                'id': unmatch['id'],
+                'new_html': question_html,
+                'new_plain': question_text,
+                'url': row.get('URL', ''),
+                'title': 'Power Conversion Efficiency'
+            })
+            print(f"✓ Found: Power Conversion - {unmatch['id']}")
+        elif 'Average Number of Individuals' in question_text and 'Average Number of Individuals' in unmatch['questionText']:
+            remaining_matches.append({
+                'id': unmatch['id'],
+                'new_html': question_html,
+                'new_plain': question_text,
+                'url': row.get('URL', ''),
+                'title': 'Average Number of Individuals'
+            })
+            print(f"✓ Found: Average Number - {unmatch['id']}")
+        elif 'Attentiveness' in question_text and 'Attentiveness' in unmatch['questionText']:
+            remaining_matches.append({
+                'id': unmatch['id'],
+                'new_html': question_html,
+                'new_plain': question_text,
+                'url': row.get('URL', ''),
+                'title': 'Mean Attentiveness Scores'
+            })
+            print(f"✓ Found: Attentiveness - {unmatch['id']}")
+        elif 'Science Research' in question_text and 'Science Research' in unmatch['questionText']:
+            remaining_matches.append({
+                'id': unmatch['id'],
+                'new_html': question_html,
+                'new_plain': question_text,
+                'url': row.get('URL', ''),
+                'title': 'Total Science Research'
+            })
+            print(f"✓ Found: Science Research - {unmatch['id']}")
+        elif 'California Condor' in question_text and 'California Condor' in unmatch['questionText']:
+            remaining_matches.append({
+                'id': unmatch['id'],
+                'new_html': question_html,
+                'new_plain': question_text,
+                'url': row.get('URL', ''),
+                'title': 'California Condor Populations'
+            })
+            print(f"✓ Found: California Condor - {unmatch['id']}")
+        elif 'Radial Growth' in question_text and 'Radial Growth' in unmatch['questionText']:
+            remaining_matches.append({
+                'id': unmatch['id'],
+                'new_html': question_html,
+                'new_plain': question_text,
+                'url': row.get('URL', ''),
+                'title': 'Radial Growth of Sugar'
+            })
+            print(f"✓ Found: Radial Growth - {unmatch['id']}")
 
 # Remove duplicates based on ID
 seen_ids = set()
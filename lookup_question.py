@@ -0,0 +1,42 @@
+import argparse
+import json
+
+from repair.question_index import QuestionIndex
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Show one question from a dataset directory')
+    parser.add_argument('keys', nargs='+', help='dataset id, OnePrep URL or question id, or database cuid')
+    parser.add_argument('--dataset', default='sat_questions_by_test_correct')
+    parser.add_argument('--kind', choices=['id', 'url', 'question', 'cuid'],
+                        help='how to read the keys (default: guess)')
+    parser.add_argument('--save', metavar='FILE', help='write the found questions to FILE')
+    args = parser.parse_args()
+
+    index = QuestionIndex.open(args.dataset)
+    found = []
+    for key in args.keys:
+        location = index.locate(key, args.kind)
+        if location is None:
+            print(f"✗ {key}: not in {args.dataset}")
+            continue
+        question = index.get(key, args.kind)
+        path, start, end = location
+        found.append(question)
+        print(f"\n========== {key} ==========")
+        print(f"File: {path} (bytes {start}-{end})")
+        print(f"Test: {question.get('testName')} / {question.get('section')} / {question.get('module') or '-'}")
+        print(f"URL: {question.get('url')}")
+        print(f"Question: {question.get('questionText', '')[:400]}")
+        for letter, choice in (question.get('choices') or {}).items():
+            mark = '✓' if choice.get('isCorrect') else ' '
+            print(f"  {mark} {letter}) {choice.get('text', '')[:100]}")
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(found[0] if len(found) == 1 else found, f, indent=2)
+        print(f"\n✓ Saved {len(found)} question(s) to {args.save}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,10 @@
-import csv
 import json
 import re
 
+from repair.ingest import MATCH_COLUMNS
+from repair.shingle_index import ShingleIndex
+from repair.snapshot import Snapshot
+
 # Read the CSV file
 csv_file = '/Users/kharisyeboah/Downloads/oneprep_final_EN_with_module.csv'
 
@@ -11,16 +14,24 @@ with open('unfixed_questions.json', 'r') as f:
 
 print(f"Processing all {len(truncated_questions)} truncated questions manually...")
 
-# Read all CSV data
-all_questions = []
-with open(csv_file, 'r', encoding='utf-8') as f:
-    reader = csv.DictReader(f)
-    for row in reader:
-        all_questions.append(row)
+# Stream the CSV into the index so each pattern only verifies rows sharing its words
+index = ShingleIndex.build(Snapshot.open(csv_file).rows(MATCH_COLUMNS))
+
+print(f"Loaded {len(index.rows)} questions from CSV")
 
-print(f"Loaded {len(all_questions)} questions from CSV")
+# Manual mapping based on unique identifiers:
+# (label, phrase the truncated text must contain, phrases the CSV column must contain, CSV column)
+match_patterns = [
+    ('Mimosa tree question', 'mimosa tree', ['mimosa tree'], 'Question'),
+    ('Jane Austen question', 'Jane Austen', ['Jane Austen', '1811'], 'Question'),
+    ('Charles W. Chesnutt question', 'Charles W. Chesnutt', ['Charles W. Chesnutt'], 'Question'),
+    ('Black beans question', 'Black beans', ['Black beans', 'Phaseolus vulgaris'], 'Question'),
+    ('Torpor Bouts table question', 'Torpor Bouts', ['Torpor Bouts'], 'Question'),
+    ('Spider Population graph', None, ['Spider Population'], 'Question_html'),
+    ('Metal Content graph', None, ['Metal Content of Plants'], 'Question_html'),
+    # Add more specific patterns as needed...
+]
 
-# Manual mapping based on unique identifiers
 manual_matches = []
 
 # For each truncated question, find its match
@@ -29,83 +40,26 @@ for i, truncated in enumerate(truncated_questions, 1):
     
     print(f"\n{i}/88: Looking for question starting with: {truncated_text[:50]}...")
     
-    found = False
-    for csv_q in all_questions:
-        csv_text = csv_q.get('Question', '')
-        csv_html = csv_q.get('Question_html', '')
-        
-        # Check various matching patterns
-        if 'mimosa tree' in truncated_text and 'mimosa tree' in csv_text:
-            manual_matches.append({
-                'id': truncated['id'],
-                'new_html': csv_html,
-                'new_plain': csv_text,
-                'url': csv_q.get('URL', '')
-            })
-            print(f"  ✓ Found: Mimosa tree question")
-            found = True
-            break
-        elif 'Jane Austen' in truncated_text and 'Jane Austen' in csv_text and '1811' in csv_text:
-            manual_matches.append({
-                'id': truncated['id'],
-                'new_html': csv_html,
-                'new_plain': csv_text,
-                'url': csv_q.get('URL', '')
-            })
-            print(f"  ✓ Found: Jane Austen question")
-            found = True
-            break
-        elif 'Charles W. Chesnutt' in truncated_text and 'Charles W. Chesnutt' in csv_text:
-            manual_matches.append({
-                'id': truncated['id'],
-                'new_html': csv_html,
-                'new_plain': csv_text,
-                'url': csv_q.get('URL', '')
-            })
-            print(f"  ✓ Found: Charles W. Chesnutt question")
-            found = True
-            break
-        elif 'Black beans' in truncated_text and 'Black beans' in csv_text and 'Phaseolus vulgaris' in csv_text:
-            manual_matches.append({
-                'id': truncated['id'],
-                'new_html': csv_html,
-                'new_plain': csv_text,
-                'url': csv_q.get('URL', '')
-            })
-            print(f"  ✓ Found: Black beans question")
-            found = True
-            break
-        elif 'Torpor Bouts' in truncated_text and 'Torpor Bouts' in csv_text:
-            manual_matches.append({
-                'id': truncated['id'],
-                'new_html': csv_html,
-                'new_plain': csv_text,
-                'url': csv_q.get('URL', '')
-            })
-            print(f"  ✓ Found: Torpor Bouts table question")
-            found = True
-            break
-        elif 'Spider Population' in csv_html:
-            manual_matches.append({
-                'id': truncated['id'],
-                'new_html': csv_html,
-                'new_plain': csv_text,
-                'url': csv_q.get('URL', '')
-            })
-            print(f"  ✓ Found: Spider Population graph")
-            found = True
-            break
-        elif 'Metal Content of Plants' in csv_html:
-            manual_matches.append({
-                'id': truncated['id'],
-                'new_html': csv_html,
-                'new_plain': csv_text,
-                'url': csv_q.get('URL', '')
-            })
-            print(f"  ✓ Found: Metal Content graph")
-            found = True
-            break
-        # Add more specific patterns as needed...
+    # The earliest CSV row matching any applicable pattern wins
+    best = None
+    for label, required, phrases, column in match_patterns:
+        if required is not None and required not in truncated_text:
+            continue
+        row_no = index.find_first(phrases[0], lambda csv_q: all(phrase in csv_q.get(column, '') for phrase in phrases))
+        if row_no is not None and (best is None or row_no < best[0]):
+            best = (row_no, label)
+    
+    found = best is not None
+    if found:
+        row_no, label = best
+        csv_q = index.rows[row_no]
+        manual_matches.append({
+            'id': truncated['id'],
+            'new_html': csv_q.get('Question_html', ''),
+            'new_plain': csv_q.get('Question', ''),
+            'url': csv_q.get('URL', '')
+        })
+        print(f"  ✓ Found: {label}")
         
     if not found:
         print(f"  ✗ Not found yet - needs manual check")
@@ -0,0 +1,114 @@
+import argparse
+import asyncio
+import csv
+import json
+import os
+import time
+
+from complete_fix_88 import search_patterns
+from repair.fetcher import PAGE_DIR, Fetcher, ResponseCache, load_cookies
+from repair.patterns import PatternScan, PatternTable
+from repair.question_pages import QUESTION_CONTAINER, PageRecords
+
+URL_SOURCES = ['truncated_questions_urls.csv', 'all_88_final.json']
+
+
+def read_urls(path):
+    # URL column of a CSV, or the "url" of every entry in a JSON list
+    if path.endswith('.csv'):
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            return [row['URL'] for row in csv.DictReader(f) if row.get('URL')]
+    with open(path, 'r', encoding='utf-8') as f:
+        return [entry['url'] for entry in json.load(f) if entry.get('url')]
+
+
+async def fetch_and_scan(fetcher, urls, pages, table):
+    # Each page is matched as soon as it arrives; scans are merged in URL order
+    scans, failed = [], []
+    done = 0
+    try:
+        async for result in fetcher.fetch_all(urls):
+            done += 1
+            record = pages.record(result.url, result.text()) if result.ok else None
+            if record is not None:
+                scans.append((record.row_no, table.scan([record])))
+            elif result.ok:
+                failed.append({'url': result.url, 'error': 'no question container in page'})
+            else:
+                failed.append({'url': result.url, 'status': result.status, 'error': result.error})
+            if done % 100 == 0:
+                print(f"  {done}/{len(pages.row_nos)} pages")
+    finally:
+        # Pooled connections belong to this event loop
+        fetcher.close()
+    scans.sort(key=lambda item: item[0])
+    return PatternScan.merge(table, [scan for _, scan in scans]), failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Re-fetch source question pages and match truncated questions')
+    parser.add_argument('--urls', nargs='*', default=URL_SOURCES, help='URL lists (.csv with a URL column or .json)')
+    parser.add_argument('--origin', help='send requests to this server instead, e.g. the fixture server')
+    parser.add_argument('--concurrency', type=int, default=16, help='requests in flight overall')
+    parser.add_argument('--per-host', type=int, default=4, help='open connections per host')
+    parser.add_argument('--rate', type=float, default=2.0, help='request starts per second per host (0: unlimited)')
+    parser.add_argument('--retries', type=int, default=3)
+    parser.add_argument('--timeout', type=float, default=30.0)
+    parser.add_argument('--cookies', default='cookies.txt', help='Netscape cookie file sent with requests')
+    parser.add_argument('--cache', default=PAGE_DIR, help='on-disk page cache')
+    parser.add_argument('--no-cache', action='store_true', help='fetch every page again and cache nothing')
+    parser.add_argument('--container', default=QUESTION_CONTAINER, help='class of the question element on a page')
+    parser.add_argument('--output', default='refetched_updates.json')
+    args = parser.parse_args()
+
+    urls = []
+    for path in args.urls:
+        if os.path.exists(path):
+            urls.extend(read_urls(path))
+        else:
+            print(f"⚠ {path} not found")
+    pages = PageRecords(urls, args.container)
+    print(f"Fetching {len(pages.row_nos)} pages...")
+
+    with open('unfixed_questions.json', 'r') as f:
+        truncated_questions = json.load(f)
+    table = PatternTable({q['id']: search_patterns.get(q['id'], 'research.*student.*notes') for q in truncated_questions})
+
+    cache = None if args.no_cache else ResponseCache(args.cache)
+    fetcher = Fetcher(args.concurrency, args.per_host, args.rate, args.retries, args.timeout,
+                      cache=cache, cookies=load_cookies(args.cookies), origin=args.origin)
+    start = time.time()
+    scan, failed = asyncio.run(fetch_and_scan(fetcher, list(pages.row_nos), pages, table))
+    elapsed = time.time() - start
+
+    cached = cache.hits if cache is not None else 0
+    print(f"\nFetched {scan.rows_scanned} pages in {elapsed:.1f}s "
+          f"({cached} from cache, {fetcher.requests} requests, {fetcher.retried} retries, {len(failed)} failed)")
+    for failure in failed[:10]:
+        print(f"✗ {failure['url']}: {failure.get('status') or ''} {failure['error'] or ''}")
+
+    updates = []
+    for truncated in truncated_questions:
+        page = scan.first(truncated['id'])
+        if page is not None:
+            updates.append({
+                'id': truncated['id'],
+                'new_html': page.get('Question_html', ''),
+                'new_plain': page.get('Question', ''),
+                'url': page.get('URL', '')
+            })
+    for pattern, count, ids in scan.ambiguous():
+        print(f"⚠ Ambiguous: '{pattern[:40]}' matched {count} pages (used by {len(ids)} ids)")
+
+    print(f"\nMatched {len(updates)} out of {len(truncated_questions)} truncated questions")
+    with open(args.output, 'w') as f:
+        json.dump(updates, f, indent=2)
+    print(f"✓ Saved to {args.output}")
+    if failed:
+        with open('refetch_failures.json', 'w') as f:
+            json.dump(failed, f, indent=2)
+        print(f"Saved {len(failed)} failed pages to refetch_failures.json")
+
+
+if __name__ == '__main__':
+    main()
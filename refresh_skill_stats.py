@@ -0,0 +1,64 @@
+import argparse
+import os
+import time
+
+from repair.db_writer import BATCH_SIZE, connect
+from repair.exam_standin import ExamStandIn
+from repair.skill_stats import STANDIN_SCHEMA, SkillStats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Refresh the per-skill and per-domain performance summary tables')
+    parser.add_argument('--database', default=os.environ.get('DATABASE_URL'),
+                        help='postgresql://... or sqlite:///stand-in.db (default: $DATABASE_URL)')
+    parser.add_argument('--rebuild', action='store_true',
+                        help='recompute from every graded answer (needed after rescore_impacted.py changes isCorrect)')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--dry-run', action='store_true', help='compute everything, then roll back')
+    parser.add_argument('--populate-standin', type=int, metavar='STUDENTS',
+                        help='first fill an empty sqlite stand-in with this many students\' graded attempts')
+    parser.add_argument('--add-students', type=int, metavar='STUDENTS',
+                        help='first add this many students\' attempts to a sqlite stand-in')
+    parser.add_argument('--pending', type=int, default=0, metavar='STUDENTS',
+                        help='of the added students, leave this many with an exam in progress (ungraded answers)')
+    parser.add_argument('--submit-pending', action='store_true',
+                        help='first grade and complete the in-progress exams of a sqlite stand-in')
+    args = parser.parse_args()
+
+    if not args.database:
+        parser.error('no --database given and DATABASE_URL is not set')
+    connection, paramstyle = connect(args.database)
+    try:
+        if args.database.startswith('sqlite:'):
+            for statement in STANDIN_SCHEMA:
+                connection.execute(statement)
+        elif args.populate_standin or args.add_students or args.submit_pending:
+            parser.error('--populate-standin / --add-students / --submit-pending only write to a sqlite:// stand-in')
+        if args.populate_standin:
+            sizes = ExamStandIn().populate(connection, [], students=args.populate_standin)
+            print(f"✓ Stand-in filled: {sizes['assignments']} assignments, {sizes['answers']} answers")
+        if args.add_students:
+            sizes = ExamStandIn(seed=int(time.time())).add_students(connection, args.add_students,
+                                                                    pending=args.pending)
+            print(f"✓ Added {sizes['assignments']} assignments, {sizes['answers']} answers")
+        if args.submit_pending:
+            print(f"✓ Submitted {ExamStandIn().submit_pending(connection)} in-progress assignment(s)")
+
+        start = time.time()
+        stats = SkillStats(connection, paramstyle, args.batch_size)
+        result = stats.refresh(rebuild=args.rebuild, dry_run=args.dry_run)
+        elapsed = time.time() - start
+    finally:
+        connection.close()
+
+    mode = 'Rebuilt from' if result['rebuilt'] else 'Refolded'
+    print(f"{mode} {result['answers']} graded answers of {result['students']} students "
+          f"({result['total']} classified answers in total) in {elapsed:.2f}s")
+    print(f"  {result['skills']} skills, {result['domains']} domains changed "
+          f"with {stats.statements} statement(s)" + (' (dry run, rolled back)' if args.dry_run else ''))
+    if not result['skills'] and not result['domains']:
+        print("  Everything already up to date")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,2 @@
+# Shared building blocks for the OnePrep CSV repair scripts
+# (fix_all_truncated.py, complete_fix_88.py, manual_fix_all_88.py, ...)
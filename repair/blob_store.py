@@ -0,0 +1,153 @@
+import hashlib
+import json
+import os
+
+STORE_DIR = os.path.join('.repair_cache', 'datasets')
+
+
+def encode_value(value):
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def blob_key(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _write_json(path, data):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+class BlobStore:
+    """Content-addressed store for the sat_questions_by_test* datasets.
+
+    Every distinct field value is kept once, keyed by the hash of its JSON
+    encoding, in an append-only pack file. A question record is itself a
+    blob listing (field, value hash) pairs, and a dataset version is a
+    manifest of file name -> record hashes. Versions that share most of
+    their questions share their blobs, so another extraction variant only
+    adds the values that changed plus its manifest.
+    """
+
+    def __init__(self, root=STORE_DIR):
+        self.root = root
+        self.manifest_dir = os.path.join(root, 'manifests')
+        os.makedirs(self.manifest_dir, exist_ok=True)
+        self.pack_path = os.path.join(root, 'blobs.pack')
+        self.index_path = os.path.join(root, 'blobs.idx.json')
+        self.index = {}           # key -> [offset, length] in the pack
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                self.index = json.load(f)
+        self._pack = open(self.pack_path, 'a+b')
+        # Blobs appended after the last saved index are unreferenced; drop them
+        end = max((offset + length for offset, length in self.index.values()), default=0)
+        self._pack.truncate(end)
+        self._size = end
+        self._dirty = False
+        self._memo = {}           # key -> decoded immutable value
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def put(self, value):
+        data = encode_value(value)
+        key = blob_key(data)
+        if key not in self.index:
+            self._pack.write(data)
+            self.index[key] = [self._size, len(data)]
+            self._size += len(data)
+            self._dirty = True
+        return key
+
+    def get(self, key):
+        if key in self._memo:
+            return self._memo[key]
+        if self._dirty:
+            self._pack.flush()
+        offset, length = self.index[key]
+        value = json.loads(os.pread(self._pack.fileno(), length, offset))
+        if not isinstance(value, (dict, list)):
+            self._memo[key] = value   # passageHtml/fullHtml etc. decode once
+        return value
+
+    def put_record(self, record):
+        return self.put([[field, self.put(value)] for field, value in record.items()])
+
+    def get_record(self, key):
+        return {field: self.get(value_key) for field, value_key in self.get(key)}
+
+    def flush(self):
+        if not self._dirty:
+            return
+        self._pack.flush()
+        os.fsync(self._pack.fileno())
+        _write_json(self.index_path, self.index)
+        self._dirty = False
+
+    def close(self):
+        if self._pack is None:
+            return
+        self.flush()
+        self._pack.close()
+        self._pack = None
+
+    # Dataset versions
+
+    def _manifest_path(self, version):
+        return os.path.join(self.manifest_dir, version + '.json')
+
+    def versions(self):
+        return sorted(name[:-len('.json')] for name in os.listdir(self.manifest_dir)
+                      if name.endswith('.json'))
+
+    def manifest(self, version):
+        with open(self._manifest_path(version), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def import_dataset(self, directory, version=None):
+        # Store every <directory>/*.json file; returns (manifest, bytes added to the pack)
+        version = version or os.path.basename(os.path.normpath(directory))
+        size_before = self._size
+        files = {}
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith('.json'):
+                continue
+            with open(os.path.join(directory, name), 'r', encoding='utf-8') as f:
+                files[name] = [self.put_record(record) for record in json.load(f)]
+        manifest = {'version': version, 'files': files}
+        self.flush()
+        _write_json(self._manifest_path(version), manifest)
+        return manifest, self._size - size_before
+
+    def load_file(self, version, name, manifest=None):
+        manifest = manifest or self.manifest(version)
+        return [self.get_record(key) for key in manifest['files'][name]]
+
+    def iter_questions(self, version):
+        # (file name, question record) in manifest order, built one at a time
+        manifest = self.manifest(version)
+        for name, keys in manifest['files'].items():
+            for key in keys:
+                yield name, self.get_record(key)
+
+    def export(self, version, directory):
+        # Materialize a version back into the JSON.stringify(x, null, 2) files
+        os.makedirs(directory, exist_ok=True)
+        manifest = self.manifest(version)
+        for name in manifest['files']:
+            questions = self.load_file(version, name, manifest)
+            with open(os.path.join(directory, name), 'w', encoding='utf-8') as f:
+                f.write(json.dumps(questions, indent=2, ensure_ascii=False))
+        return list(manifest['files'])
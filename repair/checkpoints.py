@@ -0,0 +1,193 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from array import array
+
+from repair.ingest import MATCH_COLUMNS
+from repair.normalized_cache import CACHE_DIR
+from repair.parallel import map_shards
+from repair.patterns import SEARCH_COLUMNS, PatternScan, PatternTable
+from repair.snapshot import Snapshot
+
+# Bump when PatternTable.scan changes what counts as a match
+MATCH_VERSION = 1
+HASH_SIZE = 16
+
+
+def pattern_hash(pattern, flags, columns=SEARCH_COLUMNS):
+    data = json.dumps([MATCH_VERSION, pattern, int(flags), list(columns)])
+    return hashlib.blake2b(data.encode('utf-8'), digest_size=HASH_SIZE).hexdigest()
+
+
+def row_hash(row, columns=MATCH_COLUMNS):
+    digest = hashlib.blake2b(digest_size=HASH_SIZE)
+    for column in columns:
+        digest.update((row.get(column, '') or '').encode('utf-8'))
+        digest.update(b'\x1f')
+    return digest.digest()
+
+
+class MatchCheckpoints:
+    """Pattern match results persisted per (CSV digest, question id, pattern hash).
+
+    For every export seen it also keeps a hash of each row's matched
+    columns, so results computed against an older export can be carried
+    over to a new one by re-examining only the rows that are new or
+    changed.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(CACHE_DIR, f'matches-v{MATCH_VERSION}.sqlite')
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self._db = sqlite3.connect(self.path)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('CREATE TABLE IF NOT EXISTS exports '
+                         '(csv_digest TEXT PRIMARY KEY, row_hashes BLOB, created REAL)')
+        self._db.execute('CREATE TABLE IF NOT EXISTS matches '
+                         '(csv_digest TEXT, question_id TEXT, pattern_hash TEXT, rows BLOB, '
+                         'PRIMARY KEY (csv_digest, question_id, pattern_hash))')
+        self._db.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def row_hashes(self, csv_digest):
+        found = self._db.execute('SELECT row_hashes FROM exports WHERE csv_digest = ?', (csv_digest,)).fetchone()
+        if found is None:
+            return None
+        data = found[0]
+        return [data[i:i + HASH_SIZE] for i in range(0, len(data), HASH_SIZE)]
+
+    def save_export(self, csv_digest, hashes):
+        self._db.execute('INSERT OR REPLACE INTO exports VALUES (?, ?, ?)',
+                         (csv_digest, b''.join(hashes), time.time()))
+        self._db.commit()
+
+    def get(self, csv_digest, question_id, phash):
+        found = self._db.execute('SELECT rows FROM matches WHERE csv_digest = ? AND question_id = ? '
+                                 'AND pattern_hash = ?', (csv_digest, question_id, phash)).fetchone()
+        return None if found is None else array('I', found[0])
+
+    def latest(self, question_id, phash, exclude_digest):
+        # (csv digest, rows) of the newest result for this question from another export
+        found = self._db.execute(
+            'SELECT m.csv_digest, m.rows FROM matches m JOIN exports e ON e.csv_digest = m.csv_digest '
+            'WHERE m.question_id = ? AND m.pattern_hash = ? AND m.csv_digest <> ? '
+            'ORDER BY e.created DESC LIMIT 1', (question_id, phash, exclude_digest)).fetchone()
+        return None if found is None else (found[0], array('I', found[1]))
+
+    def put_many(self, csv_digest, entries):
+        # entries: (question id, pattern hash, row numbers); committed together
+        self._db.executemany('INSERT OR REPLACE INTO matches VALUES (?, ?, ?, ?)',
+                             [(csv_digest, question_id, phash, array('I', rows).tobytes())
+                              for question_id, phash, rows in entries])
+        self._db.commit()
+
+
+def _scan_rows(table, snapshot, row_nos):
+    return table.scan(snapshot.record(row_no, MATCH_COLUMNS) for row_no in row_nos)
+
+
+def _add_evals(totals, scan):
+    for pattern, evals in scan.regex_evals.items():
+        totals[pattern] = totals.get(pattern, 0) + evals
+
+
+def resume_scan(csv_file, table, checkpoints, workers=1, log=print, metrics=None):
+    """PatternScan of `table` over the CSV, reusing and extending checkpoints.
+
+    Questions whose (export, pattern) result is stored are not matched
+    again. Results from an earlier export are carried over, re-examining
+    only rows whose content is new in this export. Everything else is
+    matched from scratch in a single pass over the CSV and checkpointed
+    once that pass finishes.
+    Checkpoint reuse is recorded in `metrics` (a repair.metrics.Metrics)
+    if one is given.
+    """
+    snapshot = Snapshot.open(csv_file)
+    digest = snapshot.header['csv_digest']
+    hashes = checkpoints.row_hashes(digest)
+    if hashes is None:
+        hashes = [row_hash(row) for row in snapshot.rows(MATCH_COLUMNS)]
+        checkpoints.save_export(digest, hashes)
+
+    rows_by_pattern = {}
+    carried = {}                  # older digest -> [(pattern, question ids, old rows)]
+    fresh = {}                    # pattern -> question ids
+    for pattern, question_ids in table.keys_by_pattern.items():
+        phash = pattern_hash(pattern, table.flags)
+        stored = checkpoints.get(digest, question_ids[0], phash)
+        if stored is not None:
+            rows_by_pattern[pattern] = stored
+            missing = [question_id for question_id in question_ids[1:]
+                       if checkpoints.get(digest, question_id, phash) is None]
+            if missing:
+                checkpoints.put_many(digest, [(question_id, phash, stored) for question_id in missing])
+            continue
+        previous = checkpoints.latest(question_ids[0], phash, digest)
+        if previous is not None and checkpoints.row_hashes(previous[0]) is not None:
+            carried.setdefault(previous[0], []).append((pattern, question_ids, previous[1]))
+        else:
+            fresh[pattern] = question_ids
+    reused = len(rows_by_pattern)
+
+    # Carry results over from older exports: known rows keep their verdict
+    regex_evals = {}
+    rows_by_hash = {}
+    if carried:
+        for row_no, h in enumerate(hashes):
+            rows_by_hash.setdefault(h, []).append(row_no)
+    for old_digest, entries in carried.items():
+        old_hashes = checkpoints.row_hashes(old_digest)
+        known = set(old_hashes)
+        changed_rows = [row_no for row_no, h in enumerate(hashes) if h not in known]
+        subset = PatternTable({question_ids[0]: pattern for pattern, question_ids, _ in entries},
+                              table.flags, record_rows=True)
+        scan = _scan_rows(subset, snapshot, changed_rows)
+        _add_evals(regex_evals, scan)
+        saved = []
+        for pattern, question_ids, old_rows in entries:
+            matched = {old_hashes[row_no] for row_no in old_rows}
+            rows = sorted([row_no for h in matched for row_no in rows_by_hash.get(h, ())]
+                          + list(scan.matched_rows.get(pattern, ())))
+            rows_by_pattern[pattern] = array('I', rows)
+            phash = pattern_hash(pattern, table.flags)
+            saved.extend((question_id, phash, rows) for question_id in question_ids)
+        checkpoints.put_many(digest, saved)
+        log(f"  Carried {len(entries)} patterns over from export {old_digest[:12]}, "
+            f"re-examined {len(changed_rows)} new or changed rows")
+
+    # Match the rest from scratch in one pass over the CSV
+    if fresh:
+        subset = PatternTable({question_ids[0]: pattern for pattern, question_ids in fresh.items()},
+                              table.flags, record_rows=True)
+        scan = PatternScan.merge(subset, map_shards(csv_file, subset.scan, workers))
+        _add_evals(regex_evals, scan)
+        saved = []
+        for pattern, question_ids in fresh.items():
+            rows = scan.matched_rows.get(pattern, array('I'))
+            rows_by_pattern[pattern] = rows
+            phash = pattern_hash(pattern, table.flags)
+            saved.extend((question_id, phash, rows) for question_id in question_ids)
+        checkpoints.put_many(digest, saved)
+
+    carried_count = sum(len(entries) for entries in carried.values())
+    log(f"  Patterns: {reused} from checkpoint, {carried_count} carried over, "
+        f"{len(fresh)} matched from scratch")
+    if metrics is not None:
+        metrics.cache('match_checkpoints', reused, carried_count + len(fresh))
+        metrics.count('patterns_carried_over', carried_count)
+    scan = PatternScan.from_matches(table, rows_by_pattern,
+                                    lambda row_no: snapshot.record(row_no, MATCH_COLUMNS), len(snapshot))
+    scan.regex_evals = regex_evals
+    return scan
@@ -0,0 +1,130 @@
+import html
+import re
+from html.parser import HTMLParser
+
+# Tags kept as-is (minus attributes); anything else is unwrapped to its content
+SEMANTIC_TAGS = {
+    'p', 'br', 'em', 'i', 'strong', 'b', 'u', 's', 'sub', 'sup', 'span',
+    'ul', 'ol', 'li', 'table', 'thead', 'tbody', 'tr', 'th', 'td', 'img', 'figure',
+}
+# MathML keeps its presentation attributes; the rest only these
+MATHML_TAGS = {
+    'math', 'semantics', 'annotation', 'mrow', 'mi', 'mn', 'mo', 'ms', 'mtext', 'mspace',
+    'msup', 'msub', 'msubsup', 'mfrac', 'msqrt', 'mroot', 'mover', 'munder', 'munderover',
+    'mtable', 'mtr', 'mtd', 'mstyle', 'mpadded', 'mphantom', 'menclose', 'mfenced',
+}
+KEPT_ATTRS = {
+    'span': {'aria-label', 'role'},
+    'img': {'src', 'alt', 'width', 'height'},
+    'td': {'colspan', 'rowspan'},
+    'th': {'colspan', 'rowspan', 'scope'},
+}
+VOID_TAGS = {'br', 'img', 'mspace'}
+
+# Wrapper OnePrep puts around the actual choice content
+CONTENT_CLASS = 'self-center'
+WS_RE = re.compile(r'\s+')
+
+
+def _is_interactive(name):
+    # Alpine.js bindings and handlers: x-data, :class, @click, ...
+    return name.startswith(('x-', ':', '@', 'on')) or name in ('class', 'style')
+
+
+class _ChoiceCompactor(HTMLParser):
+    def __init__(self, find_content):
+        super().__init__(convert_charrefs=True)
+        self.find_content = find_content
+        self.capturing = not find_content
+        self.depth = 0            # nesting depth inside the content wrapper
+        self.open_tags = []       # kept tags, to drop ones that end up empty
+        self.out = []
+        self.found = False
+
+    def handle_starttag(self, tag, attrs):
+        if not self.capturing:
+            classes = (dict(attrs).get('class') or '').split()
+            if tag == 'div' and CONTENT_CLASS in classes:
+                self.capturing = self.found = True
+                self.depth = 1
+            return
+        if tag not in VOID_TAGS:
+            self.depth += 1
+        self._emit_start(tag, attrs)
+
+    def handle_startendtag(self, tag, attrs):
+        if self.capturing:
+            self._emit_start(tag, attrs, closed=True)
+
+    def handle_endtag(self, tag):
+        if not self.capturing or tag in VOID_TAGS:
+            return
+        self.depth -= 1
+        if self.find_content and self.depth == 0:
+            self.capturing = False
+            return
+        if self.open_tags and self.open_tags[-1][0] == tag:
+            _, start = self.open_tags.pop()
+            if tag not in ('td', 'th') and not ''.join(self.out[start + 1:]).strip():
+                del self.out[start]   # empty element: keep only its whitespace
+            else:
+                self.out.append(f'</{tag}>')
+
+    def handle_data(self, data):
+        if self.capturing:
+            self.out.append(html.escape(data, quote=False))
+
+    def _emit_start(self, tag, attrs, closed=False):
+        if tag in MATHML_TAGS:
+            kept = [(name, value) for name, value in attrs if not _is_interactive(name)]
+        elif tag in SEMANTIC_TAGS:
+            allowed = KEPT_ATTRS.get(tag, ())
+            kept = [(name, value) for name, value in attrs if name in allowed]
+        else:
+            return
+        if tag == 'span' and not kept:
+            return   # a bare span carries no meaning
+        rendered = ''.join(f' {name}="{html.escape(value or "", quote=True)}"' for name, value in kept)
+        if tag in VOID_TAGS or closed:
+            self.out.append(f'<{tag}{rendered}/>' if tag != 'br' else '<br/>')
+        else:
+            self.open_tags.append((tag, len(self.out)))
+            self.out.append(f'<{tag}{rendered}>')
+
+
+def _feed(markup, find_content):
+    parser = _ChoiceCompactor(find_content)
+    parser.feed(markup)
+    parser.close()
+    return parser
+
+
+def compact_choice_html(markup):
+    """Reduce a scraped answer-choice cell to its semantic content.
+
+    The OnePrep export wraps every choice in Alpine.js answer-selection UI
+    (x-data, :class, @click, status badges, delete buttons). Only the
+    content of the `self-center` div is kept, with text, emphasis, inline
+    math and images; wrappers and interactive attributes are dropped.
+    Markup without that wrapper is sanitized as a whole.
+    """
+    if not markup or '<' not in markup:
+        return markup
+    parser = _feed(markup, find_content=True)
+    if not parser.found:
+        parser = _feed(markup, find_content=False)
+    compacted = WS_RE.sub(' ', ''.join(parser.out)).strip()
+    # Whitespace right inside block tags and around <br/> is not significant
+    return re.sub(r'\s*(<br/>|</?(?:p|li|ul|ol|table|tr|td|th)>)\s*', r'\1', compacted)
+
+
+def compact_choices(question):
+    # Compact every choice's html in a sat_questions_by_test* record, in place
+    changed = 0
+    for choice in (question.get('choices') or {}).values():
+        markup = choice.get('html') or ''
+        compacted = compact_choice_html(markup)
+        if compacted != markup:
+            choice['html'] = compacted
+            changed += 1
+    return changed
@@ -0,0 +1,219 @@
+import sys
+from array import array
+
+from repair.ingest import CsvRecord, iter_rows
+from repair.snapshot import Snapshot
+
+# Columns with a handful of distinct values repeated down the whole export
+CATEGORICAL_COLUMNS = ('Module', 'Question Type', 'Correct Answer')
+
+
+class CategoryColumn:
+    """Dictionary-encoded column: one small int code per row.
+
+    Every row with the same value gets back the same (interned) string
+    object, so materialized rows share it too.
+    """
+
+    def __init__(self):
+        self.values = []
+        self.index = {}
+        self.codes = array('H')
+
+    def __len__(self):
+        return len(self.codes)
+
+    def append(self, value):
+        code = self.index.get(value)
+        if code is None:
+            if len(self.values) > 0xFFFF and self.codes.typecode == 'H':
+                # Too many distinct values to be a category; widen the codes
+                self.codes = array('I', self.codes)
+            code = self.index[value] = len(self.values)
+            self.values.append(sys.intern(value))
+        self.codes.append(code)
+
+    def value(self, row_no):
+        return self.values[self.codes[row_no]]
+
+    def nbytes(self):
+        return self.codes.itemsize * len(self.codes) + sum(len(value) for value in self.values)
+
+
+class TextColumn:
+    """Column packed as one UTF-8 blob plus end offsets; decoded on access."""
+
+    def __init__(self):
+        self.data = bytearray()
+        self.ends = array('Q')
+
+    def __len__(self):
+        return len(self.ends)
+
+    def append(self, value):
+        self.data += value.encode('utf-8')
+        self.ends.append(len(self.data))
+
+    def value(self, row_no):
+        start = self.ends[row_no - 1] if row_no else 0
+        return self.data[start:self.ends[row_no]].decode('utf-8')
+
+    def nbytes(self):
+        return len(self.data) + 8 * len(self.ends)
+
+
+class SnapshotColumn:
+    # A column left in the memory-mapped snapshot; costs nothing until read
+    def __init__(self, snapshot, pos):
+        self.snapshot = snapshot
+        self.pos = pos
+
+    def __len__(self):
+        return len(self.snapshot)
+
+    def value(self, row_no):
+        return self.snapshot.value(row_no, self.pos)
+
+    def nbytes(self):
+        return 0
+
+
+class CorpusRow:
+    """A view of one Corpus row that reads like a csv.DictReader dict.
+
+    Holds only the corpus and the row number; values are looked up (and
+    text decoded) when a column is read. Pickles into a plain CsvRecord.
+    """
+
+    __slots__ = ('corpus', 'row_no')
+
+    def __init__(self, corpus, row_no):
+        self.corpus = corpus
+        self.row_no = row_no
+
+    @property
+    def line_no(self):
+        return self.corpus.lines[self.row_no]
+
+    def get(self, column, default=None):
+        found = self.corpus.columns.get(column)
+        return default if found is None else found.value(self.row_no)
+
+    def __getitem__(self, column):
+        return self.corpus.columns[column].value(self.row_no)
+
+    def __contains__(self, column):
+        return column in self.corpus.columns
+
+    def keys(self):
+        return self.corpus.columns.keys()
+
+    def items(self):
+        return [(name, column.value(self.row_no)) for name, column in self.corpus.columns.items()]
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def __reduce__(self):
+        names = list(self.corpus.columns)
+        values = tuple(self.corpus.columns[name].value(self.row_no) for name in names)
+        return CsvRecord, (self.row_no, self.line_no, {name: i for i, name in enumerate(names)}, values)
+
+
+class Corpus:
+    """The rows of a CSV export stored column by column.
+
+    A drop-in for a list of csv.DictReader rows: len(), indexing and
+    iteration give CorpusRow views with get/[]/in/keys/items. Categorical
+    columns (Module, Question Type, Correct Answer) are dictionary-encoded;
+    the other columns stay in the memory-mapped Snapshot when there is one
+    and are otherwise packed as UTF-8, so no per-row string exists until a
+    value is read. The HTML columns, most of an export's bytes, are only
+    decoded by the rows that look at them.
+    """
+
+    def __init__(self, columns, lines, snapshot=None):
+        self.columns = columns
+        self.lines = lines
+        self.snapshot = snapshot
+
+    @classmethod
+    def load(cls, csv_file, columns=None, categorical=CATEGORICAL_COLUMNS, snapshot=True):
+        if snapshot:
+            return cls.from_snapshot(Snapshot.open(csv_file), columns, categorical)
+        return cls.from_records(iter_rows(csv_file, columns), categorical)
+
+    @classmethod
+    def from_snapshot(cls, snapshot, columns=None, categorical=CATEGORICAL_COLUMNS):
+        layout = snapshot.record(0, columns).columns if len(snapshot) else {}
+        stored = {}
+        for name, pos in layout.items():
+            if name in categorical:
+                column = stored[name] = CategoryColumn()
+                for row_no in range(len(snapshot)):
+                    column.append(snapshot.value(row_no, pos))
+            else:
+                stored[name] = SnapshotColumn(snapshot, pos)
+        return cls(stored, snapshot.lines, snapshot)
+
+    @classmethod
+    def from_records(cls, records, categorical=CATEGORICAL_COLUMNS):
+        # Pack any iterable of CsvRecord-like rows (iter_rows, Snapshot.rows, ...)
+        stored = None
+        lines = array('I')
+        for record in records:
+            if stored is None:
+                stored = {name: CategoryColumn() if name in categorical else TextColumn() for name in record.columns}
+            lines.append(record.line_no)
+            for name, column in stored.items():
+                column.append(record[name])
+        return cls(stored or {}, lines)
+
+    def __len__(self):
+        return len(self.lines)
+
+    def __getitem__(self, row_no):
+        if isinstance(row_no, slice):
+            return [CorpusRow(self, n) for n in range(*row_no.indices(len(self)))]
+        if row_no < 0:
+            row_no += len(self)
+        if not 0 <= row_no < len(self):
+            raise IndexError('corpus row out of range')
+        return CorpusRow(self, row_no)
+
+    def __iter__(self):
+        for row_no in range(len(self)):
+            yield CorpusRow(self, row_no)
+
+    def rows(self, start=0, stop=None):
+        stop = len(self) if stop is None else min(stop, len(self))
+        for row_no in range(start, stop):
+            yield CorpusRow(self, row_no)
+
+    def column(self, name):
+        # Every value of one column, in row order
+        column = self.columns[name]
+        return (column.value(row_no) for row_no in range(len(self)))
+
+    def categories(self, name):
+        # {value: rows} of a dictionary-encoded column
+        column = self.columns[name]
+        counts = [0] * len(column.values)
+        for code in column.codes:
+            counts[code] += 1
+        return dict(zip(column.values, counts))
+
+    def nbytes(self):
+        # Bytes held in process; snapshot-backed columns live in the page cache instead
+        return 4 * len(self.lines) + sum(column.nbytes() for column in self.columns.values())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self.snapshot is not None:
+            self.snapshot.close()
+            self.snapshot = None
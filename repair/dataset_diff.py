@@ -0,0 +1,149 @@
+import json
+import os
+
+from repair.blob_store import blob_key, encode_value
+from repair.question_index import CUID_SOURCES, iter_spans
+
+# How an update file's entries map onto dataset fields
+UPDATE_FIELDS = {
+    'new_html': ('passageHtml', 'fullHtml'),
+    'new_plain': ('fullText',),
+}
+
+
+def iter_dataset(directory):
+    # (file name, record) for every question, one file in memory at a time
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith('.json'):
+            continue
+        with open(os.path.join(directory, name), 'r', encoding='utf-8') as f:
+            text = f.read()
+        for record, _, _ in iter_spans(text):
+            yield name, record
+
+
+def load_updates(update_files):
+    # url -> {field: value} from final_88_updates.json-style files, later files winning
+    updates = {}
+    for path in update_files:
+        with open(path, 'r', encoding='utf-8') as f:
+            entries = json.load(f)
+        for entry in entries:
+            fields = updates.setdefault(entry['url'], {})
+            for source, targets in UPDATE_FIELDS.items():
+                if source in entry:
+                    for target in targets:
+                        fields[target] = entry[source]
+    return updates
+
+
+def apply_updates(records, updates):
+    for name, record in records:
+        fields = updates.get(record.get('url'))
+        if fields:
+            record = dict(record, **fields)
+        yield name, record
+
+
+def load_cuids(sources=CUID_SOURCES):
+    cuids = {}
+    for source in sources:
+        if not os.path.exists(source):
+            continue
+        with open(source, 'r', encoding='utf-8') as f:
+            entries = json.load(f)
+        for entry in entries if isinstance(entries, list) else [entries]:
+            if entry.get('id') and entry.get('url'):
+                cuids.setdefault(entry['url'], entry['id'])
+    return cuids
+
+
+def field_hashes(record):
+    # field -> content hash; dict fields (choices) are hashed per key, e.g. "choices.B"
+    hashes = {}
+    for field, value in record.items():
+        if isinstance(value, dict):
+            for key, item in value.items():
+                hashes[field + '.' + key] = blob_key(encode_value(item))
+        else:
+            hashes[field] = blob_key(encode_value(value))
+    return hashes
+
+
+def _field_value(record, field):
+    if '.' in field and field not in record:
+        field, key = field.split('.', 1)
+        return (record.get(field) or {}).get(key)
+    return record.get(field)
+
+
+class DatasetDiff:
+    """Question-level change set between two versions of the dataset.
+
+    The old version is reduced to per-field content hashes keyed by
+    question id; the new version is then streamed once and each record is
+    compared hash by hash, so neither side is ever fully held in memory.
+    Each change lists only the fields that differ, plus their new values
+    when `with_values` is set.
+    """
+
+    def __init__(self, with_values=False, cuids=None):
+        self.with_values = with_values
+        self.cuids = cuids or {}
+        self.old = {}             # id -> (file name, url, field hashes)
+        self.added = []
+        self.removed = []
+        self.changed = []
+        self.unchanged = 0
+        self.field_counts = {}
+
+    def load_old(self, records):
+        for name, record in records:
+            self.old[record.get('id')] = (name, record.get('url'), field_hashes(record))
+
+    def compare(self, records):
+        for name, record in records:
+            question_id = record.get('id')
+            url = record.get('url')
+            previous = self.old.pop(question_id, None)
+            if previous is None:
+                self.added.append(self._entry(question_id, name, url))
+                continue
+            old_hashes = previous[2]
+            new_hashes = field_hashes(record)
+            fields = sorted(field for field in old_hashes.keys() | new_hashes.keys()
+                            if old_hashes.get(field) != new_hashes.get(field))
+            if not fields:
+                self.unchanged += 1
+                continue
+            for field in fields:
+                self.field_counts[field] = self.field_counts.get(field, 0) + 1
+            entry = self._entry(question_id, name, url)
+            entry['fields'] = fields
+            if self.with_values:
+                entry['values'] = {field: _field_value(record, field) for field in fields}
+            self.changed.append(entry)
+        for question_id, (name, url, _) in self.old.items():
+            self.removed.append(self._entry(question_id, name, url))
+        self.old = {}
+        return self
+
+    def _entry(self, question_id, name, url):
+        entry = {'id': question_id, 'file': name, 'url': url}
+        if url in self.cuids:
+            entry['cuid'] = self.cuids[url]
+        return entry
+
+    def to_json(self):
+        return {
+            'summary': {
+                'unchanged': self.unchanged,
+                'changed': len(self.changed),
+                'added': len(self.added),
+                'removed': len(self.removed),
+                'fields': dict(sorted(self.field_counts.items(), key=lambda item: -item[1]))
+            },
+            'changed': self.changed,
+            'added': self.added,
+            'removed': self.removed
+        }
@@ -0,0 +1,156 @@
+import hashlib
+import json
+import sqlite3
+from urllib.parse import parse_qs, urlsplit, urlunsplit
+
+BATCH_SIZE = 500
+
+# (table, column, join from the question cuid to the row being written)
+QUESTION_TEXT = ('QuestionBankItem', 'questionText', None)
+PASSAGE_HTML = ('Passage', 'fullHtml', 'passageId')
+TARGETS = [QUESTION_TEXT, PASSAGE_HTML]
+
+PLACEHOLDERS = {'qmark': '?', 'format': '%s', 'pyformat': '%s'}
+# DATABASE_URL parameters Prisma understands but libpq rejects
+PRISMA_PARAMS = {'schema', 'connection_limit', 'pool_timeout', 'pgbouncer', 'statement_cache_size', 'socket_timeout'}
+
+
+def content_hash(text):
+    # Same digest as Postgres md5() over the UTF-8 text
+    return hashlib.md5((text or '').encode('utf-8')).hexdigest()
+
+
+def read_update_files(paths):
+    # cuid -> new html from final_88_updates.json / question_to_update.json-style files;
+    # later files win
+    updates = {}
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            entries = json.load(f)
+        for entry in entries if isinstance(entries, list) else [entries]:
+            html = entry.get('new_html', entry.get('question_html'))
+            if entry.get('id') and html is not None:
+                updates[entry['id']] = html
+    return updates
+
+
+def connect(url):
+    """Open `url` and return (connection, paramstyle).
+
+    sqlite:///path.db opens a local stand-in with an md5() SQL function
+    registered, so the same statements run on it as on Postgres.
+    postgresql:// URLs (as in DATABASE_URL) need psycopg2; Prisma-only
+    parameters are dropped and ?schema= becomes the search_path.
+    """
+    if url.startswith('sqlite:'):
+        # sqlite:///relative.db, sqlite:////absolute.db, sqlite:// for in-memory
+        connection = sqlite3.connect(url[len('sqlite://'):][1:] or ':memory:')
+        connection.create_function('md5', 1, lambda text: None if text is None else content_hash(text),
+                                   deterministic=True)
+        return connection, sqlite3.paramstyle
+    if url.startswith(('postgres://', 'postgresql://')):
+        try:
+            import psycopg2
+        except ImportError:
+            raise RuntimeError('Writing to Postgres needs psycopg2 (pip install psycopg2-binary)')
+        parts = urlsplit(url)
+        query = parse_qs(parts.query)
+        schema = query.get('schema', [None])[0]
+        kept = '&'.join(f'{key}={values[0]}' for key, values in query.items() if key not in PRISMA_PARAMS)
+        dsn = urlunsplit(parts._replace(query=kept))
+        connection = psycopg2.connect(dsn)
+        if schema:
+            with connection.cursor() as cursor:
+                cursor.execute('SET search_path TO %s', (schema,))
+        return connection, psycopg2.paramstyle
+    raise ValueError(f"Unsupported database URL: {url}")
+
+
+def _update_sql(target, rows, placeholder):
+    # VALUES columns are column1..3 (id, body, hash) in both Postgres and SQLite
+    table, column, _ = target
+    values = ', '.join(f'({placeholder}, {placeholder}, {placeholder})' for _ in range(rows))
+    return (f'UPDATE "{table}" SET "{column}" = v.column2, "updatedAt" = CURRENT_TIMESTAMP '
+            f'FROM (VALUES {values}) AS v '
+            f'WHERE "{table}".id = v.column1 AND COALESCE(md5("{table}"."{column}"), \'\') <> v.column3 '
+            f'RETURNING "{table}".id')
+
+
+class BulkWriter:
+    """Apply repaired question html to the database in one transaction.
+
+    Each batch is a single UPDATE ... FROM (VALUES ...) statement per
+    target column, so a few thousand fixes take a handful of round trips.
+    Joined targets are keyed by their own id, so each passage gets exactly
+    one source row however many updated questions share it; questions
+    sharing a passage must agree on its html or nothing is written.
+    Rows whose current content already hashes to the new value are left
+    alone (and their updatedAt untouched), which makes re-running the
+    same update files a no-op. Nothing is committed unless every batch
+    succeeds; with dry_run=True the transaction is always rolled back.
+    """
+
+    def __init__(self, connection, paramstyle='qmark', batch_size=BATCH_SIZE):
+        self.connection = connection
+        self.placeholder = PLACEHOLDERS[paramstyle]
+        self.batch_size = batch_size
+        self.batches = 0
+
+    def _rows(self, target, updates):
+        # {row id in target: body}. Question updates that reach the same row through
+        # `join` (questions sharing a passage) collapse into one, and must agree.
+        join = target[2]
+        if join is None:
+            return updates
+        cuids = list(updates)
+        rows, sources = {}, {}
+        cursor = self.connection.cursor()
+        try:
+            for start in range(0, len(cuids), self.batch_size):
+                batch = cuids[start:start + self.batch_size]
+                cursor.execute(f'SELECT id, "{join}" FROM "QuestionBankItem" WHERE id IN '
+                               f'({", ".join([self.placeholder] * len(batch))})', batch)
+                for cuid, row_id in cursor.fetchall():
+                    if row_id is None:
+                        continue
+                    if row_id in rows and rows[row_id] != updates[cuid]:
+                        raise ValueError(f"Conflicting {target[0]}.{target[1]} for {row_id}: "
+                                         f"questions {sources[row_id]} and {cuid} carry different html")
+                    rows[row_id] = updates[cuid]
+                    sources.setdefault(row_id, cuid)
+        finally:
+            cursor.close()
+        return rows
+
+    def write(self, target, updates):
+        # Ids of the rows actually changed in `target`
+        items = sorted(self._rows(target, updates).items())
+        written = []
+        cursor = self.connection.cursor()
+        try:
+            for start in range(0, len(items), self.batch_size):
+                batch = items[start:start + self.batch_size]
+                params = []
+                for row_id, body in batch:
+                    params.extend((row_id, body, content_hash(body)))
+                cursor.execute(_update_sql(target, len(batch), self.placeholder), params)
+                written.extend(row[0] for row in cursor.fetchall())
+                self.batches += 1
+        finally:
+            cursor.close()
+        return written
+
+    def apply(self, updates, targets=TARGETS, dry_run=False):
+        # {table.column: ids written}; all targets commit or roll back together
+        results = {}
+        try:
+            for target in targets:
+                results[f'{target[0]}.{target[1]}'] = self.write(target, updates)
+        except Exception:
+            self.connection.rollback()
+            raise
+        if dry_run:
+            self.connection.rollback()
+        else:
+            self.connection.commit()
+        return results
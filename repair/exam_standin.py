@@ -0,0 +1,220 @@
+import random
+from datetime import datetime, timedelta
+
+from repair.impact_index import percent_score
+
+# The columns of prisma/schema.prisma that grading and the stats jobs read or write, under the same quoted names
+SCHEMA = [
+    'CREATE TABLE IF NOT EXISTS "Domain" (id TEXT PRIMARY KEY, name TEXT, code TEXT, "order" INTEGER DEFAULT 0)',
+    'CREATE TABLE IF NOT EXISTS "Skill" (id TEXT PRIMARY KEY, "domainId" TEXT, name TEXT, "meanImportance" REAL, '
+    '"order" INTEGER DEFAULT 0)',
+    'CREATE TABLE IF NOT EXISTS "QuestionBankItem" (id TEXT PRIMARY KEY, "questionText" TEXT, '
+    '"questionType" TEXT DEFAULT \'MULTIPLE_CHOICE\', points INTEGER DEFAULT 1, "passageId" TEXT, '
+    '"domainId" TEXT, "skillId" TEXT, "updatedAt" TEXT)',
+    'CREATE TABLE IF NOT EXISTS "Passage" (id TEXT PRIMARY KEY, "fullHtml" TEXT, "updatedAt" TEXT)',
+    'CREATE TABLE IF NOT EXISTS "AnswerOption" (id TEXT PRIMARY KEY, text TEXT, "isCorrect" BOOLEAN DEFAULT 0, '
+    '"questionId" TEXT)',
+    'CREATE TABLE IF NOT EXISTS "ExamModule" (id TEXT PRIMARY KEY, "order" INTEGER, "sectionId" TEXT, '
+    '"moduleType" TEXT DEFAULT \'STANDARD\', difficulty TEXT)',
+    'CREATE TABLE IF NOT EXISTS "ExamQuestion" (id TEXT PRIMARY KEY, "order" INTEGER, "moduleId" TEXT, '
+    '"questionId" TEXT)',
+    'CREATE TABLE IF NOT EXISTS "ExamAssignment" (id TEXT PRIMARY KEY, status TEXT DEFAULT \'PENDING\', '
+    'score REAL, "studentId" TEXT, "examId" TEXT, "module1Score" INTEGER, "adaptivePath" TEXT, '
+    '"currentModuleId" TEXT, "completedAt" TEXT)',
+    'CREATE TABLE IF NOT EXISTS "StudentAnswer" (id TEXT PRIMARY KEY, "submittedAnswer" TEXT, "isCorrect" BOOLEAN, '
+    '"assignmentId" TEXT, "examQuestionId" TEXT, "pointsEarned" REAL)',
+]
+MODULE_SIZE = 27
+LETTERS = 'ABCD'
+# Domain code -> skills, as classified in the question bank
+DOMAINS = {
+    'ALG': ['Linear equations in one variable', 'Linear functions', 'Linear equations in two variables',
+            'Systems of two linear equations in two variables', 'Linear inequalities in one or two variables'],
+    'ADV': ['Nonlinear functions', 'Nonlinear equations in one variable and systems of equations in two variables',
+            'Equivalent expressions'],
+    'PSA': ['Ratios, rates, proportional relationships, and units', 'Percentages',
+            'One-variable data: distributions and measures of center and spread',
+            'Two-variable data: models and scatterplots', 'Probability and conditional probability',
+            'Inference from sample statistics and margin of error', 'Evaluating statistical claims'],
+    'GEO': ['Area and volume', 'Lines, angles, and triangles', 'Right triangles and trigonometry', 'Circles'],
+}
+# completedAt of the first stand-in submission; later ones follow a minute apart
+EPOCH = datetime(2025, 1, 6, 9, 0)
+DOMAIN_NAMES = {'ALG': 'Algebra', 'ADV': 'Advanced Math', 'PSA': 'Problem-Solving and Data Analysis',
+                'GEO': 'Geometry and Trigonometry'}
+
+
+class ExamStandIn:
+    """A SQLite copy of the exam tables filled with seeded, graded attempts.
+
+    Every exam has a routing Module 1 and an EASY and a HARD Module 2;
+    each assignment answered Module 1 and the Module 2 it was routed to,
+    and was graded and completed the way submit-module does it. Bank
+    questions are classified into Domain/Skill rows. The repaired
+    questions were graded against a different correct option than the
+    one stored now, as if their key had been fixed along with the text,
+    so rescoring has real work to do. Answer ids sort in insertion order,
+    like cuids do. Some assignments can instead go through the take
+    page's /submit route: answers saved as the option text and graded
+    against the correct option's text, a percentage score and no
+    pointsEarned, module1Score or adaptivePath. Students can also be left
+    mid-exam: their answers are saved ungraded (isCorrect NULL), as the
+    answers route does, until submit_pending grades them the way /submit
+    does.
+    """
+
+    def __init__(self, seed=7, skill=0.65):
+        self.random = random.Random(seed)
+        self.skill = skill
+
+    def populate(self, connection, repaired_ids, exams=10, students=1000, exams_per_student=3, bank=600,
+                 by_submit=0):
+        rng = self.random
+        for statement in SCHEMA:
+            connection.execute(statement)
+        skills = []
+        for order, (code, names) in enumerate(DOMAINS.items()):
+            domain = f'domain-{code.lower()}'
+            connection.execute('INSERT INTO "Domain" VALUES (?, ?, ?, ?)', (domain, DOMAIN_NAMES[code], code, order))
+            for n, name in enumerate(names):
+                skills.append((f'{domain}-skill{n}', domain, name, round(rng.uniform(2.5, 4.0), 2), n))
+        connection.executemany('INSERT INTO "Skill" VALUES (?, ?, ?, ?, ?)', skills)
+
+        questions = list(dict.fromkeys(repaired_ids))
+        questions += [f'bank-{n:05d}' for n in range(max(0, bank - len(questions)))]
+        repaired = set(repaired_ids)
+        graded = {}
+        options = []
+        for cuid in questions:
+            right = rng.randrange(4)
+            for i, letter in enumerate(LETTERS):
+                options.append((f'{cuid}-{letter}', f'Choice {letter}', int(i == right), cuid))
+            old = (right + 1 + rng.randrange(3)) % 4 if cuid in repaired else right
+            graded[cuid] = f'{cuid}-{LETTERS[old]}'
+        classified = [rng.choice(skills) for _ in questions]
+        connection.executemany('INSERT INTO "QuestionBankItem" (id, "questionText", "domainId", "skillId") '
+                               'VALUES (?, ?, ?, ?)',
+                               [(cuid, f'Question {cuid}', skill[1], skill[0])
+                                for cuid, skill in zip(questions, classified)])
+        connection.executemany('INSERT INTO "AnswerOption" VALUES (?, ?, ?, ?)', options)
+
+        for e in range(exams):
+            exam = f'exam-{e:03d}'
+            for order, (module_type, difficulty) in enumerate([('ROUTING', None), ('ADAPTIVE', 'EASY'),
+                                                                ('ADAPTIVE', 'HARD')]):
+                module = f'{exam}-m{order}'
+                connection.execute('INSERT INTO "ExamModule" VALUES (?, ?, ?, ?, ?)',
+                                   (module, order, f'{exam}-s0', module_type, difficulty))
+                placed = rng.sample(questions, MODULE_SIZE)
+                connection.executemany('INSERT INTO "ExamQuestion" VALUES (?, ?, ?, ?)',
+                                       [(f'{module}-q{n:02d}', n, module, cuid) for n, cuid in enumerate(placed)])
+        sizes = self.add_students(connection, students, exams_per_student, graded, by_submit=by_submit)
+        sizes['questions'] = len(questions)
+        return sizes
+
+    def add_students(self, connection, students, exams_per_student=3, graded=None, pending=0, by_submit=0):
+        """More students, each completing a few exams, after those already there.
+
+        Graded against the stored answer key unless `graded` gives another.
+        The last exam of the first `pending` new students is left in
+        progress, with its answers saved but not graded; that of the next
+        `by_submit` students is completed through the /submit route.
+        """
+        rng = self.random
+        if graded is None:
+            graded = dict(connection.execute('SELECT "questionId", id FROM "AnswerOption" WHERE "isCorrect" ORDER BY id'))
+        texts = dict(connection.execute('SELECT id, text FROM "AnswerOption"'))
+        layouts = {}
+        for exam_question, exam, module_type, difficulty, cuid in connection.execute(
+                'SELECT q.id, m."sectionId", m."moduleType", m.difficulty, q."questionId" FROM "ExamQuestion" q '
+                'JOIN "ExamModule" m ON m.id = q."moduleId" ORDER BY q.id'):
+            slot = 'ROUTING' if module_type == 'ROUTING' else difficulty
+            layouts.setdefault(exam, {}).setdefault(slot, []).append((exam_question, cuid))
+        first = connection.execute('SELECT COUNT(DISTINCT "studentId") FROM "ExamAssignment"').fetchone()[0]
+        # Continue after the highest id, not the row count: retakes delete answers
+        last = connection.execute('SELECT MAX(id) FROM "StudentAnswer"').fetchone()[0]
+        answer_no = int(last[len('csa'):]) + 1 if last else 0
+
+        stamps = self._stamps(connection)
+        assignments, answers = [], []
+        for s in range(first, first + students):
+            student = f'student-{s:05d}'
+            ability = min(0.95, max(0.2, rng.gauss(self.skill, 0.15)))
+            sections = rng.sample(sorted(layouts), min(exams_per_student, len(layouts)))
+            for n, section in enumerate(sections):
+                exam = section[:-len('-s0')]
+                assignment = f'{student}-{exam}'
+                done = len(answers)
+                module1 = self._answer(assignment, layouts[section]['ROUTING'], ability, graded, answers)
+                path = 'HARD' if module1 >= 15 else 'EASY'
+                module2 = self._answer(assignment, layouts[section][path], ability, graded, answers)
+                last = n == len(sections) - 1
+                if s - first < pending and last:
+                    # Saved by the answers route, not submitted yet
+                    answers[done:] = [(texts[choice], None, assignment, exam_question, None)
+                                      for choice, _, _, exam_question, _ in answers[done:]]
+                    assignments.append((assignment, 'IN_PROGRESS', None, student, exam, None, None, None))
+                elif s - first < pending + by_submit and last:
+                    # Option texts are distinct within a question, so the grades carry over
+                    answers[done:] = [(texts[choice], right, assignment, exam_question, None)
+                                      for choice, right, _, exam_question, _ in answers[done:]]
+                    assignments.append((assignment, 'COMPLETED', percent_score(module1 + module2, len(answers) - done),
+                                        student, exam, None, None, next(stamps)))
+                else:
+                    assignments.append((assignment, 'COMPLETED', float(module1 + module2), student, exam, module1,
+                                        path, next(stamps)))
+        connection.executemany('INSERT INTO "ExamAssignment" (id, status, score, "studentId", "examId", '
+                               '"module1Score", "adaptivePath", "completedAt") VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                               assignments)
+        connection.executemany('INSERT INTO "StudentAnswer" VALUES (?, ?, ?, ?, ?, ?)',
+                               [(f'csa{answer_no + n:010d}',) + answer for n, answer in enumerate(answers)])
+        connection.commit()
+        return {'students': students, 'assignments': len(assignments), 'answers': len(answers)}
+
+    def submit_pending(self, connection):
+        """Grade and complete every in-progress assignment, as the /submit route does.
+
+        Only non-empty answers to questions with options are graded, by
+        exact comparison with the correct option's text; pointsEarned
+        stays NULL and score is their percent_score.
+        """
+        pending = [row[0] for row in connection.execute(
+            'SELECT id FROM "ExamAssignment" WHERE status = \'IN_PROGRESS\' ORDER BY id')]
+        stamps = self._stamps(connection)
+        for assignment in pending:
+            grades = []
+            for cuid, submitted, options, key in connection.execute(
+                    'SELECT a.id, a."submittedAnswer", COUNT(o.id), (SELECT c.text FROM "AnswerOption" c '
+                    'WHERE c."questionId" = q."questionId" AND c."isCorrect" ORDER BY c.id LIMIT 1) '
+                    'FROM "StudentAnswer" a JOIN "ExamQuestion" q ON q.id = a."examQuestionId" '
+                    'LEFT JOIN "AnswerOption" o ON o."questionId" = q."questionId" '
+                    'WHERE a."assignmentId" = ? GROUP BY a.id', (assignment,)).fetchall():
+                if options and submitted:
+                    grades.append((int(key is not None and submitted == key), cuid))
+            connection.executemany('UPDATE "StudentAnswer" SET "isCorrect" = ? WHERE id = ?', grades)
+            connection.execute('UPDATE "ExamAssignment" SET status = \'COMPLETED\', "completedAt" = ?, score = ? '
+                               'WHERE id = ?', (next(stamps), percent_score(sum(right for right, _ in grades),
+                                                                           len(grades)), assignment))
+        connection.commit()
+        return len(pending)
+
+    @staticmethod
+    def _stamps(connection):
+        # completedAt values after every one already stored, as 'YYYY-MM-DD HH:MM:SS' text
+        latest = connection.execute('SELECT MAX("completedAt") FROM "ExamAssignment"').fetchone()[0]
+        stamp = datetime.fromisoformat(latest) if latest else EPOCH - timedelta(minutes=1)
+        while True:
+            stamp += timedelta(minutes=1)
+            yield stamp.strftime('%Y-%m-%d %H:%M:%S')
+
+    def _answer(self, assignment, placed, ability, graded, answers):
+        # Graded against the key in use at the time; returns the correct count
+        rng = self.random
+        correct = 0
+        for exam_question, cuid in placed:
+            key = graded[cuid]
+            choice = key if rng.random() < ability else f'{cuid}-{rng.choice(LETTERS)}'
+            right = choice == key
+            correct += right
+            answers.append((choice, int(right), assignment, exam_question, 1.0 if right else 0.0))
+        return correct
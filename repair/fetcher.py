@@ -0,0 +1,344 @@
+import asyncio
+import gzip
+import hashlib
+import os
+import ssl
+import time
+import zlib
+from http.cookiejar import MozillaCookieJar
+from urllib.parse import urljoin, urlsplit
+
+from repair.normalized_cache import CACHE_DIR
+
+PAGE_DIR = os.path.join(CACHE_DIR, 'pages')
+USER_AGENT = 'oneprep-repair/1.0'
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+MAX_REDIRECTS = 5
+
+
+def page_key(url):
+    return hashlib.blake2b(url.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class ResponseCache:
+    """Successful page bodies on disk, one gzip file per URL.
+
+    Files are named by a hash of the URL, so the directory doubles as the
+    page store the fixture server serves from.
+    """
+
+    def __init__(self, path=PAGE_DIR):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+
+    def file(self, url):
+        return os.path.join(self.path, page_key(url) + '.html.gz')
+
+    def get(self, url):
+        try:
+            with gzip.open(self.file(url), 'rb') as f:
+                body = f.read()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return body
+
+    def put(self, url, body):
+        os.makedirs(self.path, exist_ok=True)
+        path = self.file(url)
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with gzip.open(tmp, 'wb', compresslevel=6) as f:
+            f.write(body)
+        os.replace(tmp, path)
+
+
+def load_cookies(path):
+    # Netscape cookies.txt as written by curl; missing file means no cookies
+    jar = MozillaCookieJar()
+    if path and os.path.exists(path):
+        jar.load(path, ignore_discard=True, ignore_expires=True)
+    return jar
+
+
+def cookie_header(jar, host, path):
+    pairs = []
+    for cookie in jar:
+        domain = cookie.domain.lstrip('.')
+        if (host == domain or host.endswith('.' + domain)) and path.startswith(cookie.path or '/'):
+            pairs.append(f'{cookie.name}={cookie.value}')
+    return '; '.join(pairs)
+
+
+class FetchResult:
+    __slots__ = ('url', 'status', 'body', 'cached', 'attempts', 'error')
+
+    def __init__(self, url, status=None, body=None, cached=False, attempts=0, error=None):
+        self.url = url
+        self.status = status
+        self.body = body
+        self.cached = cached
+        self.attempts = attempts
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.status == 200 and self.body is not None
+
+    def text(self):
+        return self.body.decode('utf-8', errors='replace') if self.body is not None else ''
+
+
+class _Connection:
+    __slots__ = ('reader', 'writer', 'reused')
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.reused = False
+
+    def close(self):
+        self.writer.close()
+
+
+class _HostPool:
+    # Keep-alive connections to one origin, at most `limit` open at a time,
+    # request starts spaced at least `interval` seconds apart
+    def __init__(self, scheme, host, port, limit, interval, ssl_context):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.interval = interval
+        self.ssl_context = ssl_context if scheme == 'https' else None
+        self.slots = asyncio.Semaphore(limit)
+        self.idle = []
+        self.next_start = 0.0
+        self.lock = asyncio.Lock()
+
+    async def throttle(self):
+        async with self.lock:
+            now = time.monotonic()
+            wait = self.next_start - now
+            self.next_start = max(now, self.next_start) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    async def connect(self):
+        while self.idle:
+            conn = self.idle.pop()
+            if not conn.reader.at_eof():
+                conn.reused = True
+                return conn
+            conn.close()
+        reader, writer = await asyncio.open_connection(
+            self.host, self.port, ssl=self.ssl_context,
+            server_hostname=self.host if self.ssl_context else None)
+        return _Connection(reader, writer)
+
+    def release(self, conn, reusable):
+        if reusable:
+            self.idle.append(conn)
+        else:
+            conn.close()
+
+    def close(self):
+        for conn in self.idle:
+            conn.close()
+        self.idle = []
+
+
+async def _read_body(reader, status, headers):
+    if status < 200 or status in (204, 304):
+        # Never carry a body, whatever the headers say
+        return b'', True
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b';')[0].strip() or b'0', 16)
+            if size == 0:
+                # Trailers end with a blank line
+                while (await reader.readline()).strip():
+                    pass
+                break
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+        return b''.join(chunks), True
+    if 'content-length' in headers:
+        return await reader.readexactly(int(headers['content-length'])), True
+    # No framing: the body runs until the server closes the connection
+    return await reader.read(), False
+
+
+def _decode(body, encoding):
+    if encoding == 'gzip':
+        return gzip.decompress(body)
+    if encoding == 'deflate':
+        return zlib.decompress(body)
+    return body
+
+
+class Fetcher:
+    """Concurrent page fetcher over pooled keep-alive HTTP/1.1 connections.
+
+    At most `concurrency` requests are in flight overall and `per_host`
+    per origin, and each origin gets at most `rate` request starts per
+    second. `timeout` covers connecting and the exchange itself, not the
+    wait for a slot. Connection errors, timeouts and 429/5xx responses are
+    retried with exponential backoff (honouring Retry-After). 200 responses are
+    kept in a ResponseCache, so a rerun only asks for pages it never got.
+    `origin` sends every request to another server (the fixture server)
+    while results stay keyed by the original URL; cached bodies are keyed
+    by the URL actually requested, so pages served by another origin
+    never stand in for the real ones on a later run.
+    """
+
+    def __init__(self, concurrency=16, per_host=4, rate=2.0, retries=3, timeout=30.0,
+                 cache=None, cookies=None, origin=None, backoff=1.0):
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.interval = 1.0 / rate if rate else 0.0
+        self.retries = retries
+        self.timeout = timeout
+        self.cache = cache
+        self.cookies = cookies if cookies is not None else MozillaCookieJar()
+        self.origin = urlsplit(origin) if origin else None
+        self.backoff = backoff
+        self.ssl_context = ssl.create_default_context()
+        self.pools = {}
+        self.requests = 0
+        self.retried = 0
+
+    def _target(self, url):
+        parts = urlsplit(url)
+        if self.origin is not None:
+            parts = parts._replace(scheme=self.origin.scheme, netloc=self.origin.netloc)
+        return parts
+
+    def _cache_key(self, url):
+        return self._target(url).geturl() if self.origin is not None else url
+
+    def _pool(self, parts):
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        key = (parts.scheme, parts.hostname, port)
+        pool = self.pools.get(key)
+        if pool is None:
+            pool = self.pools[key] = _HostPool(parts.scheme, parts.hostname, port,
+                                               self.per_host, self.interval, self.ssl_context)
+        return pool
+
+    async def _request(self, url):
+        # One GET without retries: (status, headers, body)
+        parts = self._target(url)
+        pool = self._pool(parts)
+        path = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+        lines = [f'GET {path} HTTP/1.1', f'Host: {urlsplit(url).netloc}', f'User-Agent: {USER_AGENT}',
+                 'Accept-Encoding: gzip, deflate', 'Connection: keep-alive']
+        cookies = cookie_header(self.cookies, urlsplit(url).hostname or '', parts.path or '/')
+        if cookies:
+            lines.append(f'Cookie: {cookies}')
+        request = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+        async with pool.slots:
+            await pool.throttle()
+            self.requests += 1
+            # The timeout starts once the request has a slot, so time spent queued behind
+            # per_host and the rate limit never counts against it
+            return await asyncio.wait_for(self._exchange(pool, request), self.timeout)
+
+    async def _exchange(self, pool, request):
+        # Send on a pooled connection and read the response. A connection that fails or
+        # is cancelled (timeout) part-way is closed rather than returned to the pool; a
+        # pooled one the server already dropped fails before any response and gets one
+        # free retry on a fresh connection
+        for _ in range(2):
+            conn = await pool.connect()
+            try:
+                conn.writer.write(request)
+                await conn.writer.drain()
+                status_line = await conn.reader.readline()
+                if not status_line:
+                    raise ConnectionResetError('connection closed before response')
+            except (OSError, asyncio.IncompleteReadError):
+                conn.close()
+                if conn.reused:
+                    continue
+                raise
+            except BaseException:
+                conn.close()
+                raise
+            break
+        try:
+            status = int(status_line.split()[1])
+            headers = {}
+            while True:
+                line = await conn.reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            body, framed = await _read_body(conn.reader, status, headers)
+        except BaseException:
+            conn.close()
+            raise
+        pool.release(conn, framed and headers.get('connection', '').lower() != 'close')
+        return status, headers, _decode(body, headers.get('content-encoding', '').lower())
+
+    async def fetch(self, url):
+        if self.cache is not None:
+            body = self.cache.get(self._cache_key(url))
+            if body is not None:
+                return FetchResult(url, 200, body, cached=True)
+
+        result = FetchResult(url)
+        target = url
+        redirects = 0
+        while result.attempts <= self.retries:
+            result.attempts += 1
+            delay = self.backoff * 2 ** (result.attempts - 1)
+            try:
+                status, headers, body = await self._request(target)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError, IndexError) as e:
+                result.error = f'{type(e).__name__}: {e}'
+            else:
+                result.status, result.error = status, None
+                if status in REDIRECT_STATUSES and 'location' in headers and redirects < MAX_REDIRECTS:
+                    target = urljoin(target, headers['location'])
+                    redirects += 1
+                    result.attempts -= 1
+                    continue
+                if status not in RETRY_STATUSES:
+                    result.body = body
+                    break
+                retry_after = headers.get('retry-after', '')
+                if retry_after.isdigit():
+                    delay = max(delay, int(retry_after))
+            if result.attempts <= self.retries:
+                self.retried += 1
+                await asyncio.sleep(delay)
+
+        if result.ok and self.cache is not None:
+            self.cache.put(self._cache_key(url), result.body)
+        return result
+
+    async def fetch_all(self, urls):
+        # Yield FetchResults as they complete
+        gate = asyncio.Semaphore(self.concurrency)
+
+        async def bounded(url):
+            async with gate:
+                return await self.fetch(url)
+
+        tasks = [asyncio.ensure_future(bounded(url)) for url in dict.fromkeys(urls)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def close(self):
+        for pool in self.pools.values():
+            pool.close()
+        self.pools = {}
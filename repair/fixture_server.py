@@ -0,0 +1,117 @@
+import html
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from repair.fetcher import PAGE_DIR, ResponseCache
+from repair.question_pages import QUESTION_CONTAINER
+from repair.snapshot import Snapshot
+
+CHOICE_COLUMNS = ('Choice A_html', 'Choice B_html', 'Choice C_html', 'Choice D_html')
+
+
+def page_from_row(row, container=QUESTION_CONTAINER):
+    # A stand-in question page: the export's cells back in a page layout
+    choices = ''.join(f'<li>{row.get(column, "")}</li>' for column in CHOICE_COLUMNS)
+    return (f'<!DOCTYPE html>\n<html><head><title>{html.escape(row.get("Module", ""))}</title></head>\n'
+            f'<body><main>\n<div class="{container}">{row["Question_html"]}</div>\n'
+            f'<ul class="answer-choices">{choices}</ul>\n</main></body></html>\n')
+
+
+def write_pages(csv_file, cache, container=QUESTION_CONTAINER, urls=None):
+    # Save a stand-in page per export row into the page store; returns the count
+    wanted = set(urls) if urls is not None else None
+    written = 0
+    for row in Snapshot.open(csv_file).rows(('URL', 'Question_html', 'Module') + CHOICE_COLUMNS):
+        if wanted is not None and row['URL'] not in wanted:
+            continue
+        cache.put(row['URL'], page_from_row(row, container).encode('utf-8'))
+        written += 1
+    return written
+
+
+class FixtureServer:
+    """Local HTTP server answering with saved pages from a ResponseCache dir.
+
+    The original URL is rebuilt from the Host header and request path, so
+    a Fetcher pointed at it (Fetcher(origin=server.url)) gets back exactly
+    the page it cached for that URL. Unknown pages are 404. `fail_first`
+    answers the first n requests for each path with 503 and `delay` holds
+    every response, to exercise retries and concurrency.
+    """
+
+    def __init__(self, path=PAGE_DIR, host='127.0.0.1', port=0, scheme='https', fail_first=0, delay=0.0):
+        self.cache = ResponseCache(path)
+        self.scheme = scheme
+        self.fail_first = fail_first
+        self.delay = delay
+        self.requests = {}
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def _handler(self):
+        fixture = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                with fixture.lock:
+                    seen = fixture.requests.get(self.path, 0)
+                    fixture.requests[self.path] = seen + 1
+                if fixture.delay:
+                    time.sleep(fixture.delay)
+                if seen < fixture.fail_first:
+                    return self._send(503, b'busy', {'Retry-After': '0'})
+                url = f"{fixture.scheme}://{self.headers.get('Host', '')}{self.path}"
+                try:
+                    with open(fixture.cache.file(url), 'rb') as f:
+                        body = f.read()
+                except FileNotFoundError:
+                    return self._send(404, b'not found')
+                self._send(200, body, {'Content-Encoding': 'gzip'})
+
+            def _send(self, status, body, headers=None):
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def serve_forever(self):
+        self.server.serve_forever()
+
+    def start(self):
+        # Serve from a background thread (for scripted checks)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def page_count(path=PAGE_DIR):
+    return sum(1 for name in os.listdir(path) if name.endswith('.html.gz')) if os.path.isdir(path) else 0
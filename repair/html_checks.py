@@ -0,0 +1,168 @@
+import html
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from html.parser import HTMLParser
+
+from repair.question_index import iter_spans
+from repair.question_pages import VOID_TAGS
+from repair.text import WS_RE, strip_tags
+
+# Formatting tags a truncation or a bad splice most often leaves open
+INLINE_TAGS = {'em', 'u', 'i', 'b', 'strong', 'sub', 'sup'}
+REFERENCED_CONTENT = 'Referenced Content'
+UNDERLINE_RE = re.compile(r'<u\b|text-decoration:\s*underline', re.IGNORECASE)
+# A tag cut off at the very end of the markup
+CUT_TAG_RE = re.compile(r'<[a-zA-Z/][^>]*$')
+# Plain text may carry the question stem after the passage; the longest stems are ~250 characters
+MAX_STEM_CHARS = 300
+LETTERS = 'ABCD'
+
+
+class _TagBalance(HTMLParser):
+    # Fed markup incrementally; records every open/close that doesn't pair up
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.stack = []
+        self.problems = []
+        self.regions = []     # {'depth', 'text', 'open'} per Referenced Content span
+
+    def handle_starttag(self, tag, attrs):
+        if tag in VOID_TAGS:
+            return
+        self.stack.append(tag)
+        if dict(attrs).get('aria-label') == REFERENCED_CONTENT:
+            self.regions.append({'depth': len(self.stack), 'text': '', 'open': True})
+
+    def handle_endtag(self, tag):
+        if tag in VOID_TAGS:
+            return
+        if tag not in self.stack:
+            self.problems.append(('dangling_inline' if tag in INLINE_TAGS else 'unexpected_end_tag', f'</{tag}>'))
+            return
+        while self.stack:
+            depth = len(self.stack)
+            opened = self.stack.pop()
+            for region in self.regions:
+                if region['open'] and region['depth'] == depth:
+                    region['open'] = False
+            if opened == tag:
+                break
+            self.problems.append(('dangling_inline' if opened in INLINE_TAGS else 'misnested_tag',
+                                  f'<{opened}> closed by </{tag}>'))
+
+    def handle_data(self, data):
+        for region in self.regions:
+            if region['open']:
+                region['text'] += data
+
+    def finish(self):
+        self.close()
+        for tag in self.stack:
+            self.problems.append(('dangling_inline' if tag in INLINE_TAGS else 'unclosed_tag', f'<{tag}>'))
+        return self.problems
+
+
+def _squeeze(text):
+    return WS_RE.sub('', text)
+
+
+def check_html(markup):
+    # [(check, detail)] for one HTML cell
+    issues = []
+    if CUT_TAG_RE.search(markup):
+        issues.append(('cut_tag', markup[markup.rindex('<'):][:40]))
+    parser = _TagBalance()
+    parser.feed(markup)
+    issues.extend(parser.finish())
+    for region in parser.regions:
+        if not region['text'].strip():
+            issues.append(('empty_referenced_content', 'Referenced Content span has no text'))
+    return issues
+
+
+def check_text(markup, plain, question=''):
+    """[(check, detail)] comparing an HTML cell with its plain-text column.
+
+    The plain text is the HTML's text, ignoring whitespace, plus possibly
+    the question stem. Anything else means one of the two was cut or
+    spliced. A question about an underlined part needs the underline in
+    the HTML.
+    """
+    issues = []
+    rendered = _squeeze(html.unescape(strip_tags(markup)))
+    text = _squeeze(plain or '')
+    if not text.startswith(rendered):
+        at = next((i for i, (a, b) in enumerate(zip(rendered, text)) if a != b), min(len(rendered), len(text)))
+        issues.append(('plain_html_mismatch', f'differ at character {at}: '
+                                              f'{rendered[at:at + 30]!r} vs {text[at:at + 30]!r}'))
+    elif len(text) - len(rendered) > MAX_STEM_CHARS:
+        issues.append(('length_mismatch', f'html text {len(rendered)} chars, plain {len(text)}'))
+    stem = question or (plain or '')[-MAX_STEM_CHARS:]
+    if 'underlined' in stem and REFERENCED_CONTENT not in markup and not UNDERLINE_RE.search(markup):
+        issues.append(('missing_referenced_content', 'question refers to an underlined part the html lacks'))
+    return issues
+
+
+def check_choices(choices):
+    issues = []
+    for letter in LETTERS:
+        choice = choices.get(letter) or {}
+        if not (choice.get('text') or '').strip() and not strip_tags(choice.get('html') or '').strip():
+            issues.append(('empty_choice', f'choice {letter}'))
+    return issues
+
+
+def check_record(record):
+    """Issues in one update entry (id, new_html, new_plain) or dataset record.
+
+    Returns [{'field', 'check', 'detail'}].
+    """
+    found = []
+    if 'new_html' in record:
+        fields = [('new_html', record.get('new_html') or '', record.get('new_plain'), '')]
+    else:
+        fields = [('fullHtml', record.get('fullHtml') or '', record.get('fullText'), record.get('questionText') or '')]
+        if record.get('passageHtml') and record.get('passageHtml') != record.get('fullHtml'):
+            fields.append(('passageHtml', record['passageHtml'], None, ''))
+    for name, markup, plain, question in fields:
+        issues = check_html(markup)
+        if plain is not None:
+            issues += check_text(markup, plain, question)
+        found.extend({'field': name, 'check': check, 'detail': detail} for check, detail in issues)
+    if record.get('choices'):
+        found.extend({'field': 'choices', 'check': check, 'detail': detail}
+                     for check, detail in check_choices(record['choices']))
+        for letter, choice in record['choices'].items():
+            found.extend({'field': f'choices.{letter}.html', 'check': check, 'detail': detail}
+                         for check, detail in check_html(choice.get('html') or ''))
+    return found
+
+
+def validate_file(path):
+    # (records checked, issues) for an update file or one dataset file
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    records = 0
+    issues = []
+    for record, _, _ in iter_spans(text):
+        records += 1
+        for issue in check_record(record):
+            issues.append(dict(issue, source=path, id=record.get('id'), url=record.get('url')))
+    return records, issues
+
+
+def dataset_files(directory):
+    return [os.path.join(directory, name) for name in sorted(os.listdir(directory)) if name.endswith('.json')]
+
+
+def validate_files(paths, workers=1):
+    """{path: (records, issues)} with one file per task in a process pool.
+
+    Results are keyed in the order given, whatever order workers finish in.
+    """
+    if workers <= 1:
+        return {path: validate_file(path) for path in paths}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [(path, pool.submit(validate_file, path)) for path in paths]
+        return {path: future.result() for path, future in futures}
@@ -0,0 +1,370 @@
+import math
+from array import array
+
+from repair.db_writer import BATCH_SIZE, PLACEHOLDERS
+
+# Module 1 correct answers needed to be routed to the HARD Module 2
+# (same threshold as src/app/api/exams/[examId]/submit-module/route.ts)
+ROUTING_THRESHOLD = 15
+FETCH_SIZE = 10000
+# Stored isCorrect / score columns may be NULL
+UNSET = -1
+
+
+def percent_score(correct, scored):
+    """score as src/app/api/students/exams/[examId]/submit/route.ts stores it.
+
+    The percentage of the scored answers that are correct, rounded half
+    up to 0.1 like Math.round; None (NULL) when no answer was scored or
+    the percentage is 0.
+    """
+    if not scored or not correct:
+        return None
+    return math.floor(correct / scored * 100 * 10 + 0.5) / 10
+
+
+class Codes:
+    """Dictionary encoding of a string column: value <-> dense int code."""
+
+    def __init__(self):
+        self.values = []
+        self.index = {}
+
+    def __len__(self):
+        return len(self.values)
+
+    def code(self, value):
+        found = self.index.get(value)
+        if found is None:
+            found = self.index[value] = len(self.values)
+            self.values.append(value)
+        return found
+
+
+def _grouped(keys, size):
+    """CSR grouping of row numbers by an int key column.
+
+    Returns (offsets, rows): the rows whose key is k are
+    rows[offsets[k]:offsets[k + 1]], in table order. A counting sort, so
+    one pass to count and one to place.
+    """
+    offsets = array('l', [0]) * (size + 1)
+    for key in keys:
+        offsets[key + 1] += 1
+    for k in range(size):
+        offsets[k + 1] += offsets[k]
+    fill = array('l', offsets)
+    rows = array('l', [0]) * len(keys)
+    for row, key in enumerate(keys):
+        rows[fill[key]] = row
+        fill[key] += 1
+    return offsets, rows
+
+
+def _fetch(connection, sql):
+    cursor = connection.cursor()
+    try:
+        cursor.execute(sql)
+        while True:
+            batch = cursor.fetchmany(FETCH_SIZE)
+            if not batch:
+                break
+            yield from batch
+    finally:
+        cursor.close()
+
+
+class ExamTables:
+    """The grading tables exported column by column.
+
+    Every id is dictionary-encoded, so a foreign key is an int array
+    indexing the referenced table's codes: answer_question[i] is the
+    ExamQuestion of answer i, question_of[eq] the QuestionBankItem of
+    ExamQuestion eq, and so on. Only the columns grading reads are kept;
+    a few hundred thousand answers fit in a few MB.
+    """
+
+    def __init__(self):
+        self.questions = Codes()
+        self.answer_key = []
+        self.correct_text = []
+        self.multiple_choice = array('b')
+        self.points = array('d')
+        self.modules = Codes()
+        self.routing = array('b')
+        self.exam_questions = Codes()
+        self.question_of = array('l')
+        self.module_of = array('l')
+        self.assignments = Codes()
+        self.exam_of = []
+        self.completed = array('b')
+        self.score = array('d')
+        self.module1_score = array('l')
+        self.adaptive_path = []
+        self.answer_ids = []
+        self.answer_assignment = array('l')
+        self.answer_question = array('l')
+        self.submitted = []
+        self.is_correct = array('b')
+        self.points_earned = array('d')
+
+    def _question(self, cuid):
+        code = self.questions.code(cuid)
+        if code == len(self.answer_key):
+            self.answer_key.append(None)
+            self.correct_text.append(None)
+            self.multiple_choice.append(1)
+            self.points.append(1)
+        return code
+
+    @classmethod
+    def load(cls, connection):
+        tables = cls()
+        for cuid, question_type, points in _fetch(
+                connection, 'SELECT id, "questionType", points FROM "QuestionBankItem" ORDER BY id'):
+            code = tables._question(cuid)
+            tables.multiple_choice[code] = question_type == 'MULTIPLE_CHOICE'
+            tables.points[code] = points if points is not None else 1
+        # The key is the correct option's id for multiple choice, else the first option's text;
+        # the /submit route compares every answer with the correct option's text instead
+        for cuid, text, correct, question in _fetch(
+                connection, 'SELECT id, text, "isCorrect", "questionId" FROM "AnswerOption" ORDER BY id'):
+            code = tables._question(question)
+            if correct and tables.correct_text[code] is None:
+                tables.correct_text[code] = text
+            if tables.multiple_choice[code]:
+                if correct and tables.answer_key[code] is None:
+                    tables.answer_key[code] = cuid
+            elif tables.answer_key[code] is None:
+                tables.answer_key[code] = (text or '').strip().lower()
+        for cuid, module_type in _fetch(connection, 'SELECT id, "moduleType" FROM "ExamModule"'):
+            tables.modules.code(cuid)
+            tables.routing.append(module_type == 'ROUTING')
+        for cuid, module, question in _fetch(connection, 'SELECT id, "moduleId", "questionId" FROM "ExamQuestion"'):
+            tables.exam_questions.code(cuid)
+            tables.module_of.append(tables.modules.code(module))
+            tables.question_of.append(tables._question(question))
+        while len(tables.routing) < len(tables.modules):
+            tables.routing.append(0)
+        for cuid, exam, status, score, module1, path in _fetch(
+                connection, 'SELECT id, "examId", status, score, "module1Score", "adaptivePath" FROM "ExamAssignment"'):
+            tables.assignments.code(cuid)
+            tables.exam_of.append(exam)
+            tables.completed.append(status == 'COMPLETED')
+            tables.score.append(UNSET if score is None else score)
+            tables.module1_score.append(UNSET if module1 is None else module1)
+            tables.adaptive_path.append(path)
+        for cuid, assignment, exam_question, submitted, correct, points in _fetch(
+                connection, 'SELECT id, "assignmentId", "examQuestionId", "submittedAnswer", "isCorrect", '
+                            '"pointsEarned" FROM "StudentAnswer"'):
+            tables.answer_ids.append(cuid)
+            tables.answer_assignment.append(tables.assignments.index[assignment])
+            tables.answer_question.append(tables.exam_questions.index[exam_question])
+            tables.submitted.append(submitted)
+            tables.is_correct.append(UNSET if correct is None else bool(correct))
+            tables.points_earned.append(UNSET if points is None else points)
+        return tables
+
+
+class ImpactIndex:
+    """Reverse index from a question to every answer graded against it.
+
+    QuestionBankItem -> ExamQuestion -> StudentAnswer -> ExamAssignment,
+    each hop a CSR lookup over ExamTables' code arrays, so the answers
+    and assignments touched by a set of repaired questions come out
+    without a query per assignment.
+    """
+
+    def __init__(self, tables):
+        self.tables = tables
+        self.placements = _grouped(tables.question_of, len(tables.questions))
+        self.answers_by_question = _grouped(tables.answer_question, len(tables.exam_questions))
+        self.answers_by_assignment = _grouped(tables.answer_assignment, len(tables.assignments))
+
+    def answers(self, question_ids):
+        # Answer rows graded against any of `question_ids`, in table order
+        offsets, placed = self.placements
+        by_question, answer_rows = self.answers_by_question
+        found = array('l')
+        for cuid in set(question_ids):
+            code = self.tables.questions.index.get(cuid)
+            if code is None:
+                continue
+            for eq in placed[offsets[code]:offsets[code + 1]]:
+                found.extend(answer_rows[by_question[eq]:by_question[eq + 1]])
+        return array('l', sorted(found))
+
+    def impact(self, question_ids):
+        # {question id: {'exams': [...], 'assignments': n, 'answers': n}} for the report
+        tables = self.tables
+        report = {}
+        for cuid in question_ids:
+            rows = self.answers([cuid])
+            assignments = {tables.answer_assignment[row] for row in rows}
+            report[cuid] = {
+                'exams': sorted({tables.exam_of[code] for code in assignments}),
+                'assignments': len(assignments),
+                'answers': len(rows),
+            }
+        return report
+
+    def assignment_rows(self, assignment):
+        offsets, rows = self.answers_by_assignment
+        return rows[offsets[assignment]:offsets[assignment + 1]]
+
+
+class Rescore:
+    """isCorrect/pointsEarned and assignment totals recomputed for repaired questions.
+
+    An assignment was graded by one of two routes, told apart by
+    pointsEarned, which only submit-module sets. submit-module: a multiple
+    choice answer is correct when it is the correct option's id, any
+    other when it equals the first option's text ignoring case and
+    surrounding space; pointsEarned is the question's points or 0; score
+    counts the correct answers and module1Score those in the routing
+    module, which also decides adaptivePath. /submit (the take page):
+    an answer is correct when it is exactly the correct option's text,
+    and score is percent_score of the graded answers. As in skill_stats'
+    GRADED, only answers already graded (isCorrect set) in COMPLETED
+    assignments are regraded; saved answers of an exam still in
+    progress are left for its submission to grade. A stored score,
+    module1Score or adaptivePath is only rewritten when the route's rule
+    reproduces it from the stored grades; otherwise the assignment is
+    listed in `unreproduced` and left alone. Only values that differ
+    from what is stored are kept.
+    """
+
+    def __init__(self, index, question_ids):
+        tables = index.tables
+        self.answer_rows = array('l', (row for row in index.answers(question_ids)
+                                       if tables.is_correct[row] != UNSET
+                                       and tables.completed[tables.answer_assignment[row]]))
+        self.answers = []
+        self.scores = []
+        self.module1 = []
+        self.paths = []
+        self.unreproduced = []
+        correct = array('b', tables.is_correct)
+        by_submit = {}
+        for row in self.answer_rows:
+            assignment = tables.answer_assignment[row]
+            if assignment not in by_submit:
+                by_submit[assignment] = all(tables.points_earned[graded] == UNSET
+                                            for graded in self._graded_rows(index, assignment))
+            question = tables.question_of[tables.answer_question[row]]
+            submitted = tables.submitted[row]
+            if by_submit[assignment]:
+                key = tables.correct_text[question]
+                right = key is not None and submitted == key
+                points = None
+            else:
+                key = tables.answer_key[question]
+                if tables.multiple_choice[question]:
+                    right = key is not None and submitted == key
+                else:
+                    right = key is not None and (submitted or '').strip().lower() == key
+                points = tables.points[question] if right else 0
+            correct[row] = right
+            if tables.is_correct[row] != right or (points is not None and tables.points_earned[row] != points):
+                self.answers.append((tables.answer_ids[row], right, points))
+        for assignment in sorted(by_submit):
+            rows = self._graded_rows(index, assignment)
+            stored = sum(tables.is_correct[row] == 1 for row in rows)
+            total = sum(correct[row] == 1 for row in rows)
+            cuid = tables.assignments.values[assignment]
+            score = None if tables.score[assignment] == UNSET else tables.score[assignment]
+            if by_submit[assignment]:
+                # /submit leaves module1Score and adaptivePath alone
+                if score != percent_score(stored, len(rows)):
+                    self.unreproduced.append(cuid)
+                elif score != percent_score(total, len(rows)):
+                    self.scores.append((cuid, score, percent_score(total, len(rows))))
+                continue
+            routing = [row for row in rows if tables.routing[tables.module_of[tables.answer_question[row]]]]
+            stored_routing = sum(tables.is_correct[row] == 1 for row in routing)
+            new_routing = sum(correct[row] == 1 for row in routing)
+            module1 = tables.module1_score[assignment]
+            if (score is not None and score != stored) or (module1 != UNSET and module1 != stored_routing):
+                self.unreproduced.append(cuid)
+                continue
+            if score is not None and score != total:
+                self.scores.append((cuid, score, float(total)))
+            if module1 != UNSET:
+                if module1 != new_routing:
+                    self.module1.append((cuid, module1, new_routing))
+                path = 'HARD' if new_routing >= ROUTING_THRESHOLD else 'EASY'
+                if tables.adaptive_path[assignment] != path:
+                    self.paths.append((cuid, tables.adaptive_path[assignment], path))
+        self.assignments = len(by_submit)
+
+    @staticmethod
+    def _graded_rows(index, assignment):
+        is_correct = index.tables.is_correct
+        return [row for row in index.assignment_rows(assignment) if is_correct[row] != UNSET]
+
+
+def _values_update(cursor, table, columns, rows, placeholder, batch_size):
+    # UPDATE ... FROM (VALUES ...) by id, as in db_writer.BulkWriter
+    width = len(columns) + 1
+    assignments = ', '.join(f'"{column}" = v.column{i + 2}' for i, column in enumerate(columns))
+    statements = 0
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        values = ', '.join('(' + ', '.join([placeholder] * width) + ')' for _ in batch)
+        cursor.execute(f'UPDATE "{table}" SET {assignments} FROM (VALUES {values}) AS v '
+                       f'WHERE "{table}".id = v.column1', [value for row in batch for value in row])
+        statements += 1
+    return statements
+
+
+class RescoreWriter:
+    """Write a Rescore back in one transaction, a batch statement at a time.
+
+    adaptivePath is set with one literal per difficulty rather than
+    through VALUES, so Postgres assigns it to the enum column without a
+    cast; a score going back to NULL is set the same way, as is
+    isCorrect alone for answers the /submit route graded (their
+    pointsEarned stays NULL). dry_run rolls everything back.
+    """
+
+    def __init__(self, connection, paramstyle='qmark', batch_size=BATCH_SIZE):
+        self.connection = connection
+        self.placeholder = PLACEHOLDERS[paramstyle]
+        self.batch_size = batch_size
+        self.batches = 0
+
+    def apply(self, rescore, dry_run=False):
+        cursor = self.connection.cursor()
+        try:
+            self.batches += _values_update(cursor, 'StudentAnswer', ['isCorrect', 'pointsEarned'],
+                                           [answer for answer in rescore.answers if answer[2] is not None],
+                                           self.placeholder, self.batch_size)
+            for right in (True, False):
+                self._update_ids(cursor, f'UPDATE "StudentAnswer" SET "isCorrect" = {str(right).upper()}',
+                                 [cuid for cuid, new, points in rescore.answers if points is None and new == right])
+            self.batches += _values_update(cursor, 'ExamAssignment', ['score'],
+                                           [(cuid, new) for cuid, _, new in rescore.scores if new is not None],
+                                           self.placeholder, self.batch_size)
+            self._update_ids(cursor, 'UPDATE "ExamAssignment" SET score = NULL',
+                             [cuid for cuid, _, new in rescore.scores if new is None])
+            self.batches += _values_update(cursor, 'ExamAssignment', ['module1Score'],
+                                           [(cuid, new) for cuid, _, new in rescore.module1],
+                                           self.placeholder, self.batch_size)
+            for path in ('EASY', 'HARD'):
+                self._update_ids(cursor, f'UPDATE "ExamAssignment" SET "adaptivePath" = \'{path}\'',
+                                 [cuid for cuid, _, new in rescore.paths if new == path])
+        except Exception:
+            self.connection.rollback()
+            raise
+        finally:
+            cursor.close()
+        if dry_run:
+            self.connection.rollback()
+        else:
+            self.connection.commit()
+
+    def _update_ids(self, cursor, update, ids):
+        for start in range(0, len(ids), self.batch_size):
+            batch = ids[start:start + self.batch_size]
+            cursor.execute(f'{update} WHERE id IN ({", ".join([self.placeholder] * len(batch))})', batch)
+            self.batches += 1
@@ -0,0 +1,69 @@
+import csv
+import sys
+
+# Columns the matchers actually read; the heavy choice/explanation HTML is dropped
+MATCH_COLUMNS = ('URL', 'Question', 'Question_html')
+
+# Scraped HTML cells easily exceed the csv module's default 128 KB limit
+csv.field_size_limit(min(sys.maxsize, 2 ** 31 - 1))
+
+
+class CsvRecord:
+    """One CSV row trimmed to the requested columns.
+
+    Supports `row.get(column, default)` and `row[column]` like the
+    DictReader rows the scripts used before, but shares the column map
+    between rows and keeps the values in a tuple.
+    """
+
+    __slots__ = ('row_no', 'line_no', 'columns', 'values')
+
+    def __init__(self, row_no, line_no, columns, values):
+        self.row_no = row_no      # 0-based data row number
+        self.line_no = line_no    # physical line the record starts on (header is line 1)
+        self.columns = columns
+        self.values = values
+
+    def get(self, column, default=None):
+        i = self.columns.get(column)
+        return default if i is None else self.values[i]
+
+    def __getitem__(self, column):
+        return self.values[self.columns[column]]
+
+    def __contains__(self, column):
+        return column in self.columns
+
+
+class RecordLayout:
+    # Maps a CSV header onto the requested columns; shared by every record
+    def __init__(self, header, columns=None):
+        # Like DictReader, the last of any duplicated header names wins
+        header_pos = {name: i for i, name in enumerate(header)}
+        wanted = list(columns) if columns else list(header_pos)
+        self.positions = [header_pos.get(name) for name in wanted]
+        self.columns = {name: i for i, name in enumerate(wanted)}
+
+    def record(self, row_no, line_no, values):
+        width = len(values)
+        return CsvRecord(row_no, line_no, self.columns,
+                         tuple(values[p] if p is not None and p < width else '' for p in self.positions))
+
+
+def iter_rows(csv_file, columns=None):
+    # Stream CsvRecords one at a time; memory stays flat regardless of file size
+    with open(csv_file, 'r', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        layout = RecordLayout(header, columns)
+
+        row_no = 0
+        line_no = reader.line_num + 1
+        for values in reader:
+            start_line, line_no = line_no, reader.line_num + 1
+            if not values:
+                continue
+            yield layout.record(row_no, start_line, values)
+            row_no += 1
@@ -0,0 +1,292 @@
+import hashlib
+import html
+import os
+import re
+import sqlite3
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from html.parser import HTMLParser
+
+from repair.normalized_cache import CACHE_DIR
+
+# Bump whenever mathml_to_latex or canonical_mathml changes so cached output is rebuilt
+MATHML_VERSION = 3
+
+MATH_RE = re.compile(r'<math\b[^>]*>.*?</math>', re.IGNORECASE | re.DOTALL)
+MATH_COLUMNS = ('Question_html', 'Choice A_html', 'Choice B_html', 'Choice C_html', 'Choice D_html',
+                'Explaination_html')
+# Whitespace-only text between tags, unless it is the whole content of a token element
+# (<mtext> </mtext>, <mo> </mo>), where it is rendered
+BETWEEN_TAGS_RE = re.compile(r'(<(m[intos]|mtext)\b[^>]*>\s+</\2)|>\s+(?=<)', re.IGNORECASE)
+HAS_MATH_RE = re.compile(r'<math\b', re.IGNORECASE)
+ATTR_RE = re.compile(r'(\w[\w:-]*)\s*=\s*"([^"]*)"')
+# <math> attributes that change the rendering; xmlns, class, alttext etc. don't
+KEPT_ATTRS = ('display',)
+# Entries kept in the persistent cache / in memory
+MAX_ENTRIES = 200000
+MEMORY_ENTRIES = 20000
+
+OPERATORS = {
+    '×': r'\times', '÷': r'\div', '±': r'\pm', '∓': r'\mp', '≤': r'\leq', '≥': r'\geq', '≠': r'\neq',
+    '−': '-', '·': r'\cdot', '⋅': r'\cdot', '≈': r'\approx', '∞': r'\infty', '→': r'\to', '∠': r'\angle',
+    '°': r'^{\circ}', '∘': r'\circ', '⊥': r'\perp', '∥': r'\parallel', '△': r'\triangle', '≅': r'\cong',
+    '∼': r'\sim', '∈': r'\in', '∪': r'\cup', '∩': r'\cap', '…': r'\ldots', '′': "'",
+}
+IDENTIFIERS = {
+    'π': r'\pi', 'θ': r'\theta', 'α': r'\alpha', 'β': r'\beta', 'γ': r'\gamma', 'Δ': r'\Delta',
+    'δ': r'\delta', 'λ': r'\lambda', 'μ': r'\mu', 'σ': r'\sigma', 'ϕ': r'\phi', 'φ': r'\phi', 'ω': r'\omega',
+    'sin': r'\sin', 'cos': r'\cos', 'tan': r'\tan', 'log': r'\log', 'ln': r'\ln',
+}
+# LaTeX specials as they appear in token text; a backslash needs a mode-specific command
+SPECIALS_RE = re.compile(r'[%$&#_{}\\]')
+MATH_BACKSLASH = r'\backslash '
+TEXT_BACKSLASH = r'\textbackslash{}'
+# \text{...} with its escapes, whose spacing is content
+TEXT_RE = re.compile(r'(\\text\{(?:[^{}\\]|\\textbackslash\{\}|\\.)*\})')
+# Operators written with space around them, as convertMathMLToLatex does
+SPACED = {'+', '-', '=', '<', '>', r'\times', r'\div', r'\pm', r'\mp', r'\leq', r'\geq', r'\neq',
+          r'\approx', r'\cdot', r'\to'}
+
+
+def canonical_mathml(fragment):
+    """One spelling per expression: whitespace between tags dropped (but
+    not the content of a whitespace-only <mtext>/<mo>/...), tag names
+    lowercased, and only the rendering attributes of <math> kept."""
+    head_end = fragment.index('>') + 1
+    attrs = dict((name.lower(), value) for name, value in ATTR_RE.findall(fragment[:head_end]))
+    kept = ''.join(f' {name}="{attrs[name]}"' for name in KEPT_ATTRS if attrs.get(name, 'inline') != 'inline')
+    body = BETWEEN_TAGS_RE.sub(lambda match: match.group(1) or '>', fragment[head_end:fragment.rindex('<')].strip())
+    body = re.sub(r'</?[A-Za-z][\w:-]*', lambda tag: tag.group(0).lower(), body)
+    return f'<math{kept}>{body}</math>'
+
+
+def math_key(canonical):
+    return hashlib.blake2b(canonical.encode('utf-8'), digest_size=16).digest()
+
+
+class _Node:
+    __slots__ = ('tag', 'attrs', 'children')
+
+    def __init__(self, tag, attrs):
+        self.tag = tag
+        self.attrs = attrs
+        self.children = []
+
+
+class _TreeBuilder(HTMLParser):
+    # Lenient: scraped MathML has HTML entities and the odd unclosed element
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = _Node('root', {})
+        self.stack = [self.root]
+
+    def handle_starttag(self, tag, attrs):
+        node = _Node(tag, dict(attrs))
+        self.stack[-1].children.append(node)
+        self.stack.append(node)
+
+    def handle_startendtag(self, tag, attrs):
+        self.stack[-1].children.append(_Node(tag, dict(attrs)))
+
+    def handle_endtag(self, tag):
+        for depth in range(len(self.stack) - 1, 0, -1):
+            if self.stack[depth].tag == tag:
+                del self.stack[depth:]
+                return
+
+    def handle_data(self, data):
+        self.stack[-1].children.append(data)
+
+
+def _text(node, strip=True):
+    text = ''.join(child if isinstance(child, str) else _text(child, False) for child in node.children)
+    return text.strip() if strip else text
+
+
+def _escape(text, backslash=MATH_BACKSLASH):
+    return SPECIALS_RE.sub(lambda m: backslash if m.group() == '\\' else '\\' + m.group(), text)
+
+
+def _group(latex):
+    return latex if len(latex) == 1 else f'{{{latex}}}'
+
+
+def _latex(node):
+    if isinstance(node, str):
+        return node.strip()
+    tag = node.tag
+    args = [child for child in node.children if not isinstance(child, str) or child.strip()]
+    parts = [_latex(child) for child in args]
+    if tag in ('mi', 'mn', 'mtext', 'ms'):
+        if tag == 'mtext':
+            # Spaces in text are meaningful ("5 and y"); runs collapse to one, as they render
+            text = re.sub(r'\s+', ' ', _text(node, False))
+            return rf'\text{{{_escape(text, TEXT_BACKSLASH)}}}' if text else ''
+        text = _text(node)
+        return IDENTIFIERS.get(text) or _escape(text)
+    if tag == 'mo':
+        text = _text(node)
+        op = OPERATORS.get(text) or _escape(text)
+        return f' {op} ' if op in SPACED else op
+    if tag == 'msup' and len(parts) == 2:
+        return f'{_group(parts[0])}^{{{parts[1]}}}'
+    if tag == 'msub' and len(parts) == 2:
+        return f'{_group(parts[0])}_{{{parts[1]}}}'
+    if tag == 'msubsup' and len(parts) == 3:
+        return f'{_group(parts[0])}_{{{parts[1]}}}^{{{parts[2]}}}'
+    if tag == 'mfrac' and len(parts) == 2:
+        return rf'\frac{{{parts[0]}}}{{{parts[1]}}}'
+    if tag == 'msqrt':
+        return rf'\sqrt{{{"".join(parts)}}}'
+    if tag == 'mroot' and len(parts) == 2:
+        return rf'\sqrt[{parts[1]}]{{{parts[0]}}}'
+    if tag == 'mfenced':
+        return f"{_escape(node.attrs.get('open', '('))}{', '.join(parts)}{_escape(node.attrs.get('close', ')'))}"
+    if tag in ('mover', 'munder') and len(parts) == 2:
+        accent = {'¯': r'\overline', '→': r'\overrightarrow', '^': r'\hat', '⌢': r'\overarc'}.get(parts[1].strip())
+        if tag == 'mover' and accent:
+            return f'{accent}{{{parts[0]}}}'
+        return f"{_group(parts[0])}{'^' if tag == 'mover' else '_'}{{{parts[1]}}}"
+    if tag == 'mtable':
+        rows = [' & '.join(_latex(cell) for cell in row.children if not isinstance(cell, str))
+                for row in node.children if not isinstance(row, str)]
+        columns = max((row.count(' & ') + 1 for row in rows), default=1)
+        return rf'\begin{{array}}{{{"c" * columns}}}' + r' \\ '.join(rows) + r'\end{array}'
+    if tag in ('annotation', 'annotation-xml', 'mspace', 'none'):
+        return ''
+    if tag == 'semantics':
+        return parts[0] if parts else ''
+    # mrow, mstyle, mpadded, mphantom, math, root and anything unknown: the children in order
+    return ''.join(parts)
+
+
+def _collapse(latex):
+    # Squeeze whitespace runs outside \text{...}, where spacing is content
+    parts = TEXT_RE.split(latex)
+    return ''.join(part if i % 2 else re.sub(r'\s+', ' ', part) for i, part in enumerate(parts)).strip()
+
+
+def mathml_to_latex(fragment):
+    """`$...$` (`$$...$$` for display="block") LaTeX for one <math> element.
+
+    Same notation as convertMathMLToLatex in src/lib/utils/mathml-to-latex.ts,
+    but built from the element tree, so nesting of any depth converts.
+    """
+    builder = _TreeBuilder()
+    builder.feed(fragment)
+    builder.close()
+    math = next((child for child in builder.root.children if not isinstance(child, str)), builder.root)
+    latex = _collapse(html.unescape(_latex(math)))
+    delimiter = '$$' if math.attrs.get('display') == 'block' else '$'
+    return f'{delimiter}{latex}{delimiter}'
+
+
+def _convert_batch(fragments):
+    return [mathml_to_latex(fragment) for fragment in fragments]
+
+
+def convert_all(fragments, workers=1, chunk=500):
+    # LaTeX for each canonical fragment, in order; chunks go to a process pool when workers > 1
+    if workers <= 1 or len(fragments) <= chunk:
+        return _convert_batch(fragments)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        batches = pool.map(_convert_batch, [fragments[i:i + chunk] for i in range(0, len(fragments), chunk)])
+        return [latex for batch in batches for latex in batch]
+
+
+class MathCache:
+    """LaTeX for canonical MathML, persisted in SQLite and keyed by content hash.
+
+    A bounded in-memory LRU sits in front of the table. Every lookup
+    stamps the entry with the current run, and `close` trims the table
+    to `max_entries`, dropping the entries used longest ago, so the
+    cache stays bounded across many exports.
+    """
+
+    def __init__(self, path=None, max_entries=MAX_ENTRIES, memory_entries=MEMORY_ENTRIES):
+        self.path = path or os.path.join(CACHE_DIR, f'mathml-v{MATHML_VERSION}.sqlite')
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._used = set()
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self._db = sqlite3.connect(self.path, timeout=60)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('CREATE TABLE IF NOT EXISTS latex (key BLOB PRIMARY KEY, latex TEXT NOT NULL, '
+                         'used INTEGER NOT NULL)')
+        self._db.execute('CREATE INDEX IF NOT EXISTS latex_used ON latex (used)')
+        self._db.execute('CREATE TABLE IF NOT EXISTS runs (run INTEGER PRIMARY KEY AUTOINCREMENT)')
+        with self._db:
+            self.run = self._db.execute('INSERT INTO runs DEFAULT VALUES').lastrowid
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _remember(self, key, latex):
+        self._memory[key] = latex
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get_many(self, canonicals):
+        # {canonical: latex} for those already cached; the rest are misses
+        found = {}
+        pending = {}
+        for canonical in canonicals:
+            key = math_key(canonical)
+            latex = self._memory.get(key)
+            if latex is not None:
+                self._memory.move_to_end(key)
+                found[canonical] = latex
+                self._used.add(key)
+            else:
+                pending[key] = canonical
+        keys = list(pending)
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            rows = self._db.execute(f'SELECT key, latex FROM latex WHERE key IN ({", ".join("?" * len(batch))})',
+                                    batch)
+            for key, latex in rows:
+                found[pending[key]] = latex
+                self._remember(key, latex)
+                self._used.add(key)
+        self.hits += len(found)
+        self.misses += len(canonicals) - len(found)
+        return found
+
+    def put_many(self, converted):
+        rows = []
+        for canonical, latex in converted.items():
+            key = math_key(canonical)
+            self._remember(key, latex)
+            rows.append((key, latex, self.run))
+        with self._db:
+            self._db.executemany('INSERT OR REPLACE INTO latex (key, latex, used) VALUES (?, ?, ?)', rows)
+
+    def close(self):
+        if self._db is None:
+            return
+        with self._db:
+            used = list(self._used)
+            for start in range(0, len(used), 500):
+                batch = used[start:start + 500]
+                self._db.execute(f'UPDATE latex SET used = ? WHERE key IN ({", ".join("?" * len(batch))})',
+                                 [self.run] + batch)
+            count = self._db.execute('SELECT COUNT(*) FROM latex').fetchone()[0]
+            if count > self.max_entries:
+                self._db.execute('DELETE FROM latex WHERE key IN (SELECT key FROM latex ORDER BY used LIMIT ?)',
+                                 (count - self.max_entries,))
+        self._db.close()
+        self._db = None
+
+
+def splice(markup, latex_for):
+    # markup with every <math> element replaced by latex_for(fragment)
+    if not HAS_MATH_RE.search(markup):
+        return markup
+    return MATH_RE.sub(lambda match: latex_for(match.group(0)), markup)
@@ -0,0 +1,226 @@
+import json
+import os
+import re
+import resource
+import signal
+import sys
+import time
+from contextlib import contextmanager
+
+HWM_RE = re.compile(r'VmHWM:\s+(\d+) kB')
+# Labelled observations kept per metric (the largest ones)
+TOP_LABELS = 20
+
+
+def reset_peak_rss():
+    # Linux lets a process reset its own high-water mark; elsewhere the peak only grows
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb():
+    try:
+        with open('/proc/self/status') as f:
+            return int(HWM_RE.search(f.read()).group(1)) / 1024
+    except (OSError, AttributeError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # bytes on macOS, kB on Linux
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+class LookupResults(dict):
+    """A matcher's {key: hit} result plus how much work each key cost.
+
+    `candidates` maps a key to the number of rows it was checked against;
+    `counters` holds totals such as cache hits. Both survive pickling, so
+    per-shard results from worker processes still carry them.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.candidates = {}
+        self.counters = {}
+
+    def absorb(self, other):
+        # Add another shard's work counts to this one
+        for key, size in getattr(other, 'candidates', {}).items():
+            self.candidates[key] = self.candidates.get(key, 0) + size
+        for name, value in getattr(other, 'counters', {}).items():
+            self.counters[name] = self.counters.get(name, 0) + value
+
+
+def _summary(values):
+    ordered = sorted(values)
+    n = len(ordered)
+    return {
+        'count': n,
+        'min': ordered[0],
+        'max': ordered[-1],
+        'mean': round(sum(ordered) / n, 3),
+        'p50': ordered[n // 2],
+        'p95': ordered[min(n - 1, n * 95 // 100)],
+    }
+
+
+def _code_label(code):
+    return f'{os.path.relpath(code.co_filename)}:{code.co_firstlineno}({code.co_name})'
+
+
+class SampledProfile:
+    """Statistical profiler driven by a CPU-time interval timer.
+
+    Every `interval` seconds of CPU time the running stack is sampled:
+    the innermost function gets a self sample, every function on the
+    stack a total sample. Costs a few microseconds per sample instead of
+    the per-call overhead of cProfile. Needs setitimer (Unix) and only
+    sees the main thread of this process.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.samples = 0
+        self.self_samples = {}
+        self.total_samples = {}
+        self.stage_samples = {}
+        self.stage = None
+        self.available = hasattr(signal, 'setitimer')
+
+    def _sample(self, signum, frame):
+        self.samples += 1
+        if self.stage is not None:
+            self.stage_samples[self.stage] = self.stage_samples.get(self.stage, 0) + 1
+        if frame is None:
+            return
+        self.self_samples[frame.f_code] = self.self_samples.get(frame.f_code, 0) + 1
+        seen = set()
+        while frame is not None:
+            code = frame.f_code
+            if code not in seen:
+                seen.add(code)
+                self.total_samples[code] = self.total_samples.get(code, 0) + 1
+            frame = frame.f_back
+
+    def start(self):
+        if self.available:
+            signal.signal(signal.SIGPROF, self._sample)
+            signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def stop(self):
+        if self.available:
+            signal.setitimer(signal.ITIMER_PROF, 0, 0)
+            signal.signal(signal.SIGPROF, signal.SIG_DFL)
+
+    def top(self, limit=25):
+        hottest = sorted(self.self_samples.items(), key=lambda item: -item[1])[:limit]
+        return [{
+            'function': _code_label(code),
+            'self_samples': count,
+            'self_pct': round(100 * count / self.samples, 1),
+            'total_pct': round(100 * self.total_samples.get(code, 0) / self.samples, 1),
+        } for code, count in hottest]
+
+    def to_json(self, limit=25):
+        if not self.available:
+            return {'error': 'sampling needs signal.setitimer (not available on this platform)'}
+        return {
+            'interval_s': self.interval,
+            'samples': self.samples,
+            'by_stage': self.stage_samples,
+            'hottest': self.top(limit) if self.samples else []
+        }
+
+
+class Metrics:
+    """Structured telemetry for one repair run.
+
+    Wrap each phase in `with metrics.stage(name) as stage:` to record
+    wall and CPU time and the peak RSS reached while it ran (per stage on
+    Linux, process-wide elsewhere); set stage['rows'] and other fields on
+    the yielded dict. `count` keeps totals, `observe` keeps a distribution
+    (count/min/max/mean/p50/p95) plus the largest labelled values, and
+    `cache` records hit/miss pairs. With profile=True a SampledProfile
+    runs for the whole run. `write` dumps it all as JSON.
+    """
+
+    def __init__(self, name, profile=False, interval=0.005):
+        self.name = name
+        self.started = time.time()
+        self.stages = {}
+        self.counters = {}
+        self.observations = {}
+        self.labelled = {}
+        self.caches = {}
+        self.profile = SampledProfile(interval) if profile else None
+        if self.profile is not None:
+            self.profile.start()
+
+    @contextmanager
+    def stage(self, name):
+        record = self.stages.setdefault(name, {})
+        per_stage = reset_peak_rss()
+        if self.profile is not None:
+            outer, self.profile.stage = self.profile.stage, name
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield record
+        finally:
+            record['wall_s'] = round(record.get('wall_s', 0) + time.perf_counter() - wall, 3)
+            record['cpu_s'] = round(record.get('cpu_s', 0) + time.process_time() - cpu, 3)
+            record['peak_rss_mb'] = round(max(record.get('peak_rss_mb', 0), peak_rss_mb()), 1)
+            record['peak_rss_scope'] = 'stage' if per_stage else 'process'
+            if self.profile is not None:
+                self.profile.stage = outer
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name, value, label=None):
+        self.observations.setdefault(name, []).append(value)
+        if label is not None:
+            self.labelled.setdefault(name, []).append((value, label))
+
+    def observe_each(self, name, values):
+        # {label: value} -> one labelled observation each
+        for label, value in values.items():
+            self.observe(name, value, label)
+
+    def cache(self, name, hits, misses):
+        pair = self.caches.setdefault(name, [0, 0])
+        pair[0] += hits
+        pair[1] += misses
+
+    def to_json(self):
+        distributions = {}
+        for name, values in self.observations.items():
+            if not values:
+                continue
+            summary = _summary(values)
+            if name in self.labelled:
+                largest = sorted(self.labelled[name], key=lambda item: -item[0])[:TOP_LABELS]
+                summary['largest'] = [{'label': str(label), 'value': value} for value, label in largest]
+            distributions[name] = summary
+        report = {
+            'run': self.name,
+            'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started)),
+            'wall_s': round(time.time() - self.started, 3),
+            'peak_rss_mb': round(max([peak_rss_mb()] + [stage.get('peak_rss_mb', 0) for stage in self.stages.values()]), 1),
+            'stages': self.stages,
+            'counters': self.counters,
+            'distributions': distributions,
+            'caches': {name: {'hits': hits, 'misses': misses,
+                              'hit_ratio': round(hits / (hits + misses), 3) if hits + misses else None}
+                       for name, (hits, misses) in self.caches.items()},
+        }
+        if self.profile is not None:
+            report['profile'] = self.profile.to_json()
+        return report
+
+    def write(self, path):
+        if self.profile is not None:
+            self.profile.stop()
+        with open(path, 'w') as f:
+            json.dump(self.to_json(), f, indent=2)
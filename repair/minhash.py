@@ -0,0 +1,182 @@
+import heapq
+import zlib
+
+from repair.metrics import LookupResults
+from repair.text import normalize_prefix, normalize_text
+
+NUM_BINS = 64
+BANDS = 32
+SHINGLE_SIZE = 5
+WORD_SHINGLE_SIZE = 3
+MAX_PREFIX = 200
+MIN_PREFIX = 32
+PREFIX_STEP = 16
+MASK = 0xFFFFFFFF
+GOLDEN = 0x9E3779B1
+
+
+def _shingle_hash(shingle):
+    return (zlib.crc32(shingle.encode('utf-8')) * GOLDEN) & MASK
+
+
+def _densify(bins):
+    # Fill empty bins from the next non-empty one (rotation densification) so
+    # short texts still get comparable signatures
+    n = len(bins)
+    if all(value is None for value in bins):
+        return (MASK,) * n
+    filled = list(bins)
+    for i in range(n):
+        if filled[i] is None:
+            j, distance = i, 0
+            while bins[j] is None:
+                j = (j + 1) % n
+                distance += 1
+            filled[i] = (bins[j] + distance * GOLDEN) & MASK
+    return tuple(filled)
+
+
+def prefix_signatures(text, lengths, k=SHINGLE_SIZE):
+    """One-permutation MinHash signatures of text[:length] for each length.
+
+    Every shingle is hashed once into one of NUM_BINS bins (keeping the
+    minimum); prefixes are nested, so all requested lengths come out of a
+    single pass over the text.
+    """
+    bins = [None] * NUM_BINS
+    signatures = {}
+    pending = sorted(set(lengths))
+    last = len(text) - k
+    for i in range(max(last + 1, 1)):
+        while pending and i + k > pending[0]:
+            signatures[pending.pop(0)] = _densify(bins)
+        if not pending:
+            break
+        h = _shingle_hash(text[i:i + k])
+        b, value = h % NUM_BINS, h // NUM_BINS
+        if bins[b] is None or value < bins[b]:
+            bins[b] = value
+    for length in pending:
+        signatures[length] = _densify(bins)
+    return signatures
+
+
+def signature(text):
+    return prefix_signatures(text, [len(text)])[len(text)]
+
+
+def word_signature(text, k=WORD_SHINGLE_SIZE):
+    # Signature over k-word shingles; far fewer hashes than characters for whole passages
+    words = text.split()
+    bins = [None] * NUM_BINS
+    for i in range(max(len(words) - k + 1, 1)):
+        h = _shingle_hash(' '.join(words[i:i + k]))
+        b, value = h % NUM_BINS, h // NUM_BINS
+        if bins[b] is None or value < bins[b]:
+            bins[b] = value
+    return _densify(bins)
+
+
+def similarity(a, b):
+    # Estimated Jaccard similarity of the two shingle sets
+    return sum(1 for x, y in zip(a, b) if x == y) / len(a)
+
+
+def _bands(sig, bands=BANDS):
+    width = len(sig) // bands
+    for band in range(bands):
+        yield band, sig[band * width:(band + 1) * width]
+
+
+class LSHIndex:
+    # Banded locality-sensitive hash table over MinHash signatures
+    def __init__(self, bands=BANDS):
+        self.bands = bands
+        self.buckets = {}
+        self.signatures = {}
+
+    def add(self, key, sig):
+        self.signatures[key] = sig
+        for band in _bands(sig, self.bands):
+            self.buckets.setdefault(band, []).append(key)
+
+    def candidates(self, sig):
+        found = set()
+        for band in _bands(sig, self.bands):
+            found.update(self.buckets.get(band, ()))
+        return found
+
+
+def prefix_length(text):
+    # Compared prefix length, bucketed so queries share row signatures
+    length = min(len(text), MAX_PREFIX)
+    if length < MIN_PREFIX:
+        return None
+    return length - length % PREFIX_STEP
+
+
+class FuzzyMatches:
+    """Approximate prefix matching of truncated questions against CSV rows.
+
+    `queries` maps a key to the (HTML) text as stored in the database. Both
+    sides are normalized, cut to the same bucketed prefix length and
+    MinHashed; LSH over the query signatures means each row is only scored
+    against the few queries sharing a band with it. Calling the object on a
+    stream of CsvRecords returns {key: [(similarity, row_no, row), ...]},
+    best first, so it can run per shard and be combined with `merge`.
+    The result's `candidates` counts the rows each query was scored
+    against.
+    """
+
+    def __init__(self, queries, column='Question_html', limit=3, min_similarity=0.5):
+        self.column = column
+        self.limit = limit
+        self.min_similarity = min_similarity
+        self.indexes = {}
+        for key, markup in queries.items():
+            text = normalize_text(markup)
+            length = prefix_length(text)
+            if length is None:
+                continue
+            index = self.indexes.setdefault(length, LSHIndex())
+            index.add(key, signature(text[:length]))
+        self.max_length = max(self.indexes, default=0)
+
+    def __call__(self, rows):
+        best = {}
+        found = LookupResults()
+        if not self.indexes:
+            return found
+        scored = found.candidates
+        for row in rows:
+            text = normalize_prefix(row.get(self.column, ''), self.max_length)
+            signatures = prefix_signatures(text, self.indexes)
+            for length, index in self.indexes.items():
+                sig = signatures[length]
+                for key in index.candidates(sig):
+                    scored[key] = scored.get(key, 0) + 1
+                    score = similarity(sig, index.signatures[key])
+                    if score < self.min_similarity:
+                        continue
+                    # Min-heap on (score, -row_no): the weakest, latest candidate pops first
+                    heap = best.setdefault(key, [])
+                    entry = (score, -row.row_no, row)
+                    if len(heap) < self.limit:
+                        heapq.heappush(heap, entry)
+                    elif entry[:2] > heap[0][:2]:
+                        heapq.heapreplace(heap, entry)
+        for key, heap in best.items():
+            ranked = sorted(heap, key=lambda entry: entry[:2], reverse=True)
+            found[key] = [(score, -neg_row_no, row) for score, neg_row_no, row in ranked]
+        return found
+
+    def merge(self, results):
+        merged = {}
+        totals = LookupResults()
+        for found in results:
+            totals.absorb(found)
+            for key, candidates in found.items():
+                merged.setdefault(key, []).extend(candidates)
+        for key, candidates in merged.items():
+            totals[key] = sorted(candidates, key=lambda c: (-c[0], c[1]))[:self.limit]
+        return totals
@@ -0,0 +1,113 @@
+from itertools import combinations
+
+from repair.minhash import LSHIndex, similarity, word_signature
+
+THRESHOLD = 0.8
+# Bands of 4 bins: a pair at 0.8 shares a band with probability > 0.999
+BANDS = 16
+# Shorter texts (stock question stems, one-line math) match each other by accident
+MIN_WORDS = 12
+
+
+class _UnionFind:
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, x):
+        parent = self.parent
+        root = x
+        while parent.get(root, root) != root:
+            root = parent[root]
+        while x != root:
+            parent[x], x = root, parent.get(x, x)
+        return root
+
+    def union(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a != b:
+            self.parent[max(a, b)] = min(a, b)
+
+
+class NearDuplicateIndex:
+    """Cluster near-duplicate texts with MinHash signatures and LSH.
+
+    Texts (already normalized) are fingerprinted over word shingles.
+    Identical fingerprints are grouped up front; the distinct ones go into
+    a banded LSH table and only pairs sharing a band are compared, so the
+    work grows with the number of near-duplicates rather than with the
+    square of the corpus. Pairs at or above `threshold` estimated Jaccard
+    similarity are joined into clusters.
+    """
+
+    def __init__(self, threshold=THRESHOLD, min_words=MIN_WORDS, bands=BANDS):
+        self.threshold = threshold
+        self.min_words = min_words
+        self.bands = bands
+        self.keys = []
+        self.groups = {}          # signature -> item numbers with exactly that signature
+        self.skipped = 0
+
+    def add(self, key, text):
+        if len(text.split()) < self.min_words:
+            self.skipped += 1
+            return
+        self.groups.setdefault(word_signature(text), []).append(len(self.keys))
+        self.keys.append(key)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def clusters(self):
+        """Clusters of two or more items, largest first.
+
+        Each is {'size', 'min_similarity', 'members': [{'key', 'similarity'}]}
+        where a member's similarity is to the cluster's first item and
+        min_similarity is the weakest link that joined the cluster.
+        """
+        links = _UnionFind()
+        for members in self.groups.values():
+            for item in members[1:]:
+                links.union(members[0], item)
+
+        signatures = list(self.groups)
+        firsts = [self.groups[sig][0] for sig in signatures]
+        index = LSHIndex(self.bands)
+        for n, sig in enumerate(signatures):
+            index.add(n, sig)
+        edges = []
+        for bucket in index.buckets.values():
+            for a, b in combinations(bucket, 2):
+                # Pairs already joined through other links can't change the clusters
+                if links.find(firsts[a]) == links.find(firsts[b]):
+                    continue
+                score = similarity(signatures[a], signatures[b])
+                if score >= self.threshold:
+                    links.union(firsts[a], firsts[b])
+                    edges.append((score, firsts[a]))
+
+        signature_of = {}
+        for sig, members in self.groups.items():
+            for item in members:
+                signature_of[item] = sig
+        grouped = {}
+        for item in range(len(self.keys)):
+            grouped.setdefault(links.find(item), []).append(item)
+
+        min_edge = {}
+        for score, a in edges:
+            root = links.find(a)
+            min_edge[root] = min(score, min_edge.get(root, 1.0))
+        clusters = []
+        for root, members in grouped.items():
+            if len(members) < 2:
+                continue
+            first = signature_of[members[0]]
+            clusters.append({
+                'size': len(members),
+                'min_similarity': round(min_edge.get(root, 1.0), 3),
+                'members': [{'key': self.keys[item],
+                             'similarity': round(similarity(first, signature_of[item]), 3)}
+                            for item in members]
+            })
+        clusters.sort(key=lambda cluster: (-cluster['size'], -cluster['min_similarity']))
+        return clusters
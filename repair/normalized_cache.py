@@ -0,0 +1,76 @@
+import hashlib
+import os
+import sqlite3
+
+from repair.text import NORMALIZE_VERSION, normalize_text
+
+CACHE_DIR = '.repair_cache'
+
+
+def content_key(markup):
+    return hashlib.blake2b(markup.encode('utf-8'), digest_size=16).digest()
+
+
+class NormalizedTextCache:
+    """normalize_text() output persisted in SQLite, keyed by content hash.
+
+    Call it like normalize_text(markup). Each distinct cell is normalized
+    once and reused by every later lookup, run and script. It can be
+    handed to worker processes: each process opens its own connection and
+    new entries are written in batches.
+    """
+
+    def __init__(self, path=None, batch_size=1000):
+        self.path = path or os.path.join(CACHE_DIR, f'normalized-v{NORMALIZE_VERSION}.sqlite')
+        self.batch_size = batch_size
+        self.hits = 0
+        self.misses = 0
+        self._db = None
+        self._pending = {}
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_db'] = None
+        state['_pending'] = {}
+        return state
+
+    def _connect(self):
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            self._db = sqlite3.connect(self.path, timeout=60)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('CREATE TABLE IF NOT EXISTS normalized (key BLOB PRIMARY KEY, text TEXT NOT NULL)')
+        return self._db
+
+    def __call__(self, markup):
+        if not markup:
+            return ''
+        key = content_key(markup)
+        text = self._pending.get(key)
+        if text is None:
+            row = self._connect().execute('SELECT text FROM normalized WHERE key = ?', (key,)).fetchone()
+            text = row[0] if row is not None else None
+        if text is not None:
+            self.hits += 1
+            return text
+
+        self.misses += 1
+        text = normalize_text(markup)
+        self._pending[key] = text
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+        return text
+
+    def flush(self):
+        if self._pending:
+            db = self._connect()
+            with db:
+                db.executemany('INSERT OR IGNORE INTO normalized (key, text) VALUES (?, ?)',
+                               self._pending.items())
+            self._pending = {}
+
+    def close(self):
+        self.flush()
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -0,0 +1,86 @@
+import csv
+import io
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+from repair.ingest import MATCH_COLUMNS, RecordLayout, iter_rows
+from repair.row_index import RowIndex
+from repair.snapshot import Snapshot
+
+# More shards than workers so one slow shard doesn't hold up the pool
+SHARDS_PER_WORKER = 4
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+def plan_shards(index, count):
+    # Split the records into `count` contiguous runs of roughly equal bytes.
+    # Each shard is (first row number, byte offset, starting line of each record).
+    total = len(index)
+    if total == 0:
+        return []
+    target = max(1, (index.ends[-1] - index.starts[0]) // max(1, count))
+    shards = []
+    first = 0
+    for row_no in range(total):
+        last = row_no == total - 1
+        if last or index.ends[row_no] - index.starts[first] >= target:
+            shards.append((first, index.starts[first], index.lines[first:row_no + 1]))
+            first = row_no + 1
+    return shards
+
+
+def iter_shard(csv_file, header, shard, columns=MATCH_COLUMNS):
+    first_row, offset, lines = shard
+    layout = RecordLayout(header, columns)
+    with open(csv_file, 'rb') as raw:
+        raw.seek(offset)
+        reader = csv.reader(io.TextIOWrapper(raw, encoding='utf-8'))
+        for i, line_no in enumerate(lines):
+            values = next(reader)
+            while not values:
+                values = next(reader)
+            yield layout.record(first_row + i, line_no, values)
+
+
+def _run_shard(csv_file, header, shard, columns, task):
+    return task(iter_shard(csv_file, header, shard, columns))
+
+
+def _run_snapshot_shard(path, start, stop, columns, task):
+    # Pickled while the mapping is still open: returned SnapshotRecords read their values from it
+    with Snapshot.map(path) as snap:
+        return pickle.dumps(task(snap.rows(columns, start, stop)), pickle.HIGHEST_PROTOCOL)
+
+
+def map_shards(csv_file, task, workers=1, columns=MATCH_COLUMNS, snapshot=True):
+    """Run `task(rows)` over shards of the CSV in a process pool.
+
+    By default rows come from the binary snapshot of the export (built on
+    first use) and shards are row ranges of it; with snapshot=False the
+    CSV itself is cut into byte-range shards. Results come back in shard
+    (file) order so callers can merge them deterministically. With one
+    worker everything runs in this process and a single result is returned.
+    """
+    if snapshot:
+        snap = Snapshot.open(csv_file)
+        if workers <= 1:
+            return [task(snap.rows(columns))]
+        step = max(1, -(-len(snap) // (workers * SHARDS_PER_WORKER)))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_run_snapshot_shard, snap.path, start, start + step, columns, task)
+                       for start in range(0, len(snap), step)]
+            return [pickle.loads(future.result()) for future in futures]
+
+    if workers <= 1:
+        return [task(iter_rows(csv_file, columns))]
+
+    index = RowIndex.open(csv_file)
+    shards = plan_shards(index, workers * SHARDS_PER_WORKER)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_run_shard, csv_file, index.header, shard, columns, task)
+                   for shard in shards]
+        return [future.result() for future in futures]
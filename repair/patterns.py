@@ -0,0 +1,176 @@
+import re
+from array import array
+
+SEARCH_COLUMNS = ('Question', 'Question_html')
+MAX_SAMPLE_ROWS = 5
+
+
+QUANTIFIERS = '?*{'
+# Characters with a regex meaning outside a class; anything else is literal
+METACHARACTERS = set('.^$|?*+()[]{}\\')
+
+
+def literal_runs(pattern):
+    """Literal text every match of `pattern` must contain, as a list of runs.
+
+    Spaces, punctuation and simple escapes (\\. \\- \\') are literal;
+    classes, groups, wildcards and \\d-style escapes end a run, and a
+    character made optional by ?, * or {m,n} is dropped from it. A
+    top-level alternation means nothing is required.
+    """
+    runs, run = [], []
+    depth = 0
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        literal = None
+        if char == '\\' and i + 1 < len(pattern):
+            escaped = pattern[i + 1]
+            i += 2
+            if not escaped.isalnum():
+                literal = escaped
+        elif char == '[':
+            # Skip the class, honouring escapes and a leading ]
+            i += 2 if pattern[i + 1:i + 2] == ']' else 1
+            while i < len(pattern) and pattern[i] != ']':
+                i += 2 if pattern[i] == '\\' else 1
+            i += 1
+        else:
+            i += 1
+            if char == '|' and depth == 0:
+                return []
+            if char == '(':
+                depth += 1
+            elif char == ')':
+                depth = max(0, depth - 1)
+            elif char not in METACHARACTERS:
+                literal = char
+        if literal is not None and depth == 0:
+            if i < len(pattern) and pattern[i] in QUANTIFIERS:
+                literal = None
+            else:
+                run.append(literal)
+                continue
+        if run:
+            runs.append(''.join(run))
+            run = []
+    if run:
+        runs.append(''.join(run))
+    return runs
+
+
+def literal_anchor(pattern):
+    # Longest literal run; every match contains it
+    runs = [run for run in literal_runs(pattern) if run.strip()]
+    if not runs:
+        return None
+    return max(runs, key=len).lower()
+
+
+class PatternScan:
+    """Result of one pass of a PatternTable over the CSV rows."""
+
+    def __init__(self, table):
+        self.table = table
+        self.rows_scanned = 0
+        self.first_rows = {}      # pattern -> first matching row
+        self.hit_counts = {}      # pattern -> number of matching rows
+        self.sample_rows = {}     # pattern -> first few matching row numbers
+        self.matched_rows = {}    # pattern -> every matching row number, if the table records them
+        self.regex_evals = {}     # pattern -> regex searches run (rows passing the literal prefilter)
+
+    @classmethod
+    def merge(cls, table, scans):
+        # Combine per-shard scans given in file order; the earliest shard's row wins
+        merged = cls(table)
+        for scan in scans:
+            merged.rows_scanned += scan.rows_scanned
+            for pattern, count in scan.hit_counts.items():
+                if pattern not in merged.hit_counts:
+                    merged.hit_counts[pattern] = 0
+                    merged.first_rows[pattern] = scan.first_rows[pattern]
+                    merged.sample_rows[pattern] = []
+                merged.hit_counts[pattern] += count
+                samples = merged.sample_rows[pattern]
+                samples.extend(scan.sample_rows[pattern][:MAX_SAMPLE_ROWS - len(samples)])
+            for pattern, rows in scan.matched_rows.items():
+                merged.matched_rows.setdefault(pattern, array('I')).extend(rows)
+            for pattern, evals in scan.regex_evals.items():
+                merged.regex_evals[pattern] = merged.regex_evals.get(pattern, 0) + evals
+        return merged
+
+    @classmethod
+    def from_matches(cls, table, matched_rows, read_row, rows_scanned):
+        # Rebuild a scan from stored row numbers; read_row(row_no) loads the first hit
+        scan = cls(table)
+        scan.rows_scanned = rows_scanned
+        for pattern, rows in matched_rows.items():
+            if not rows:
+                continue
+            scan.first_rows[pattern] = read_row(rows[0])
+            scan.hit_counts[pattern] = len(rows)
+            scan.sample_rows[pattern] = list(rows[:MAX_SAMPLE_ROWS])
+            scan.matched_rows[pattern] = array('I', rows)
+        return scan
+
+    def first(self, key):
+        return self.first_rows.get(self.table.patterns[key])
+
+    def ambiguous(self):
+        # (pattern, rows hit, keys bound to it) for patterns hitting several rows
+        report = []
+        for pattern, count in self.hit_counts.items():
+            if count > 1:
+                report.append((pattern, count, self.table.keys_by_pattern[pattern]))
+        report.sort(key=lambda item: (-item[1], item[0]))
+        return report
+
+
+class PatternTable:
+    """A table of search regexes keyed by question id, compiled once.
+
+    `scan` streams CsvRecords a single time and records, for every distinct
+    pattern, the first matching row (same "first row wins" rule as the old
+    per-question loop) and how many rows it hit in total. Each pattern is
+    prefiltered by a lowercase literal it must contain, so the regex engine
+    only runs on rows that can possibly match. With record_rows=True every
+    matching row number is kept as well, for checkpointing.
+    """
+
+    def __init__(self, patterns, flags=re.IGNORECASE, record_rows=False):
+        self.patterns = dict(patterns)
+        self.flags = flags
+        self.record_rows = record_rows
+        self.keys_by_pattern = {}
+        for key, pattern in self.patterns.items():
+            self.keys_by_pattern.setdefault(pattern, []).append(key)
+        self.compiled = [(pattern, re.compile(pattern, flags), literal_anchor(pattern))
+                         for pattern in self.keys_by_pattern]
+
+    def scan(self, rows, columns=SEARCH_COLUMNS):
+        result = PatternScan(self)
+        evals = result.regex_evals
+        for row in rows:
+            result.rows_scanned += 1
+            values = [row.get(column, '') or '' for column in columns]
+            lowered = [value.lower() for value in values]
+            for pattern, regex, anchor in self.compiled:
+                found = False
+                for value, low in zip(values, lowered):
+                    if anchor is None or anchor in low:
+                        evals[pattern] = evals.get(pattern, 0) + 1
+                        if regex.search(value):
+                            found = True
+                            break
+                if not found:
+                    continue
+                count = result.hit_counts.get(pattern, 0)
+                if count == 0:
+                    result.first_rows[pattern] = row
+                    result.sample_rows[pattern] = []
+                if count < MAX_SAMPLE_ROWS:
+                    result.sample_rows[pattern].append(row.row_no)
+                if self.record_rows:
+                    result.matched_rows.setdefault(pattern, array('I')).append(row.row_no)
+                result.hit_counts[pattern] = count + 1
+        return result
@@ -0,0 +1,166 @@
+import json
+import os
+
+from repair.normalized_cache import CACHE_DIR
+from repair.row_index import question_id_from_url
+
+# Scratch files pairing a database cuid with the OnePrep URL it was matched to
+CUID_SOURCES = ['all_88_final.json', 'matched_questions_to_update.json',
+                'final_88_updates.json', 'remaining_9_to_update.json']
+
+_DECODER = json.JSONDecoder()
+_SKIP = ' \t\r\n,'
+
+
+def index_path(directory):
+    return os.path.join(CACHE_DIR, 'question-index-' + os.path.basename(os.path.normpath(directory)) + '.json')
+
+
+def _stamp(path):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def iter_spans(text):
+    # (record, byte start, byte end) for each element of a top-level JSON array
+    pos = text.index('[') + 1
+    offset = len(text[:pos].encode('utf-8'))
+    while True:
+        start = pos
+        while pos < len(text) and text[pos] in _SKIP:
+            pos += 1
+        if pos >= len(text) or text[pos] == ']':
+            return
+        offset += pos - start   # skipped characters are all ASCII
+        record, end = _DECODER.raw_decode(text, pos)
+        size = len(text[pos:end].encode('utf-8'))
+        yield record, offset, offset + size
+        offset += size
+        pos = end
+
+
+class QuestionIndex:
+    """Where each question of a sat_questions_by_test* directory lives.
+
+    Maps the dataset id, the source URL, the OnePrep question id and the
+    database cuid (taken from the repair scratch files) to a file and the
+    byte span of its record, persisted under .repair_cache/. `get` reads
+    and decodes only that span. The index is rebuilt when any dataset or
+    cuid source file changes size or mtime.
+    """
+
+    def __init__(self, directory, data):
+        self.directory = directory
+        self.files = data['files']
+        self.sources = data['sources']
+        self.spans = data['spans']        # record no -> [file name, start, end]
+        self.keys = data['keys']          # lookup key -> record no
+
+    @classmethod
+    def build(cls, directory, cuid_sources=CUID_SOURCES):
+        files, spans, keys = {}, [], {}
+        by_url = {}
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(directory, name)
+            files[name] = _stamp(path)
+            with open(path, 'r', encoding='utf-8') as f:
+                text = f.read()
+            for record, start, end in iter_spans(text):
+                record_no = len(spans)
+                spans.append([name, start, end])
+                url = record.get('url') or ''
+                keys.setdefault('id:' + str(record.get('id')), record_no)
+                if url:
+                    keys.setdefault('url:' + url, record_no)
+                    by_url.setdefault(url, record_no)
+                    question_id = question_id_from_url(url)
+                    if question_id:
+                        keys.setdefault('question:' + question_id, record_no)
+
+        sources = {}
+        for source in cuid_sources:
+            if not os.path.exists(source):
+                continue
+            sources[source] = _stamp(source)
+            with open(source, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+            for entry in entries if isinstance(entries, list) else [entries]:
+                record_no = by_url.get(entry.get('url'))
+                if entry.get('id') and record_no is not None:
+                    keys.setdefault('cuid:' + entry['id'], record_no)
+
+        return cls(directory, {'files': files, 'sources': sources, 'spans': spans, 'keys': keys})
+
+    @classmethod
+    def load(cls, directory, cuid_sources=CUID_SOURCES):
+        # The persisted index, or None if missing or stale
+        path = index_path(directory)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r') as f:
+            data = json.load(f)
+        names = sorted(name for name in os.listdir(directory) if name.endswith('.json'))
+        if names != sorted(data['files']):
+            return None
+        for name, stamp in data['files'].items():
+            if _stamp(os.path.join(directory, name)) != stamp:
+                return None
+        present = [source for source in cuid_sources if os.path.exists(source)]
+        if sorted(present) != sorted(data['sources']):
+            return None
+        for source in present:
+            if _stamp(source) != data['sources'][source]:
+                return None
+        return cls(directory, data)
+
+    @classmethod
+    def open(cls, directory, cuid_sources=CUID_SOURCES):
+        index = cls.load(directory, cuid_sources)
+        if index is None:
+            index = cls.build(directory, cuid_sources)
+            index.save()
+        return index
+
+    def save(self):
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        path = index_path(self.directory)
+        with open(path + '.tmp', 'w') as f:
+            json.dump({'files': self.files, 'sources': self.sources,
+                       'spans': self.spans, 'keys': self.keys}, f)
+        os.replace(path + '.tmp', path)
+
+    def __len__(self):
+        return len(self.spans)
+
+    def record_no(self, key, kind=None):
+        # Accepts a dataset id, URL, OnePrep question id or database cuid;
+        # numeric keys are tried as dataset ids first unless `kind` says otherwise
+        key = str(key)
+        if kind:
+            return self.keys.get(kind + ':' + key)
+        if key.startswith('http'):
+            return self.keys.get('url:' + key)
+        for prefix in ('cuid:', 'id:', 'question:'):
+            record_no = self.keys.get(prefix + key)
+            if record_no is not None:
+                return record_no
+        return None
+
+    def locate(self, key, kind=None):
+        # (path, byte start, byte end) of the question's record, or None
+        record_no = self.record_no(key, kind)
+        if record_no is None:
+            return None
+        name, start, end = self.spans[record_no]
+        return os.path.join(self.directory, name), start, end
+
+    def get(self, key, kind=None):
+        location = self.locate(key, kind)
+        if location is None:
+            return None
+        path, start, end = location
+        with open(path, 'rb') as f:
+            f.seek(start)
+            return json.loads(f.read(end - start))
@@ -0,0 +1,92 @@
+import html
+import re
+from html.parser import HTMLParser
+
+from repair.ingest import MATCH_COLUMNS, RecordLayout
+from repair.text import WS_RE
+
+# Class of the element wrapping the question (passage + stem) on a question page,
+# i.e. what the export's Question_html column holds
+QUESTION_CONTAINER = 'question-content'
+# Tags that separate words; inline ones (em, u, span, ...) are dropped without a space
+BLOCK_TAG_RE = re.compile(r'</?(?:p|div|br|li|ul|ol|h[1-6]|table|tr|td|th|figure|blockquote)\b[^>]*>', re.IGNORECASE)
+INLINE_TAG_RE = re.compile(r'<[^>]+>')
+VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta',
+             'param', 'source', 'track', 'wbr'}
+
+
+class _ContainerFinder(HTMLParser):
+    # Source offsets of the inner HTML of the first element with the class
+    def __init__(self, container):
+        super().__init__(convert_charrefs=False)
+        self.container = container
+        self.line_starts = [0]
+        self.tag = None
+        self.depth = 0
+        self.start = None
+        self.end = None
+
+    def source_offset(self):
+        line, col = self.getpos()
+        return self.line_starts[line - 1] + col
+
+    def handle_starttag(self, tag, attrs):
+        if self.end is not None:
+            return
+        if self.start is None:
+            classes = (dict(attrs).get('class') or '').split()
+            if self.container in classes:
+                self.start = self.source_offset() + len(self.get_starttag_text())
+                self.tag = tag
+                self.depth = 1
+        elif tag == self.tag:
+            self.depth += 1
+
+    def handle_endtag(self, tag):
+        if self.start is None or self.end is not None or tag != self.tag:
+            return
+        self.depth -= 1
+        if self.depth == 0:
+            self.end = self.source_offset()
+
+
+def question_html(page, container=QUESTION_CONTAINER):
+    # Inner HTML of the question container, exactly as it appears in the page
+    finder = _ContainerFinder(container)
+    pos = page.find('\n')
+    while pos != -1:
+        finder.line_starts.append(pos + 1)
+        pos = page.find('\n', pos + 1)
+    finder.feed(page)
+    finder.close()
+    if finder.start is None:
+        return None
+    if finder.end is None or finder.tag in VOID_TAGS:
+        return page[finder.start:].strip()
+    return page[finder.start:finder.end].strip()
+
+
+def question_text(markup):
+    # Close to the export's plain Question column: tags dropped, whitespace collapsed
+    text = INLINE_TAG_RE.sub('', BLOCK_TAG_RE.sub(' ', markup))
+    return WS_RE.sub(' ', html.unescape(text)).strip()
+
+
+class PageRecords:
+    """Turn fetched question pages into rows for the CSV matchers.
+
+    Records carry the export's URL/Question/Question_html columns, so a
+    PatternTable or FuzzyMatches scans fetched pages exactly like CSV
+    rows. Row numbers are the position of the URL in the fetch list.
+    """
+
+    def __init__(self, urls, container=QUESTION_CONTAINER):
+        self.row_nos = {url: n for n, url in enumerate(dict.fromkeys(urls))}
+        self.container = container
+        self.layout = RecordLayout(MATCH_COLUMNS)
+
+    def record(self, url, page):
+        markup = question_html(page, self.container)
+        if markup is None:
+            return None
+        return self.layout.record(self.row_nos[url], 0, (url, question_text(markup), markup))
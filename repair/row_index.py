@@ -0,0 +1,180 @@
+import csv
+import json
+import mmap
+import os
+import re
+from bisect import bisect_right
+
+from repair.ingest import RecordLayout
+
+QUESTION_ID_RE = re.compile(r'/question/(\d+)')
+
+
+def sidecar_path(csv_file):
+    return csv_file + '.rowidx.json'
+
+
+def _decode(data):
+    # Same newline translation as reading the CSV in text mode
+    return data.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+
+
+def _parse(data):
+    return next(csv.reader([_decode(data)]), [])
+
+
+def question_id_from_url(url):
+    # "https://oneprep.xyz/question/2630/?question_set=..." -> "2630"
+    match = QUESTION_ID_RE.search(url or '')
+    return match.group(1) if match else None
+
+
+class RowIndex:
+    """Byte offsets of every record in a CSV export, persisted next to it.
+
+    Maps row number, starting line, source URL and OnePrep question id to
+    the record's byte span, so a script can seek straight to a handful of
+    rows instead of re-reading the whole export. The sidecar is rebuilt
+    whenever the CSV's size or mtime changes.
+    """
+
+    def __init__(self, csv_file, size, mtime_ns, header, starts, ends, lines, urls, question_ids):
+        self.csv_file = csv_file
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.header = header
+        self.starts = starts
+        self.ends = ends
+        self.lines = lines
+        self.urls = urls
+        self.question_ids = question_ids
+        self._layouts = {}
+        self._file = None
+        self._map = None
+
+    @classmethod
+    def build(cls, csv_file):
+        stat = os.stat(csv_file)
+        header = None
+        url_pos = None
+        starts, ends, lines = [], [], []
+        urls, question_ids = {}, {}
+
+        with open(csv_file, 'rb') as f:
+            offset = 0
+            line_no = 0
+            chunks = []
+            record_start = record_line = None
+            quotes = 0
+            for line in f:
+                line_no += 1
+                if not chunks:
+                    # Blank lines between records are skipped, like csv.reader does
+                    if not line.strip(b'\r\n'):
+                        offset += len(line)
+                        continue
+                    record_start, record_line, quotes = offset, line_no, 0
+                offset += len(line)
+                chunks.append(line)
+                quotes += line.count(b'"')
+                if quotes % 2:
+                    continue  # still inside a quoted multi-line cell
+
+                values = _parse(b''.join(chunks))
+                chunks = []
+                if header is None:
+                    header = values
+                    url_pos = header.index('URL') if 'URL' in header else None
+                    continue
+
+                row_no = len(starts)
+                starts.append(record_start)
+                ends.append(offset)
+                lines.append(record_line)
+                url = values[url_pos] if url_pos is not None and url_pos < len(values) else ''
+                if url:
+                    urls.setdefault(url, row_no)
+                    question_id = question_id_from_url(url)
+                    if question_id:
+                        question_ids.setdefault(question_id, row_no)
+
+        return cls(csv_file, stat.st_size, stat.st_mtime_ns, header or [], starts, ends, lines, urls, question_ids)
+
+    @classmethod
+    def load(cls, csv_file):
+        # The persisted index, or None if missing or stale
+        path = sidecar_path(csv_file)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r') as f:
+            data = json.load(f)
+        stat = os.stat(csv_file)
+        if data.get('size') != stat.st_size or data.get('mtime_ns') != stat.st_mtime_ns:
+            return None
+        return cls(csv_file, data['size'], data['mtime_ns'], data['header'], data['starts'],
+                   data['ends'], data['lines'], data['urls'], data['question_ids'])
+
+    @classmethod
+    def open(cls, csv_file):
+        index = cls.load(csv_file)
+        if index is None:
+            index = cls.build(csv_file)
+            index.save()
+        return index
+
+    def save(self):
+        with open(sidecar_path(self.csv_file), 'w') as f:
+            json.dump({
+                'size': self.size,
+                'mtime_ns': self.mtime_ns,
+                'header': self.header,
+                'starts': self.starts,
+                'ends': self.ends,
+                'lines': self.lines,
+                'urls': self.urls,
+                'question_ids': self.question_ids
+            }, f)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._file.close()
+            self._map = self._file = None
+
+    def raw(self, row_no):
+        if self._map is None:
+            self._file = open(self.csv_file, 'rb')
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map[self.starts[row_no]:self.ends[row_no]]
+
+    def read(self, row_no, columns=None):
+        key = tuple(columns) if columns else None
+        layout = self._layouts.get(key)
+        if layout is None:
+            layout = self._layouts[key] = RecordLayout(self.header, columns)
+        return layout.record(row_no, self.lines[row_no], _parse(self.raw(row_no)))
+
+    def row_for_line(self, line_no):
+        # The record whose span covers line_no, which may be any line of a multi-line quoted cell
+        i = bisect_right(self.lines, line_no) - 1
+        if i < 0:
+            return None
+        raw = self.raw(i)
+        if line_no >= self.lines[i] + raw.count(b'\n') + (not raw.endswith(b'\n')):
+            return None  # the header, or a blank line between records
+        return i
+
+    def row_for_url(self, url):
+        return self.urls.get(url)
+
+    def row_for_question_id(self, question_id):
+        return self.question_ids.get(str(question_id))
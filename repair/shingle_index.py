@@ -0,0 +1,141 @@
+from array import array
+from bisect import bisect_left
+
+from repair.metrics import LookupResults
+from repair.text import tokenize
+
+INDEXED_COLUMNS = ('Question', 'Question_html')
+
+
+def _contains(postings, row_no):
+    i = bisect_left(postings, row_no)
+    return i < len(postings) and postings[i] == row_no
+
+
+class ShingleIndex:
+    """Inverted index from word shingles to CSV row numbers.
+
+    Built once over the parsed export so each truncated question only
+    verifies the handful of rows sharing its words, instead of scanning
+    every row. Candidates come back in file order, which keeps the
+    "first matching row wins" behaviour of the old nested loops.
+    """
+
+    def __init__(self, columns=INDEXED_COLUMNS):
+        self.columns = columns
+        self.rows = []
+        self.postings = {}
+
+    @classmethod
+    def build(cls, rows, columns=INDEXED_COLUMNS):
+        index = cls(columns)
+        for row in rows:
+            index.add(row)
+        return index
+
+    def add(self, row):
+        row_no = len(self.rows)
+        self.rows.append(row)
+        shingles = set()
+        for column in self.columns:
+            shingles.update(tokenize(row.get(column, '')))
+        for shingle in shingles:
+            postings = self.postings.get(shingle)
+            if postings is None:
+                postings = self.postings[shingle] = array('I')
+            postings.append(row_no)
+        return row_no
+
+    def _containing(self, fragment):
+        # Rows holding a shingle that contains `fragment` (a word cut at the edge)
+        found = set()
+        for shingle, postings in self.postings.items():
+            if fragment in shingle:
+                found.update(postings)
+        return sorted(found)
+
+    def candidates(self, text, prefix=False):
+        words = tokenize(text)
+        if not words:
+            return range(len(self.rows))
+
+        # The last word may be cut mid-word, and so may the first one unless
+        # the text is anchored at the start of the column (prefix=True)
+        whole = set(words[:-1] if prefix else words[1:-1])
+        if not whole:
+            return self._containing(max(words, key=len))
+
+        lists = []
+        for word in whole:
+            postings = self.postings.get(word)
+            if postings is None:
+                return []
+            lists.append(postings)
+        lists.sort(key=len)
+        rarest, others = lists[0], lists[1:]
+        return [row_no for row_no in rarest
+                if all(_contains(postings, row_no) for postings in others)]
+
+    def find_first(self, text, predicate, prefix=False):
+        # Row number of the first row (in file order) that passes `predicate`
+        for row_no in self.candidates(text, prefix):
+            if predicate(self.rows[row_no]):
+                return row_no
+        return None
+
+
+class StartsWith:
+    # Picklable row predicate: `column` starts with `text`
+    def __init__(self, column, text):
+        self.column = column
+        self.text = text
+
+    def __call__(self, row):
+        return row.get(self.column, '').startswith(self.text)
+
+
+class Contains:
+    # Picklable row predicate: `column` contains every phrase
+    def __init__(self, column, *phrases):
+        self.column = column
+        self.phrases = phrases
+
+    def __call__(self, row):
+        value = row.get(self.column, '')
+        return all(phrase in value for phrase in self.phrases)
+
+
+class FirstMatches:
+    """Resolve a batch of lookups against a stream of CsvRecords.
+
+    `lookups` maps a key to (text, predicate, prefix) as passed to
+    ShingleIndex.find_first. Calling the object indexes the rows and
+    returns {key: (row_no, row)} for every lookup that hit, so it can run
+    on one shard of the CSV and be merged with `merge`. The result's
+    `candidates` holds how many rows each lookup had to verify.
+    """
+
+    def __init__(self, lookups):
+        self.lookups = lookups
+
+    def __call__(self, rows):
+        index = ShingleIndex.build(rows)
+        found = LookupResults()
+        for key, (text, predicate, prefix) in self.lookups.items():
+            candidates = index.candidates(text, prefix)
+            found.candidates[key] = len(candidates)
+            local = next((row_no for row_no in candidates if predicate(index.rows[row_no])), None)
+            if local is not None:
+                row = index.rows[local]
+                found[key] = (row.row_no, row)
+        return found
+
+    @staticmethod
+    def merge(results):
+        merged = LookupResults()
+        for found in results:
+            merged.absorb(found)
+            for key, hit in found.items():
+                if key not in merged or hit[0] < merged[key][0]:
+                    merged[key] = hit
+        return merged
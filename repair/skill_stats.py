@@ -0,0 +1,294 @@
+from array import array
+
+from repair.db_writer import BATCH_SIZE, PLACEHOLDERS
+from repair.impact_index import FETCH_SIZE, Codes
+
+WATERMARK = 'skill_stats'
+# Summary tables, as declared in prisma/schema.prisma; created here only on a sqlite stand-in
+STANDIN_SCHEMA = [
+    'CREATE TABLE IF NOT EXISTS "StudentSkillStat" ("studentId" TEXT, "skillId" TEXT, attempts INTEGER, '
+    'correct INTEGER, accuracy REAL, "updatedAt" TEXT, PRIMARY KEY ("studentId", "skillId"))',
+    'CREATE TABLE IF NOT EXISTS "StudentDomainStat" ("studentId" TEXT, "domainId" TEXT, attempts INTEGER, '
+    'correct INTEGER, accuracy REAL, mastery REAL, "updatedAt" TEXT, PRIMARY KEY ("studentId", "domainId"))',
+    'CREATE TABLE IF NOT EXISTS "SkillStat" ("skillId" TEXT PRIMARY KEY, attempts INTEGER, correct INTEGER, '
+    'accuracy REAL, students INTEGER, "updatedAt" TEXT)',
+    'CREATE TABLE IF NOT EXISTS "DomainStat" ("domainId" TEXT PRIMARY KEY, attempts INTEGER, correct INTEGER, '
+    'accuracy REAL, students INTEGER, "updatedAt" TEXT)',
+    'CREATE TABLE IF NOT EXISTS "StatsWatermark" (name TEXT PRIMARY KEY, "lastCompletedAt" TEXT, '
+    'answers INTEGER, "refreshedAt" TEXT)',
+]
+STAT_TABLES = ['StudentSkillStat', 'StudentDomainStat', 'SkillStat', 'DomainStat']
+NONE = -1
+# Answers that count: graded (the answers route saves them with isCorrect NULL) on a submitted assignment
+GRADED = 'e.status = \'COMPLETED\' AND a."isCorrect" IS NOT NULL'
+
+
+def _rows(cursor, sql, params=()):
+    cursor.execute(sql, params)
+    while True:
+        batch = cursor.fetchmany(FETCH_SIZE)
+        if not batch:
+            break
+        yield from batch
+
+
+def _group(keys, flags):
+    # {key: [rows, flagged rows]} over two parallel int columns
+    groups = {}
+    for key, flag in zip(keys, flags):
+        found = groups.get(key)
+        if found is None:
+            groups[key] = [1, flag]
+        else:
+            found[0] += 1
+            found[1] += flag
+    return groups
+
+
+class GradedAnswers:
+    """Graded StudentAnswer rows of some students, one int-encoded column each.
+
+    skill and domain come from the answered question's classification
+    (NONE when it has none); student from the assignment.
+    """
+
+    def __init__(self):
+        self.students = Codes()
+        self.student = array('l')
+        self.skill = array('l')
+        self.domain = array('l')
+        self.correct = array('b')
+
+    def __len__(self):
+        return len(self.student)
+
+
+class SkillStats:
+    """Per-student and overall accuracy by Skill and Domain, kept in summary tables.
+
+    StudentSkillStat and StudentDomainStat hold attempts, correct answers
+    and accuracy per student; StudentDomainStat also holds mastery, the
+    meanImportance-weighted mean of the student's skill accuracies in the
+    domain. SkillStat and DomainStat hold the totals over all students.
+    Only graded answers of completed assignments count, and answers are
+    graded when the assignment is submitted, so the watermark is the
+    latest ExamAssignment.completedAt folded in. A refresh recomputes the
+    rows of every student with an assignment completed at or after it
+    (retakes included) from all of that student's graded answers, and
+    moves the overall totals by the difference. Everything, watermark
+    included, commits in one transaction.
+    """
+
+    def __init__(self, connection, paramstyle='qmark', batch_size=BATCH_SIZE):
+        self.connection = connection
+        self.placeholder = PLACEHOLDERS[paramstyle]
+        self.batch_size = batch_size
+        self.statements = 0
+        self.skills = Codes()
+        self.domains = Codes()
+        self.skill_domain = array('l')
+        self.importance = array('d')
+        self.placed = {}          # ExamQuestion id -> (skill code, domain code)
+
+    def _classify(self, cursor):
+        for cuid, domain, importance in _rows(cursor, 'SELECT id, "domainId", "meanImportance" FROM "Skill"'):
+            self.skills.code(cuid)
+            self.skill_domain.append(self.domains.code(domain))
+            self.importance.append(importance if importance else 1.0)
+        for cuid, skill, domain in _rows(cursor, 'SELECT q.id, b."skillId", b."domainId" FROM "ExamQuestion" q '
+                                                 'JOIN "QuestionBankItem" b ON b.id = q."questionId"'):
+            skill = self.skills.index.get(skill, NONE)
+            if skill != NONE:
+                domain = self.domains.values[self.skill_domain[skill]]
+            self.placed[cuid] = (skill, NONE if domain is None else self.domains.code(domain))
+
+    def watermark(self, cursor):
+        # (found, last completedAt folded in, domain-classified answers counted then)
+        cursor.execute(f'SELECT "lastCompletedAt", answers FROM "StatsWatermark" WHERE name = {self.placeholder}',
+                       (WATERMARK,))
+        found = cursor.fetchone()
+        return (True, found[0], found[1]) if found else (False, None, 0)
+
+    def completed_since(self, cursor, since):
+        # Students with an assignment completed at or after `since` (ties are refolded, which is harmless)
+        sql = 'SELECT DISTINCT "studentId" FROM "ExamAssignment" WHERE status = \'COMPLETED\''
+        if since is None:
+            return sorted(student for (student,) in _rows(cursor, sql))
+        return sorted(student for (student,) in _rows(cursor, sql + f' AND "completedAt" >= {self.placeholder}',
+                                                      (since,)))
+
+    def graded_answers(self, cursor, students=None):
+        # Every graded answer, or those of `students`
+        answers = GradedAnswers()
+        sql = ('SELECT a."examQuestionId", a."isCorrect", e."studentId" FROM "StudentAnswer" a '
+               f'JOIN "ExamAssignment" e ON e.id = a."assignmentId" WHERE {GRADED}')
+        if students is None:
+            batches = [(sql, ())]
+        else:
+            batches = [(sql + f' AND e."studentId" IN ({", ".join([self.placeholder] * len(batch))})', batch)
+                       for batch in (students[i:i + self.batch_size] for i in range(0, len(students), self.batch_size))]
+        for statement, params in batches:
+            for exam_question, correct, student in _rows(cursor, statement, params):
+                skill, domain = self.placed.get(exam_question, (NONE, NONE))
+                answers.student.append(answers.students.code(student))
+                answers.skill.append(skill)
+                answers.domain.append(domain)
+                answers.correct.append(bool(correct))
+            self.statements += 1
+        return answers
+
+    def classified_total(self, cursor):
+        # Graded answers that land in a domain, i.e. the sum of StudentDomainStat.attempts once folded
+        total = 0
+        for exam_question, count in _rows(cursor, 'SELECT a."examQuestionId", COUNT(*) FROM "StudentAnswer" a '
+                                                  f'JOIN "ExamAssignment" e ON e.id = a."assignmentId" '
+                                                  f'WHERE {GRADED} GROUP BY a."examQuestionId"'):
+            if self.placed.get(exam_question, (NONE, NONE))[1] != NONE:
+                total += count
+        return total
+
+    def _existing(self, cursor, table, column, codes, students):
+        # {(student, code): [attempts, correct]} already stored for `students`
+        found = {}
+        for start in range(0, len(students), self.batch_size):
+            batch = students[start:start + self.batch_size]
+            marks = ', '.join([self.placeholder] * len(batch))
+            for student, key, attempts, correct in _rows(
+                    cursor, f'SELECT "studentId", "{column}", attempts, correct FROM "{table}" '
+                            f'WHERE "studentId" IN ({marks})', batch):
+                if key in codes.index:
+                    found[(student, codes.index[key])] = [attempts, correct]
+            self.statements += 1
+        return found
+
+    def _delete(self, cursor, table, students):
+        for start in range(0, len(students), self.batch_size):
+            batch = students[start:start + self.batch_size]
+            cursor.execute(f'DELETE FROM "{table}" WHERE "studentId" IN '
+                           f'({", ".join([self.placeholder] * len(batch))})', batch)
+            self.statements += 1
+
+    def _upsert(self, cursor, table, keys, columns, rows, merge, stamp='updatedAt'):
+        # Multi-row INSERT ... ON CONFLICT DO UPDATE (Postgres and SQLite 3.24+)
+        width = len(keys) + len(columns)
+        names = ', '.join(f'"{name}"' for name in keys + columns)
+        conflict = ', '.join(f'"{name}"' for name in keys)
+        for start in range(0, len(rows), self.batch_size):
+            batch = rows[start:start + self.batch_size]
+            values = ', '.join('(' + ', '.join([self.placeholder] * width) + ', CURRENT_TIMESTAMP)' for _ in batch)
+            cursor.execute(f'INSERT INTO "{table}" ({names}, "{stamp}") VALUES {values} '
+                           f'ON CONFLICT ({conflict}) DO UPDATE SET {merge}, "{stamp}" = CURRENT_TIMESTAMP',
+                           [value for row in batch for value in row])
+            self.statements += 1
+
+    def _sums(self, answers):
+        # ({(student, skill): [attempts, correct]}, {(student, domain): [attempts, correct]})
+        n_skills = len(self.skills) or 1
+        n_domains = len(self.domains) or 1
+        skill_keys = array('l', (s * n_skills + k if k != NONE else NONE
+                                 for s, k in zip(answers.student, answers.skill)))
+        domain_keys = array('l', (s * n_domains + d if d != NONE else NONE
+                                  for s, d in zip(answers.student, answers.domain)))
+        by_skill = _group(skill_keys, answers.correct)
+        by_domain = _group(domain_keys, answers.correct)
+        by_skill.pop(NONE, None)
+        by_domain.pop(NONE, None)
+        students = answers.students.values
+        return ({(students[key // n_skills], key % n_skills): sums for key, sums in by_skill.items()},
+                {(students[key // n_domains], key % n_domains): sums for key, sums in by_domain.items()})
+
+    def refresh(self, rebuild=False, dry_run=False):
+        """Fold newly completed assignments into the summary tables; returns counts for the log.
+
+        With rebuild=True, or when the answers of the students not
+        refolded no longer add up to what was counted last time (answers
+        deleted or added outside submission), the tables are emptied and
+        rebuilt from every graded answer. Regrading already-completed
+        assignments (rescore_impacted.py) needs rebuild=True.
+        """
+        cursor = self.connection.cursor()
+        try:
+            self._classify(cursor)
+            found, since, counted = self.watermark(cursor)
+            cursor.execute('SELECT MAX("completedAt") FROM "ExamAssignment" WHERE status = \'COMPLETED\'')
+            latest = cursor.fetchone()[0]
+            total = self.classified_total(cursor)
+            if not rebuild and found:
+                students = self.completed_since(cursor, since)
+                answers = self.graded_answers(cursor, students)
+                skill_sums, domain_sums = self._sums(answers)
+                old_skills = self._existing(cursor, 'StudentSkillStat', 'skillId', self.skills, students)
+                old_domains = self._existing(cursor, 'StudentDomainStat', 'domainId', self.domains, students)
+                before = sum(attempts for attempts, _ in old_domains.values())
+                after = sum(attempts for attempts, _ in domain_sums.values())
+                rebuild = counted - before + after != total
+            if rebuild or not found:
+                for table in STAT_TABLES:
+                    cursor.execute(f'DELETE FROM "{table}"')
+                answers = self.graded_answers(cursor)
+                skill_sums, domain_sums = self._sums(answers)
+                students, old_skills, old_domains = [], {}, {}
+            result = self._fold(cursor, students, skill_sums, domain_sums, old_skills, old_domains)
+            result.update(rebuilt=rebuild or not found, answers=len(answers), total=total,
+                          students=len(students) if students else len(answers.students))
+            self._upsert(cursor, 'StatsWatermark', ['name'], ['lastCompletedAt', 'answers'],
+                         [(WATERMARK, latest, total)],
+                         '"lastCompletedAt" = excluded."lastCompletedAt", answers = excluded.answers', 'refreshedAt')
+        except Exception:
+            self.connection.rollback()
+            raise
+        finally:
+            cursor.close()
+        if dry_run:
+            self.connection.rollback()
+        else:
+            self.connection.commit()
+        return result
+
+    def _fold(self, cursor, students, skill_sums, domain_sums, old_skills, old_domains):
+        # Replace the refolded students' rows and move the overall totals by new minus old
+        for table in ('StudentSkillStat', 'StudentDomainStat'):
+            self._delete(cursor, table, students)
+
+        # Mastery over every skill the student has answered in the domain
+        weighted = {}
+        for (student, skill), (attempts, correct) in skill_sums.items():
+            pair = (student, self.skill_domain[skill])
+            sums = weighted.setdefault(pair, [0.0, 0.0])
+            sums[0] += self.importance[skill] * correct / attempts
+            sums[1] += self.importance[skill]
+
+        self._upsert(cursor, 'StudentSkillStat', ['studentId', 'skillId'], ['attempts', 'correct', 'accuracy'],
+                     [(student, self.skills.values[skill], attempts, correct, correct / attempts)
+                      for (student, skill), (attempts, correct) in sorted(skill_sums.items())],
+                     'attempts = excluded.attempts, correct = excluded.correct, accuracy = excluded.accuracy')
+        self._upsert(cursor, 'StudentDomainStat', ['studentId', 'domainId'],
+                     ['attempts', 'correct', 'accuracy', 'mastery'],
+                     [(student, self.domains.values[domain], attempts, correct, correct / attempts,
+                       weighted[(student, domain)][0] / weighted[(student, domain)][1]
+                       if (student, domain) in weighted else None)
+                      for (student, domain), (attempts, correct) in sorted(domain_sums.items())],
+                     'attempts = excluded.attempts, correct = excluded.correct, accuracy = excluded.accuracy, '
+                     'mastery = excluded.mastery')
+
+        changed = {}
+        for table, column, codes, new, old in (('SkillStat', 'skillId', self.skills, skill_sums, old_skills),
+                                               ('DomainStat', 'domainId', self.domains, domain_sums, old_domains)):
+            deltas = {}
+            for sign, rows in ((1, new), (-1, old)):
+                for (_, code), (attempts, correct) in rows.items():
+                    delta = deltas.setdefault(code, [0, 0, 0])
+                    delta[0] += sign * attempts
+                    delta[1] += sign * correct
+                    delta[2] += sign
+            deltas = {code: delta for code, delta in deltas.items() if any(delta)}
+            self._upsert(cursor, table, [column], ['attempts', 'correct', 'accuracy', 'students'],
+                         [(codes.values[code], attempts, correct, correct / attempts if attempts > 0 else 0.0, n)
+                          for code, (attempts, correct, n) in sorted(deltas.items())],
+                         f'attempts = "{table}".attempts + excluded.attempts, '
+                         f'correct = "{table}".correct + excluded.correct, '
+                         f'accuracy = COALESCE(("{table}".correct + excluded.correct) * 1.0 / '
+                         f'NULLIF("{table}".attempts + excluded.attempts, 0), 0), '
+                         f'students = "{table}".students + excluded.students')
+            changed[column] = len(deltas)
+        return {'skills': changed['skillId'], 'domains': changed['domainId']}
@@ -0,0 +1,247 @@
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+from array import array
+from itertools import chain
+
+from repair.ingest import CsvRecord, iter_rows
+
+MAGIC = b'RPSNAP01'
+PREAMBLE = struct.Struct('<8sQ')
+
+
+def snapshot_path(csv_file):
+    return csv_file + '.snapshot'
+
+
+def file_digest(path):
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _pad(n):
+    return (n + 7) & ~7
+
+
+class SnapshotRecord:
+    """A row of a Snapshot; columns are decoded from the mapped file on access.
+
+    Behaves like CsvRecord. When pickled (e.g. returned from a worker
+    process) it turns into a plain CsvRecord with its values materialized.
+    """
+
+    __slots__ = ('snapshot', 'row_no', 'columns')
+
+    def __init__(self, snapshot, row_no, columns):
+        self.snapshot = snapshot
+        self.row_no = row_no
+        self.columns = columns    # column name -> position in the snapshot
+
+    @property
+    def line_no(self):
+        return self.snapshot.lines[self.row_no]
+
+    def get(self, column, default=None):
+        pos = self.columns.get(column)
+        return default if pos is None else self.snapshot.value(self.row_no, pos)
+
+    def __getitem__(self, column):
+        return self.snapshot.value(self.row_no, self.columns[column])
+
+    def __contains__(self, column):
+        return column in self.columns
+
+    def __reduce__(self):
+        names = list(self.columns)
+        values = tuple(self.snapshot.value(self.row_no, self.columns[name]) for name in names)
+        layout = {name: i for i, name in enumerate(names)}
+        return CsvRecord, (self.row_no, self.line_no, layout, values)
+
+
+class Snapshot:
+    """Binary snapshot of a parsed CSV export, memory-mapped on load.
+
+    Every column is stored as one UTF-8 blob plus a uint64 offset array,
+    so loading is just an mmap and a small JSON header, string values are
+    decoded only when read, and processes mapping the same snapshot share
+    its pages. The snapshot records the CSV's digest: it is reused while
+    the CSV's size and mtime are unchanged, and after a touch only if the
+    content digest still matches (the new mtime is then stamped in).
+    """
+
+    def __init__(self, path, header, file, mapped, body):
+        self.path = path
+        self.header = header
+        self.columns = header['columns']
+        self._positions = {name: i for i, name in enumerate(self.columns)}
+        self._file = file
+        self._map = mapped
+        self._body = body
+        view = memoryview(mapped)
+        self.lines = view[body + header['lines']:body + header['lines'] + 4 * header['rows']].cast('I')
+        self._offsets = []
+        self._data = []
+        for section in header['sections']:
+            start = body + section['offsets']
+            self._offsets.append(view[start:start + 8 * (header['rows'] + 1)].cast('Q'))
+            self._data.append(body + section['data'])
+
+    @classmethod
+    def build(cls, csv_file, path=None):
+        path = path or snapshot_path(csv_file)
+        stat = os.stat(csv_file)
+        digest = file_digest(csv_file)
+
+        rows = iter_rows(csv_file)
+        first = next(rows, None)
+        columns = list(first.columns) if first is not None else []
+        blobs = [tempfile.TemporaryFile() for _ in columns]
+        offsets = [array('Q', [0]) for _ in columns]
+        lines = array('I')
+        count = 0
+        try:
+            if first is not None:
+                for record in chain([first], rows):
+                    lines.append(record.line_no)
+                    for i, value in enumerate(record.values):
+                        data = value.encode('utf-8')
+                        blobs[i].write(data)
+                        offsets[i].append(offsets[i][-1] + len(data))
+                    count += 1
+
+            # Lay out: lines, then per column its offsets and data, 8-byte aligned
+            sections = []
+            position = _pad(len(lines) * 4)
+            for i in range(len(columns)):
+                section = {'offsets': position}
+                position = _pad(position + len(offsets[i]) * 8)
+                section['data'] = position
+                position = _pad(position + offsets[i][-1])
+                sections.append(section)
+            header = {
+                'csv_digest': digest,
+                'csv_size': stat.st_size,
+                'csv_mtime_ns': stat.st_mtime_ns,
+                'rows': count,
+                'columns': columns,
+                'lines': 0,
+                'sections': sections
+            }
+            header_bytes = json.dumps(header).encode('utf-8')
+            header_bytes += b' ' * (_pad(len(header_bytes)) - len(header_bytes))
+
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'wb') as out:
+                out.write(PREAMBLE.pack(MAGIC, len(header_bytes)))
+                out.write(header_bytes)
+                body = out.tell()
+                out.write(lines.tobytes())
+                for i, section in enumerate(sections):
+                    out.seek(body + section['offsets'])
+                    out.write(offsets[i].tobytes())
+                    out.seek(body + section['data'])
+                    blobs[i].seek(0)
+                    shutil.copyfileobj(blobs[i], out)
+                out.truncate(body + position)
+            os.replace(tmp_path, path)
+        finally:
+            for blob in blobs:
+                blob.close()
+        return cls.map(path)
+
+    @classmethod
+    def map(cls, path):
+        # Map a snapshot without checking it against its CSV
+        f = open(path, 'rb')
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, header_len = PREAMBLE.unpack_from(mapped, 0)
+        if magic != MAGIC:
+            mapped.close()
+            f.close()
+            raise ValueError(f"{path} is not a repair snapshot")
+        header = json.loads(mapped[PREAMBLE.size:PREAMBLE.size + header_len])
+        return cls(path, header, f, mapped, PREAMBLE.size + header_len)
+
+    @classmethod
+    def load(cls, csv_file, path=None):
+        # The snapshot for csv_file, or None if missing or built from other content
+        path = path or snapshot_path(csv_file)
+        if not os.path.exists(path):
+            return None
+        try:
+            snapshot = cls.map(path)
+        except ValueError:
+            return None
+        header = snapshot.header
+        stat = os.stat(csv_file)
+        if header['csv_size'] == stat.st_size and header['csv_mtime_ns'] == stat.st_mtime_ns:
+            return snapshot
+        if header['csv_size'] == stat.st_size and header['csv_digest'] == file_digest(csv_file):
+            # Touched but unchanged: restamp so later loads take the size/mtime path again
+            snapshot._restamp(stat.st_mtime_ns)
+            return snapshot
+        snapshot.close()
+        return None
+
+    def _restamp(self, mtime_ns):
+        header = dict(self.header, csv_mtime_ns=mtime_ns)
+        header_bytes = json.dumps(header).encode('utf-8')
+        room = self._body - PREAMBLE.size
+        if len(header_bytes) > room:
+            return  # no padding left to grow into; the digest check keeps covering it
+        with open(self.path, 'r+b') as f:
+            f.seek(PREAMBLE.size)
+            f.write(header_bytes + b' ' * (room - len(header_bytes)))
+        self.header = header
+
+    @classmethod
+    def open(cls, csv_file, path=None):
+        snapshot = cls.load(csv_file, path)
+        if snapshot is None:
+            snapshot = cls.build(csv_file, path)
+        return snapshot
+
+    def __len__(self):
+        return self.header['rows']
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._map is None:
+            return
+        self.lines.release()
+        for offsets in self._offsets:
+            offsets.release()
+        self._map.close()
+        self._file.close()
+        self._map = None
+
+    def value(self, row_no, pos):
+        offsets = self._offsets[pos]
+        start = self._data[pos]
+        return self._map[start + offsets[row_no]:start + offsets[row_no + 1]].decode('utf-8')
+
+    def record(self, row_no, columns=None):
+        return SnapshotRecord(self, row_no, self._layout(columns))
+
+    def _layout(self, columns):
+        if not columns:
+            return dict(self._positions)
+        return {name: self._positions[name] for name in columns if name in self._positions}
+
+    def rows(self, columns=None, start=0, stop=None):
+        layout = self._layout(columns)
+        stop = len(self) if stop is None else min(stop, len(self))
+        for row_no in range(start, stop):
+            yield SnapshotRecord(self, row_no, layout)
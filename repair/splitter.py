@@ -0,0 +1,130 @@
+import re
+
+# Question stem tables of the three process-all-sat-questions*.js generators
+BASE_STEMS = [
+    "Which choice completes",
+    "Which choice best describes",
+    "Which choice best states",
+    "Which choice most",
+    "Which finding",
+    "Which quotation",
+    "Which statement",
+    "What is the main",
+    "What does the underlined",
+    "What does the author",
+    "What function does",
+    "According to the text,",
+    "According to the passage,",
+    "Based on the texts",
+    "Based on the text,",
+    "Based on the passage,",
+    "The passage most strongly suggests",
+    "The author's use of",
+    "The primary purpose",
+    "How does the",
+    "Why does the",
+    "In the context",
+    "It can most reasonably be inferred",
+    "The student wants",
+    "As used in line",
+    "The main purpose of",
+    "Both texts",
+    "Text 1 and Text 2",
+]
+CORRECT_STEMS = BASE_STEMS[:7] + [
+    "Which response from",
+    "What choice best states",
+    "As used in the text, what does",
+    "As used in the text, what",
+    "What does the word",
+    "What does the phrase",
+] + BASE_STEMS[7:]
+FIXED_STEMS = BASE_STEMS[:7] + [
+    "Which detail, if true",
+    "Which of the following",
+] + BASE_STEMS[7:]
+
+# variant -> (stems, split rule); "threshold" needs the stem past 50/100 chars,
+# "any" splits wherever a stem is found
+VARIANTS = {
+    'base': (BASE_STEMS, 'threshold'),
+    'correct': (CORRECT_STEMS, 'threshold'),
+    'fixed': (FIXED_STEMS, 'any'),
+}
+
+# String.prototype.trim() whitespace
+JS_WHITESPACE = (' \t\n\x0b\x0c\r\xa0\u1680\u2000\u2001\u2002\u2003\u2004\u2005\u2006'
+                 '\u2007\u2008\u2009\u200a\u2028\u2029\u202f\u205f\u3000\ufeff')
+
+
+def _js_index(text, index):
+    # JavaScript string index (UTF-16 code units) of text[index]
+    if not text or max(text) <= '\uffff':
+        return index
+    return len(text[:index].encode('utf-16-le')) // 2
+
+
+class StemSplitter:
+    """Split a question's plain text into passage and question stem.
+
+    Same result as parseQuestion() in process-all-sat-questions*.js, which
+    calls lastIndexOf() once per stem on every row. Here the whole stem
+    table is compiled into one regex alternation behind a lookahead, so a
+    single scan of the text reports every position where any stem starts
+    and the last one is the split point.
+    """
+
+    def __init__(self, stems=CORRECT_STEMS, rule='threshold'):
+        self.stems = list(stems)
+        self.rule = rule
+        # Longest first so a stem and its own prefix report the same start
+        alternation = '|'.join(re.escape(stem) for stem in sorted(set(self.stems), key=len, reverse=True))
+        self.regex = re.compile(f'(?=(?:{alternation}))')
+
+    @classmethod
+    def variant(cls, name):
+        stems, rule = VARIANTS[name]
+        return cls(stems, rule)
+
+    def split_point(self, text):
+        last = -1
+        for match in self.regex.finditer(text):
+            last = match.start()
+        return last
+
+    def split(self, full_text):
+        # {'passage', 'question', 'isDualText', 'isFillInBlank'} as parseQuestion returns it
+        if not full_text:
+            return {'passage': '', 'question': '', 'isDualText': False, 'isFillInBlank': False}
+        is_dual_text = 'Text 1' in full_text and 'Text 2' in full_text
+        is_fill_in_blank = '______' in full_text or 'blank' in full_text
+        split_point = self.split_point(full_text)
+
+        if self.rule == 'threshold':
+            threshold = 50 if (is_dual_text or is_fill_in_blank) else 100
+            if split_point >= 0 and _js_index(full_text, split_point) > threshold:
+                return {
+                    'passage': full_text[:split_point].strip(JS_WHITESPACE),
+                    'question': full_text[split_point:].strip(JS_WHITESPACE),
+                    'isDualText': is_dual_text,
+                    'isFillInBlank': is_fill_in_blank
+                }
+        elif split_point > 0:
+            passage = full_text[:split_point].strip(JS_WHITESPACE)
+            question = full_text[split_point:].strip(JS_WHITESPACE)
+            if passage and question and passage != full_text:
+                return {'passage': passage, 'question': question,
+                        'isDualText': is_dual_text, 'isFillInBlank': is_fill_in_blank}
+
+        # No usable split: everything is question (the generators also drop isDualText here)
+        return {'passage': '', 'question': full_text, 'isDualText': False, 'isFillInBlank': is_fill_in_blank}
+
+    def record_fields(self, full_text):
+        # The four fields as written into a sat_questions_by_test* record
+        parts = self.split(full_text)
+        return {
+            'passageText': parts['passage'] or full_text or '',
+            'questionText': parts['question'] or full_text or '',
+            'isFillInBlank': parts['isFillInBlank'],
+            'isDualText': parts['isDualText'],
+        }
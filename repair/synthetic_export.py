@@ -0,0 +1,216 @@
+import csv
+import json
+import random
+import re
+
+from repair.corpus import Corpus
+from repair.splitter import CORRECT_STEMS
+
+EXPORT_COLUMNS = ['URL', 'Question', 'Question_html', 'Question Type',
+                  'Choice A', 'Choice B', 'Choice C', 'Choice D',
+                  'Choice A_html', 'Choice B_html', 'Choice C_html', 'Choice D_html',
+                  'Correct Answer', 'Explaination', 'Explaination_html']
+# The real export carries a 16th column naming the module
+MODULE_COLUMN = 'Module'
+LETTERS = 'ABCD'
+
+WORDS = '''the of and to in a is that for it as was with be by on not he this are or his from at which
+but have an they you were her she there been one all we their has would when if more will no out so said
+what up its about into than them can only other new some could time these two may then do first any my now
+such like our over man me even most made after also did many before must through back years where much
+your way well down should because each just those people how too little state good very make world still
+own see men work long get here between both life being under never day same another know while last might
+us great old year off come since against go came right used take three researchers study scientists found
+evidence suggests historian species data results argue claim survey sample effect region century author
+novel poem painting culture community analysis theory model pattern growth habitat population increase
+decrease measure observed compared conditions traditional modern ancient artists writers musicians'''.split()
+SYLLABLES = ['ka', 'lo', 'mi', 'ra', 'ten', 'sho', 'var', 'del', 'an', 'qui', 'zo', 'bel', 'mar', 'tis', 'or', 'lun']
+TOPICS = ['novel', 'poem', 'study', 'painting', 'survey', 'experiment', 'essay', 'sculpture', 'opera', 'report']
+STEM_ENDINGS = {
+    'Which choice completes': ' the text with the most logical and precise word or phrase?',
+    'Which choice best states': ' the main idea of the text?',
+    'Which choice most': ' effectively uses relevant information from the notes to accomplish this goal?',
+    'Which quotation': ' from the text most effectively illustrates the claim?',
+    'Which finding': ', if true, would most directly support the claim?',
+    'Based on the text,': ' what can most reasonably be inferred?',
+}
+NOTES_INTRO = 'While researching a topic, a student has taken the following notes:'
+# Name and year opening every non-notes passage; what the search patterns key on
+ANCHOR_RE = re.compile(r"In ([A-Z][a-z]+ [A-Z][a-z]+)'s (\d{4})")
+MATH_PARTS = ['x', 'y', 'k', 'n', 'a', 'b']
+MATH_OPS = ['+', '−', '=', '×']
+
+CHOICE_TEMPLATE = (
+    '<div :class="{{deleted: $store.data.answer_choices_status[letter].is_deleted}}" '
+    'class="flex items-center answer-choice" x-data="{{answer_id: {answer_id}, letter: \'{letter}\', ua_index: null}}">\n'
+    '<div class="w-16 flex justify-center shrink-0" x-cloak="" x-show="$store.data.is_view_mode &amp;&amp; '
+    '$store.data.user_answers_group_index !== null &amp;&amp; $store.data.user_answers_groups'
+    '[$store.data.user_answers_group_index].unique_items.length &gt; 0">\n'
+    '<div class="w-7 h-7 border border-neutral rounded-full leading-none flex items-center justify-center relative '
+    'select-none font-sans" style="padding-left: 1px;">\n<span x-text="ua_index !== null ? ua_index + 1 : \'\'"></span>\n'
+    '</div>\n</div>\n'
+    '<div :class="!$store.data.is_view_mode ? {{\n'
+    '                                    \'border-neutral\': !$store.data.answer_choices_status[letter].is_submitted,\n'
+    '                                    \'border-primary\': !$store.data.answer_choices_status[letter].is_submitted '
+    '&amp;&amp; $store.data.answer_choices_status[letter].is_selected,\n'
+    '                                    \'border-success\': $store.data.answer_choices_status[letter].is_submitted '
+    '&amp;&amp; $store.data.answer_choices_status[letter].is_correct,\n'
+    '                                 }} : ($store.data.user_answers_group_index === null ? {{}} : {{\n'
+    '                                    \'border-success\': $store.data.user_answers_groups'
+    '[$store.data.user_answers_group_index].unique_items.some((ua, i) =&gt; ua.answer_choice_id === answer_id '
+    '&amp;&amp; ua.is_correct === true &amp;&amp; (ua_index = i)),\n'
+    '                                 }})" @click="!$store.data.is_view_mode &amp;&amp; '
+    '$store.data.select_answer_choice(letter)" class="flex flex-row border border-neutral rounded-xl p-3 mt-2 grow '
+    'relative transition-colors duration-200 answer-choice-content">\n'
+    '<div class="flex flex-row"> <!-- opacity-65 -->\n<div class="mr-3">\n'
+    '<div class="w-7 h-7 text-base leading-base border-2 border-neutral rounded-full transition-colors duration-200 '
+    'flex items-center justify-center select-none font-sans font-semibold" style="padding-left: 1px;">\n'
+    '                                            {letter}\n                                        </div>\n</div>\n'
+    '<div class="self-center">{content}</div>\n</div>\n'
+    '<div class="absolute border-t-2 inset-y-2/4 -left-2 -right-2 border-neutral answer-choice-deleted-line"></div>\n'
+    '</div>\n'
+    '<div class="w-16 flex justify-center shrink-0 answer-choice-delete" x-cloak="" '
+    'x-show="!$store.data.is_view_mode &amp;&amp; $store.data.delete_mode">\n'
+    '<div @click="$store.data.answer_choices_status[letter].is_deleted = '
+    '!$store.data.answer_choices_status[letter].is_deleted" class="w-7 h-7 border border-neutral rounded-full '
+    'leading-none flex items-center justify-center relative cursor-pointer select-none answer-choice-delete-button '
+    'font-sans" style="padding-left: 1px;">\n                                    {letter}\n'
+    '                                    <div class="absolute border-t-2 inset-y-2/4 -left-1 -right-1 border-neutral">'
+    '</div>\n</div>\n</div>\n</div>')
+
+
+def _mathml(expression):
+    return f'<math xmlns="http://www.w3.org/1998/Math/MathML" display="inline">{expression}</math>'
+
+
+class SyntheticExport:
+    """Deterministic OnePrep-style export rows for benchmarking.
+
+    Rows follow the column layout of IMPORT_FORMAT_GUIDE.md (plus the
+    Module column of the real export): English rows get a passage, a
+    question stem from the generators' stem table and sometimes a blank
+    or student notes; Math rows carry MathML drawn from a small pool, so
+    expressions repeat the way they do across real tests. Every choice
+    cell has the scraped answer-selection markup around its text.
+    `truncate` picks rows and cuts their Question_html the way the
+    database copies were cut, returning unfixed_questions.json-style
+    items plus a search pattern for each.
+    """
+
+    def __init__(self, seed=7, math_share=0.4, math_pool=400):
+        self.seed = seed
+        self.math_share = math_share
+        self.rng = random.Random(seed)
+        self.math_pool = [self._math_expression() for _ in range(math_pool)]
+
+    def _name(self):
+        rng = self.rng
+        parts = [''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))) for _ in range(2)]
+        return ' '.join(part.capitalize() for part in parts)
+
+    def _sentence(self, low=8, high=20):
+        words = self.rng.choices(WORDS, k=self.rng.randint(low, high))
+        return ' '.join(words).capitalize() + '.'
+
+    def _math_expression(self):
+        rng = self.rng
+        terms = []
+        for _ in range(rng.randint(2, 4)):
+            if rng.random() < 0.3:
+                terms.append(f'<msup><mi>{rng.choice(MATH_PARTS)}</mi><mn>{rng.randint(2, 3)}</mn></msup>')
+            elif rng.random() < 0.2:
+                terms.append(f'<mfrac><mn>{rng.randint(1, 9)}</mn><mn>{rng.randint(2, 9)}</mn></mfrac>')
+            else:
+                terms.append(f'<mn>{rng.randint(1, 99)}</mn><mi>{rng.choice(MATH_PARTS)}</mi>')
+        body = f'<mo>{rng.choice(MATH_OPS)}</mo>'.join(terms)
+        return _mathml(f'<mrow>{body}</mrow>')
+
+    def _english(self):
+        rng = self.rng
+        stem = rng.choice(CORRECT_STEMS)
+        stem_text = stem + STEM_ENDINGS.get(stem, ' the text?')
+        if rng.random() < 0.15:
+            notes = [self._sentence() for _ in range(rng.randint(4, 6))]
+            passage = f"{NOTES_INTRO} {' '.join(notes)}"
+            passage_html = f"<p>{NOTES_INTRO}</p><ul>{''.join(f'<li>{note}</li>' for note in notes)}</ul>"
+        else:
+            name, year, topic = self._name(), rng.randint(1780, 2020), rng.choice(TOPICS)
+            sentences = [f"In {name}'s {year} {topic}, {' '.join(rng.choices(WORDS, k=10))}."]
+            sentences += [self._sentence() for _ in range(rng.randint(3, 7))]
+            if rng.random() < 0.3:
+                sentences[-1] = sentences[-1][:-1] + ' ______.'
+            passage = ' '.join(sentences)
+            if rng.random() < 0.2:
+                sentences[0] = sentences[0].replace(f' {topic},', f' <em>{topic}</em>,', 1)
+            passage_html = f"<p>{' '.join(sentences)}</p>"
+        question_html = f'<div class="">{passage_html}</div><p>{stem_text}</p>'
+        choices = [' '.join(rng.choices(WORDS, k=rng.randint(1, 12))) for _ in LETTERS]
+        return f'{passage} {stem_text}', question_html, choices, choices
+
+    def _math(self):
+        rng = self.rng
+        first, second = rng.choice(self.math_pool), rng.choice(self.math_pool)
+        question_html = (f'<p>If {first}, what is the value of {second}?</p>'
+                         f'<p>{self._sentence(6, 12)}</p>')
+        choices_html = [rng.choice(self.math_pool) for _ in LETTERS]
+        choices = [str(rng.randint(-20, 99)) for _ in LETTERS]
+        return f'If the equation holds, what is the value? {self._sentence(6, 12)}', question_html, choices, choices_html
+
+    def row(self, row_no):
+        rng = self.rng
+        test = row_no // 98 + 1
+        math = rng.random() < self.math_share
+        question, question_html, choices, choices_html = (self._math if math else self._english)()
+        answer = rng.choice(LETTERS)
+        section = 'Math' if math else 'English'
+        module = f"SAT Mock Test {test} - {section} Module {1 + (row_no // 27) % 2}"
+        explanation = f"{answer}. {self._sentence()} Choice {answer} is the best answer."
+        return [
+            f'https://oneprep.xyz/question/{100000 + row_no}/?question_set=exam&exam_id={test}',
+            question, question_html, 'mcq', *choices,
+            *(CHOICE_TEMPLATE.format(answer_id=300000 + row_no * 4 + i, letter=letter, content=content)
+              for i, (letter, content) in enumerate(zip(LETTERS, choices_html))),
+            answer, explanation, f'<p>{explanation}</p>' if rng.random() < 0.6 else '',
+            module
+        ]
+
+    def write(self, path, rows):
+        # Quoted like the real export, so cells may span lines
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f, quoting=csv.QUOTE_MINIMAL)
+            writer.writerow(EXPORT_COLUMNS + [MODULE_COLUMN])
+            for row_no in range(rows):
+                writer.writerow(self.row(row_no))
+
+    def truncate(self, path, count):
+        """Pick `count` English rows of the export at `path` and cut them.
+
+        Returns (items, patterns): items as in unfixed_questions.json, and
+        {id: regex} built from the name/year anchor of each passage.
+        """
+        rng = random.Random(self.seed + 1)
+        corpus = Corpus.load(path, ('Question_html', 'Question Type', MODULE_COLUMN), snapshot=False)
+        candidates = [(row.row_no, row['Module']) for row in corpus
+                      if row['Question Type'] == 'mcq' and 'Math' not in row['Module']]
+        picked = sorted(rng.sample(candidates, min(count, len(candidates))))
+        items, patterns = [], {}
+        for n, module in picked:
+            markup = corpus[n]['Question_html']
+            cut = rng.randint(len(markup) // 3, max(len(markup) // 3, len(markup) - 60))
+            cuid = f'cmsyn{self.seed:04d}{n:08d}'
+            items.append({
+                'id': cuid,
+                'sectionTitle': 'Reading and Writing',
+                'moduleTitle': module,
+                'questionText': markup[:cut],
+                'textLength': cut,
+                'hasBlank': '______' in markup,
+                'program': 'SAT'
+            })
+            anchor = ANCHOR_RE.search(markup)
+            patterns[cuid] = f'{anchor.group(1)}.*{anchor.group(2)}' if anchor else 'research.*student.*notes'
+        return items, patterns
+
+def write_truncations(path, items, patterns):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'items': items, 'patterns': patterns}, f, indent=2)
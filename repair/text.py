@@ -0,0 +1,54 @@
+import html
+import re
+
+# Bump whenever normalize_text changes so cached output is rebuilt
+NORMALIZE_VERSION = 1
+
+TAG_RE = re.compile(r'<[^>]+>')
+TOKEN_RE = re.compile(r'\w+')
+WS_RE = re.compile(r'\s+')
+
+# A complete tag, or one cut off by truncation at the end of the text
+TAG_OR_TAIL_RE = re.compile(r'<[^>]*(?:>|$)')
+# Attributes that carry readable text (graph descriptions, image alt text)
+LABEL_ATTR_RE = re.compile(r'\b(?:aria-label|alt)="([^"]*)(?:"|$)')
+
+QUOTE_FOLD = str.maketrans({
+    '\u2018': "'", '\u2019': "'", '\u201a': "'", '\u201b': "'", '\u2032': "'",
+    '\u201c': '"', '\u201d': '"', '\u201e': '"', '\u2033': '"',
+    '\u2013': '-', '\u2014': '-', '\u00a0': ' ',
+})
+
+
+def strip_tags(markup):
+    return TAG_RE.sub('', markup or '')
+
+
+def tokenize(text):
+    # Lowercased word tokens, entities decoded so "&amp;" and "&" agree
+    return TOKEN_RE.findall(html.unescape(text or '').lower())
+
+
+def _tag_text(match):
+    labels = LABEL_ATTR_RE.findall(match.group(0))
+    return f" {' '.join(labels)} " if labels else ''
+
+
+def normalize_text(markup):
+    # Comparable text for fuzzy matching: tags dropped (keeping aria-label/alt
+    # text), entities decoded, curly quotes and dashes folded, whitespace
+    # collapsed, lowercased
+    text = html.unescape(TAG_OR_TAIL_RE.sub(_tag_text, markup or ''))
+    return WS_RE.sub(' ', text.translate(QUOTE_FOLD)).strip().lower()
+
+
+def normalize_prefix(markup, chars):
+    # First `chars` normalized characters without normalizing the whole cell
+    # (graph questions carry tens of KB of SVG after the part we compare)
+    markup = markup or ''
+    window = chars * 4
+    while True:
+        text = normalize_text(markup[:window])
+        if len(text) >= chars + 16 or window >= len(markup):
+            return text[:chars]
+        window *= 2
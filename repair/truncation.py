@@ -0,0 +1,138 @@
+import html
+import re
+from array import array
+
+from repair.text import TOKEN_RE, strip_tags
+
+BATCH_SIZE = 2048
+
+TAG_TOKEN_RE = re.compile(r'<(/?)([a-zA-Z][\w:-]*)[^>]*?(/?)>')
+VOID_TAGS = {'br', 'img', 'hr', 'input', 'meta', 'link', 'source', 'col', 'area', 'wbr', 'path',
+             'circle', 'rect', 'line', 'polyline', 'polygon', 'ellipse', 'use', 'stop', 'mspace'}
+# Words a complete question never ends on (the endings check_truncation.js looks for)
+DANGLING_WORDS = {'the', 'a', 'an', 'of', 'in', 'to', 'for', 'and', 'but', 'or', 'with', 'by', 'as', 'that'}
+TERMINAL = ('.', '?', '!', '"', "'", ')', ']', ':', ';', '_', '”', '’')
+
+# Score weight of each feature. Being shorter than the CSV source is a strong
+# signal on its own, and grows with how much is missing.
+WEIGHTS = {
+    'dangling_tag': 2.0,
+    'unbalanced_tags': 1.0,
+    'no_terminal': 1.0,
+    'dangling_word': 1.0,
+    'rare_last_word': 1.0,
+    'source_missing': 2.0,
+}
+SOURCE_RATIO_LIMIT = 0.95
+SOURCE_RATIO_SCALE = 4.0
+# Scores from here up count as likely truncations
+FLAG_SCORE = 1.5
+
+
+def tag_balance(markup):
+    # Number of opening tags (non-void) left without a matching close
+    depth = {}
+    for closing, name, self_closing in TAG_TOKEN_RE.findall(markup):
+        name = name.lower()
+        if self_closing or name in VOID_TAGS:
+            continue
+        depth[name] = depth.get(name, 0) + (-1 if closing else 1)
+    return sum(abs(count) for count in depth.values())
+
+
+def last_word(text):
+    words = TOKEN_RE.findall(text[-80:].lower())
+    return words[-1] if words else ''
+
+
+class TruncationAudit:
+    """Truncation features for a whole corpus, kept column-wise.
+
+    Items are added in batches; every feature is stored in its own typed
+    array (one slot per item) and scoring runs down those columns, so the
+    bank, the three datasets and the CSV can be audited in one pass. A
+    source length of 0 means the CSV text for the item is unknown.
+    """
+
+    COLUMNS = {
+        'length': 'l', 'source_length': 'l', 'excerpt': 'b',
+        'dangling_tag': 'b', 'unbalanced_tags': 'l', 'no_terminal': 'b', 'dangling_word': 'b',
+    }
+
+    def __init__(self):
+        self.items = []           # (source, id, url) per item
+        self.last_words = []
+        self.columns = {name: array(code) for name, code in self.COLUMNS.items()}
+        self.vocabulary = {}      # word -> number of items containing it
+
+    def add_batch(self, batch):
+        # batch: iterable of (source, id, url, markup, length, source length or 0, excerpt).
+        # `length` is compared with `source_length`, so both must measure the same
+        # thing (html or plain text); an excerpt's ending says nothing about the real one.
+        columns = self.columns
+        for source, item_id, url, markup, length, source_length, excerpt in batch:
+            markup = markup or ''
+            text = html.unescape(strip_tags(markup)).rstrip()
+            self.items.append((source, item_id, url))
+            columns['length'].append(length)
+            columns['source_length'].append(source_length or 0)
+            columns['excerpt'].append(1 if excerpt else 0)
+            # A tag cut off at the very end, e.g. '... padding-left:1em'
+            columns['dangling_tag'].append(1 if not excerpt and markup.rfind('<') > markup.rfind('>') else 0)
+            columns['unbalanced_tags'].append(0 if excerpt else tag_balance(markup))
+            columns['no_terminal'].append(0 if excerpt or not text or text.endswith(TERMINAL) else 1)
+            word = '' if excerpt else last_word(text)
+            self.last_words.append(word)
+            columns['dangling_word'].append(1 if word in DANGLING_WORDS or (word and text.endswith(',')) else 0)
+            for token in set(TOKEN_RE.findall(text.lower())):
+                self.vocabulary[token] = self.vocabulary.get(token, 0) + 1
+
+    def add(self, items, batch_size=BATCH_SIZE):
+        batch = []
+        for item in items:
+            batch.append(item)
+            if len(batch) >= batch_size:
+                self.add_batch(batch)
+                batch = []
+        if batch:
+            self.add_batch(batch)
+
+    def scores(self):
+        # Score, source length ratio and rare-last-word columns, computed column by column
+        columns = self.columns
+        ratio = array('d', (length / source if source else 1.0
+                            for length, source in zip(columns['length'], columns['source_length'])))
+        rare = array('b', (1 if word and self.vocabulary.get(word, 0) <= 1 else 0 for word in self.last_words))
+        score = array('d', (WEIGHTS['source_missing'] + SOURCE_RATIO_SCALE * (1.0 - r)
+                            if r < SOURCE_RATIO_LIMIT else 0.0 for r in ratio))
+        for name in ('dangling_tag', 'no_terminal', 'dangling_word'):
+            weight = WEIGHTS[name]
+            score = array('d', (s + weight * flag for s, flag in zip(score, columns[name])))
+        score = array('d', (s + WEIGHTS['unbalanced_tags'] * min(count, 3) / 3
+                            for s, count in zip(score, columns['unbalanced_tags'])))
+        score = array('d', (s + WEIGHTS['rare_last_word'] * flag for s, flag in zip(score, rare)))
+        return score, ratio, rare
+
+    def ranking(self, limit=None, min_score=FLAG_SCORE):
+        score, ratio, rare = self.scores()
+        order = sorted((i for i in range(len(self.items)) if score[i] >= min_score), key=lambda i: -score[i])
+        report = []
+        for i in order[:limit]:
+            source, item_id, url = self.items[i]
+            report.append({
+                'source': source,
+                'id': item_id,
+                'url': url,
+                'score': round(score[i], 3),
+                'length': self.columns['length'][i],
+                'source_length': self.columns['source_length'][i] or None,
+                'excerpt': bool(self.columns['excerpt'][i]),
+                'source_ratio': round(ratio[i], 3),
+                'dangling_tag': bool(self.columns['dangling_tag'][i]),
+                'unbalanced_tags': self.columns['unbalanced_tags'][i],
+                'no_terminal': bool(self.columns['no_terminal'][i]),
+                'dangling_word': bool(self.columns['dangling_word'][i]),
+                'rare_last_word': bool(rare[i]),
+                'last_word': self.last_words[i]
+            })
+        return report
@@ -0,0 +1,86 @@
+import argparse
+import json
+import os
+import time
+
+from repair.db_writer import BATCH_SIZE, connect, read_update_files
+from repair.exam_standin import ExamStandIn
+from repair.impact_index import ExamTables, ImpactIndex, Rescore, RescoreWriter
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Find and rescore the student answers graded against repaired questions')
+    parser.add_argument('files', nargs='*', default=['final_88_updates.json', 'remaining_9_to_update.json'],
+                        help='update files whose ids (cuids) were repaired')
+    parser.add_argument('--database', default=os.environ.get('DATABASE_URL'),
+                        help='postgresql://... or sqlite:///stand-in.db (default: $DATABASE_URL)')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--dry-run', action='store_true', help='run every batch, then roll back')
+    parser.add_argument('--populate-standin', type=int, metavar='STUDENTS',
+                        help='first fill an empty sqlite stand-in with this many students\' graded attempts')
+    parser.add_argument('--report', default='rescore_report.json')
+    args = parser.parse_args()
+
+    if not args.database:
+        parser.error('no --database given and DATABASE_URL is not set')
+    files = [path for path in args.files if os.path.exists(path)]
+    for path in set(args.files) - set(files):
+        print(f"⚠ {path} not found, skipping")
+    question_ids = sorted(read_update_files(files))
+    print(f"Loaded {len(question_ids)} repaired questions from {len(files)} file(s)")
+
+    connection, paramstyle = connect(args.database)
+    try:
+        if args.populate_standin:
+            if not args.database.startswith('sqlite:'):
+                parser.error('--populate-standin only writes to a sqlite:// stand-in')
+            # A tenth of the students finish their last exam through the take page's /submit route
+            sizes = ExamStandIn().populate(connection, question_ids, students=args.populate_standin,
+                                           by_submit=args.populate_standin // 10)
+            print(f"✓ Stand-in filled: {sizes['assignments']} assignments, {sizes['answers']} answers")
+
+        start = time.time()
+        tables = ExamTables.load(connection)
+        loaded = time.time()
+        index = ImpactIndex(tables)
+        rescore = Rescore(index, question_ids)
+        scored = time.time()
+        writer = RescoreWriter(connection, paramstyle, args.batch_size)
+        writer.apply(rescore, dry_run=args.dry_run)
+        written = time.time()
+    finally:
+        connection.close()
+
+    print(f"Exported {len(tables.answer_ids)} answers of {len(tables.assignments)} assignments "
+          f"in {loaded - start:.2f}s")
+    print(f"✓ {len(rescore.answer_rows)} answers in {rescore.assignments} assignments were graded against "
+          f"repaired questions (indexed and rescored in {scored - loaded:.2f}s)")
+    print(f"  StudentAnswer: {len(rescore.answers)} changed")
+    print(f"  ExamAssignment: {len(rescore.scores)} scores, {len(rescore.module1)} module1Scores, "
+          f"{len(rescore.paths)} adaptivePaths changed")
+    if rescore.paths:
+        print(f"⚠ {len(rescore.paths)} students would have been routed to a different Module 2")
+    if rescore.unreproduced:
+        print(f"⚠ {len(rescore.unreproduced)} assignment(s) left alone: their stored scores do not follow "
+              f"from their stored grades under either submit route")
+    print(f"  {writer.batches} batch statement(s) in {written - scored:.2f}s"
+          + (' (dry run, rolled back)' if args.dry_run else ''))
+    if rescore.answers and not args.dry_run:
+        print("  Regraded answers of completed exams: run refresh_skill_stats.py --rebuild")
+
+    report = {
+        'questions': index.impact(question_ids),
+        'answers': [{'id': cuid, 'isCorrect': right, 'pointsEarned': points} for cuid, right, points in rescore.answers],
+        'scores': [{'id': cuid, 'old': old, 'new': new} for cuid, old, new in rescore.scores],
+        'module1Scores': [{'id': cuid, 'old': old, 'new': new} for cuid, old, new in rescore.module1],
+        'adaptivePaths': [{'id': cuid, 'old': old, 'new': new} for cuid, old, new in rescore.paths],
+        'unreproduced': rescore.unreproduced,
+        'dry_run': args.dry_run
+    }
+    with open(args.report, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"✓ Saved report to {args.report}")
+
+
+if __name__ == '__main__':
+    main()
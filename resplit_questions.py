@@ -0,0 +1,118 @@
+import argparse
+import json
+import os
+import time
+
+from repair.snapshot import Snapshot
+from repair.splitter import VARIANTS, StemSplitter
+
+csv_file = '/Users/kharisyeboah/Downloads/oneprep_final_EN_with_module.csv'
+# Dataset directory -> the generator variant that wrote it
+DATASET_VARIANTS = {
+    'sat_questions_by_test': 'base',
+    'sat_questions_by_test_correct': 'correct',
+    'sat_questions_by_test_fixed': 'fixed',
+}
+FIELDS = ('passageText', 'questionText', 'isFillInBlank', 'isDualText')
+
+
+def load_stems(path):
+    # One stem per line, blank lines and # comments ignored
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.rstrip('\n') for line in f if line.strip() and not line.startswith('#')]
+
+
+def resplit_file(path, splitter, write=False):
+    with open(path, 'r', encoding='utf-8') as f:
+        questions = json.load(f)
+    changed = {}
+    for question in questions:
+        fields = splitter.record_fields(question.get('fullText', ''))
+        diff = [field for field in FIELDS if question.get(field) != fields[field]]
+        for field in diff:
+            changed[field] = changed.get(field, 0) + 1
+        if diff:
+            question.update(fields)
+    if changed and write:
+        # Same layout as the generators' JSON.stringify(questions, null, 2)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(questions, indent=2, ensure_ascii=False))
+    return len(questions), changed
+
+
+def resplit_csv(path, splitter, output, batch_size):
+    # Stream the export's Question column and write {URL: fields}, first row per URL
+    count = 0
+    seen = set()
+    with open(output, 'w', encoding='utf-8') as f:
+        f.write('{')
+        batch = []
+        for row in Snapshot.open(path).rows(('URL', 'Question')):
+            if row['URL'] in seen:
+                continue
+            seen.add(row['URL'])
+            batch.append((row['URL'], row['Question']))
+            if len(batch) >= batch_size:
+                count = _write_batch(f, batch, splitter, count)
+                batch = []
+        count = _write_batch(f, batch, splitter, count)
+        f.write('\n}\n')
+    return count
+
+
+def _write_batch(f, batch, splitter, count):
+    for url, text in batch:
+        f.write(',' if count else '')
+        f.write(f"\n  {json.dumps(url)}: {json.dumps(splitter.record_fields(text), ensure_ascii=False)}")
+        count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Re-extract passageText/questionText with a stem table')
+    parser.add_argument('dirs', nargs='*', default=list(DATASET_VARIANTS),
+                        help='dataset directories written by process-all-sat-questions*.js')
+    parser.add_argument('--variant', choices=sorted(VARIANTS),
+                        help="stem table and split rule (default: the one that wrote each directory)")
+    parser.add_argument('--stems', help='file with one stem per line, replacing the variant\'s table')
+    parser.add_argument('--write', action='store_true', help='rewrite records whose fields changed')
+    parser.add_argument('--csv', nargs='?', const=csv_file,
+                        help='split the export\'s Question column instead of dataset directories')
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--output', default='split_questions.json', help='output for --csv')
+    args = parser.parse_args()
+
+    stems = load_stems(args.stems) if args.stems else None
+
+    def splitter_for(variant):
+        table, rule = VARIANTS[args.variant or variant]
+        return StemSplitter(stems or table, rule)
+
+    start = time.time()
+    if args.csv:
+        if not os.path.exists(args.csv):
+            print(f"✗ {args.csv} not found")
+            return
+        count = resplit_csv(args.csv, splitter_for('correct'), args.output, args.batch_size)
+        print(f"✓ Split {count} rows in {time.time() - start:.1f}s, saved to {args.output}")
+        return
+
+    for directory in args.dirs:
+        if not os.path.isdir(directory):
+            print(f"✗ {directory} not found")
+            continue
+        splitter = splitter_for(DATASET_VARIANTS.get(os.path.basename(directory.rstrip('/')), 'correct'))
+        questions, changed = 0, {}
+        for name in sorted(name for name in os.listdir(directory) if name.endswith('.json')):
+            count, file_changed = resplit_file(os.path.join(directory, name), splitter, args.write)
+            questions += count
+            for field, n in file_changed.items():
+                changed[field] = changed.get(field, 0) + n
+        summary = ', '.join(f"{field} {n}" for field, n in changed.items()) or 'no changes'
+        action = 'rewritten' if args.write and changed else 'checked'
+        print(f"✓ {directory}: {questions} questions {action} ({summary})")
+    print(f"\nDone in {time.time() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    main()